@@ -0,0 +1,58 @@
+import os
+import numpy as np
+
+
+"""Headless saving and loading of named NumPy arrays, the file format of
+weightUtil's weight export. Like nurbsUtil, nothing in here touches Maya."""
+
+
+"""
+saveArrays
+loadArrays
+"""
+
+
+# namespace colons and DAG path pipes aren't valid in (windows) file names.
+# Neither replacement is valid in a Maya name, so keys round trip
+_fileEscapes = ((":", "~"), ("|", "^"))
+
+
+def _fileName(key):
+    for char, escape in _fileEscapes:
+        key = key.replace(char, escape)
+    return key + ".npy"
+
+
+def _keyName(fileName):
+    key = fileName[:-4]
+    for char, escape in _fileEscapes:
+        key = key.replace(escape, char)
+    return key
+
+
+def saveArrays(path, data, compress=True):
+    """Save a dict of arrays. A path ending in .npz is written as one
+    (compressed) npz archive. Any other path is a directory of one .npy
+    file per array, which loadArrays can memory map."""
+    if path.endswith(".npz"):
+        save = np.savez_compressed if compress else np.savez
+        save(path, **data)
+        return
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    for key, arr in data.items():
+        np.save(os.path.join(path, _fileName(key)), arr)
+
+
+def loadArrays(path, mmap=False):
+    """Load a dict of arrays saved by saveArrays. An npz archive is read
+    in full (mmap doesn't apply) and closed again. A directory's arrays
+    are memory mapped (read only) if mmap, so huge weight sets load
+    instantly and are only paged in as they're used."""
+    if path.endswith(".npz"):
+        with np.load(path) as archive:
+            return dict((key, archive[key]) for key in archive.files)
+    return dict(
+        (_keyName(f),
+         np.load(os.path.join(path, f), mmap_mode="r" if mmap else None))
+        for f in os.listdir(path) if f.endswith(".npy"))
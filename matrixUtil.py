@@ -1,4 +1,6 @@
+import numpy as np
 import pymel.core as pmc
+import maya.api.OpenMaya as om2
 
 
 __author__ = "Brendan Kelly"
@@ -17,6 +19,7 @@ matrixFromVectors
 xformFromSpaces
 orientConstInOtherSpace
 printMatrix
+getWorldMatrices
 """
 
 
@@ -183,3 +186,14 @@ def printMatrix(m):
         for c in r:
             t.append(float("{0:.3f}".format(c)))
         print(t)
+
+
+def getWorldMatrices(objs):
+    """(N, 4, 4) array of the world matrices of the given DAG nodes,
+    read straight from their dag paths in one pass (no DG evaluation)."""
+    sel = om2.MSelectionList()
+    for obj in objs:
+        sel.add(obj.longName())
+    mats = [list(sel.getDagPath(i).inclusiveMatrix())
+            for i in range(sel.length())]
+    return np.reshape(np.array(mats, dtype=float), (-1, 4, 4))
@@ -0,0 +1,347 @@
+import numpy as np
+
+
+"""Headless mesh topology. Like nurbsUtil, nothing in here touches Maya -
+a MeshTopology is built from plain index arrays (as read in bulk through
+maya.api), and answers adjacency questions with array operations instead
+of walking one PyMEL component at a time."""
+
+
+"""
+MeshTopology
+    .connected
+    .boundaryEdges
+    .boundaryVerts
+    .enclosedVerts
+    .edgeLoop
+    .edgeRing
+    .edgeChains
+    .sortEdgeChain
+csrRows
+faceNormals
+meanPosition
+sumNormals
+"""
+
+
+def csrRows(offsets, indices, rows):
+    """Gather the entries of several rows of a CSR table at once.
+    Returns (owners, entries): for every entry, the position in rows
+    of the row it came from, and the entry itself. Args:
+    - offsets: (numRows + 1) array of row starts
+    - indices: flat array of row entries
+    - rows: array of row indices to gather."""
+    rows = np.asarray(rows, dtype=int).ravel()
+    starts, ends = offsets[rows], offsets[rows + 1]
+    counts = ends - starts
+    owners = np.repeat(np.arange(len(rows)), counts)
+    firsts = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return owners, indices[firsts + np.arange(len(owners))]
+
+
+def faceNormals(points, topo, normalize=True):
+    """(numFaces, 3) array of face normals, by Newell's method - exact for
+    planar faces, a good average for non-planar ones. Args:
+    - points: (numVerts, 3) array of vertex positions
+    - topo: the mesh's MeshTopology
+    - normalize: if False, normals' lengths are twice the faces' areas."""
+    points = np.asarray(points, dtype=float)
+    corners = points[topo.faceVerts]
+    crosses = np.cross(corners, corners[topo.nextCorners])
+    normals = np.zeros((topo.numFaces, 3))
+    np.add.at(normals, topo.cornerFaces, crosses)
+    if normalize:
+        lengths = np.linalg.norm(normals, axis=1)
+        normals /= np.where(lengths > 0.0, lengths, 1.0)[:, None]
+    return normals
+
+
+def meanPosition(points, indices):
+    """Average of the indexed rows of a (N, 3) points array."""
+    return np.asarray(points, dtype=float)[np.asarray(indices, dtype=int)
+                                           ].mean(axis=0)
+
+
+def sumNormals(normals, indices):
+    """Unit length sum of the indexed rows of a (N, 3) normals array,
+    ie the average direction. Zero if they cancel out."""
+    total = np.asarray(normals, dtype=float)[
+        np.asarray(indices, dtype=int)].sum(axis=0)
+    length = np.linalg.norm(total)
+    return total / length if length > 0.0 else total
+
+
+def _csr(rows, entries, numRows):
+    """Build (offsets, indices) from unsorted (row, entry) pairs.
+    Entries keep their relative order within each row."""
+    order = np.argsort(rows, kind="mergesort")
+    offsets = np.zeros(numRows + 1, dtype=int)
+    np.cumsum(np.bincount(rows, minlength=numRows), out=offsets[1:])
+    return offsets, np.asarray(entries)[order]
+
+
+class MeshTopology(object):
+    """Compressed sparse row adjacency tables for a polygon mesh.
+    Component types are named as in PyMEL: "Vertices", "Edges", "Faces".
+    Args:
+    - numVerts: number of vertices
+    - edges: (numEdges, 2) array of edge vertex indices
+    - faceCounts: number of vertices in each face
+    - faceVerts: flat array of every face's vertices, in winding order."""
+    def __init__(self, numVerts, edges, faceCounts, faceVerts):
+        self.numVerts = int(numVerts)
+        self.edges = np.asarray(edges, dtype=int).reshape(-1, 2)
+        faceCounts = np.asarray(faceCounts, dtype=int)
+        self.faceVerts = np.asarray(faceVerts, dtype=int)
+        self.faceOffsets = np.zeros(len(faceCounts) + 1, dtype=int)
+        np.cumsum(faceCounts, out=self.faceOffsets[1:])
+
+        nv, ne, nf = self.numVerts, self.numEdges, self.numFaces
+        edgeIds = np.arange(ne)
+        # vertex -> edges, and through them vertex -> vertices
+        self.vertEdgeOffsets, self.vertEdges = _csr(
+            self.edges.ravel(), np.repeat(edgeIds, 2), nv)
+        self.vertVertOffsets, self.vertVerts = _csr(
+            self.edges.ravel(), self.edges[:, ::-1].ravel(), nv)
+
+        # face -> edges, matching each side of each face to its edge id.
+        # nextCorners points each face-vertex at the next one around its face
+        self.cornerFaces = np.repeat(np.arange(nf), faceCounts)
+        self.nextCorners = np.arange(len(self.faceVerts)) + 1
+        wrap = self.faceOffsets[1:] - 1
+        self.nextCorners[wrap[faceCounts > 0]] = \
+            self.faceOffsets[:-1][faceCounts > 0]
+        self.faceEdges = self._edgeIds(self.faceVerts,
+                                       self.faceVerts[self.nextCorners])
+        self.edgeFaceOffsets, self.edgeFaces = _csr(
+            self.faceEdges, self.cornerFaces, ne)
+        self.vertFaceOffsets, self.vertFaces = _csr(
+            self.faceVerts, self.cornerFaces, nv)
+        self.edgeFaceCounts = np.diff(self.edgeFaceOffsets)
+
+    @property
+    def numEdges(self):
+        return len(self.edges)
+
+    @property
+    def numFaces(self):
+        return len(self.faceOffsets) - 1
+
+    def _edgeIds(self, a, b):
+        """Edge index for each vertex pair, -1 where there's no such edge."""
+        keys = (np.minimum(self.edges[:, 0], self.edges[:, 1]) * self.numVerts
+                + np.maximum(self.edges[:, 0], self.edges[:, 1]))
+        order = np.argsort(keys)
+        query = np.minimum(a, b) * self.numVerts + np.maximum(a, b)
+        pos = np.clip(np.searchsorted(keys, query, sorter=order),
+                      0, max(len(keys) - 1, 0))
+        found = order[pos]
+        return np.where(keys[found] == query, found, -1)
+
+    def _table(self, fromType, toType):
+        """(offsets, indices) of the direct relation between two types."""
+        tables = {
+            ("Vertices", "Vertices"): (self.vertVertOffsets, self.vertVerts),
+            ("Vertices", "Edges"): (self.vertEdgeOffsets, self.vertEdges),
+            ("Vertices", "Faces"): (self.vertFaceOffsets, self.vertFaces),
+            ("Edges", "Vertices"): (np.arange(0, 2 * self.numEdges + 1, 2),
+                                    self.edges.ravel()),
+            ("Edges", "Faces"): (self.edgeFaceOffsets, self.edgeFaces),
+            ("Faces", "Vertices"): (self.faceOffsets, self.faceVerts),
+            ("Faces", "Edges"): (self.faceOffsets, self.faceEdges)}
+        return tables[(fromType, toType)]
+
+    def connected(self, indices, fromType, toType="Faces"):
+        """Sorted unique indices of everything of toType connected to the
+        given components of fromType - the vectorized equivalent of a
+        union of PyMEL's connectedVertices/Edges/Faces. Edges and faces
+        connect to their own kind through shared vertices and shared
+        edges respectively, never to themselves."""
+        indices = np.asarray(indices, dtype=int).ravel()
+        if fromType != toType or fromType == "Vertices":
+            return np.unique(csrRows(*self._table(fromType, toType) +
+                                     (indices,))[1])
+
+        via = "Vertices" if fromType == "Edges" else "Edges"
+        owners, mids = csrRows(*self._table(fromType, via) + (indices,))
+        subOwners, found = csrRows(*self._table(via, fromType) + (mids,))
+        notSelf = found != indices[owners[subOwners]]
+        return np.unique(found[notSelf])
+
+    def boundaryEdges(self):
+        """Edges with only one face."""
+        return np.flatnonzero(self.edgeFaceCounts == 1)
+
+    def boundaryVerts(self):
+        """Vertices on any boundary edge."""
+        return np.unique(self.edges[self.boundaryEdges()])
+
+    def enclosedVerts(self, loopVerts):
+        """Vertices inside a closed loop of vertices, the loop included.
+        Inside is whichever side of the loop has fewer vertices, found by
+        flood filling out from the loop's neighbours."""
+        loopVerts = np.unique(np.asarray(loopVerts, dtype=int))
+        blocked = np.zeros(self.numVerts, dtype=bool)
+        blocked[loopVerts] = True
+        seeds = self.connected(loopVerts, "Vertices", "Vertices")
+        best = None
+        for seed in seeds[~blocked[seeds]]:
+            if blocked[seed]:
+                # already filled from an earlier seed
+                continue
+            region = frontier = np.array([seed])
+            blocked[seed] = True
+            while len(frontier):
+                frontier = np.unique(csrRows(
+                    self.vertVertOffsets, self.vertVerts, frontier)[1])
+                frontier = frontier[~blocked[frontier]]
+                blocked[frontier] = True
+                region = np.concatenate((region, frontier))
+            if best is None or len(region) < len(best):
+                best = region
+        if best is None:
+            return loopVerts
+        return np.union1d(loopVerts, best)
+
+    def _loopStep(self, edge, vert):
+        """Next edge continuing the loop from edge through vert, or None.
+        Interior loops need a valence four vertex, and continue along the
+        edge which shares no face with the current one. Boundary loops
+        continue along the other boundary edge."""
+        vertEdges = self.vertEdges[
+            self.vertEdgeOffsets[vert]:self.vertEdgeOffsets[vert + 1]]
+        faceCounts = self.edgeFaceCounts
+        if faceCounts[edge] == 1:
+            others = [e for e in vertEdges
+                      if e != edge and faceCounts[e] == 1]
+            return others[0] if len(others) == 1 else None
+        if len(vertEdges) != 4:
+            return None
+        faces = set(self.edgeFaces[
+            self.edgeFaceOffsets[edge]:self.edgeFaceOffsets[edge + 1]])
+        for e in vertEdges:
+            eFaces = self.edgeFaces[
+                self.edgeFaceOffsets[e]:self.edgeFaceOffsets[e + 1]]
+            if e != edge and not faces.intersection(eFaces):
+                return e
+        return None
+
+    def edgeLoop(self, edge):
+        """Ordered array of the edges in the loop through the given edge.
+        Closed loops start from it and don't repeat it at the end."""
+        halves = []
+        for end in (1, 0):
+            walk = []
+            vert = self.edges[edge, end]
+            nex = self._loopStep(edge, vert)
+            while nex is not None and nex != edge:
+                walk.append(nex)
+                a, b = self.edges[nex]
+                vert = b if a == vert else a
+                nex = self._loopStep(nex, vert)
+            if nex == edge:
+                # closed, no need to walk the other way
+                return np.array([edge] + walk, dtype=int)
+            halves.append(walk)
+        return np.array(halves[1][::-1] + [edge] + halves[0], dtype=int)
+
+    def _ringStep(self, edge, face):
+        """Opposite edge of a quad face, or None for other faces."""
+        start, end = self.faceOffsets[face], self.faceOffsets[face + 1]
+        if end - start != 4:
+            return None
+        fEdges = list(self.faceEdges[start:end])
+        return fEdges[(fEdges.index(edge) + 2) % 4]
+
+    def _otherFace(self, edge, face):
+        faces = [f for f in self.edgeFaces[
+            self.edgeFaceOffsets[edge]:self.edgeFaceOffsets[edge + 1]]
+            if f != face]
+        return faces[0] if faces else None
+
+    def edgeRing(self, edge):
+        """Ordered array of the edges in the ring through the given edge,
+        crossing quads only. Closed rings start from the given edge."""
+        faces = self.edgeFaces[
+            self.edgeFaceOffsets[edge]:self.edgeFaceOffsets[edge + 1]]
+        halves = []
+        for face in faces[:2]:
+            walk = []
+            nex = self._ringStep(edge, face)
+            while nex is not None and nex != edge:
+                walk.append(nex)
+                face = self._otherFace(nex, face)
+                nex = None if face is None else self._ringStep(nex, face)
+            if nex == edge:
+                return np.array([edge] + walk, dtype=int)
+            halves.append(walk)
+        halves += [[]] * (2 - len(halves))
+        return np.array(halves[1][::-1] + [edge] + halves[0], dtype=int)
+
+    def edgeChains(self, edges):
+        """Split a selection of edges into its separate chains (edges
+        connected through shared vertices). Returns a list of edge arrays,
+        ordered by each chain's lowest edge index."""
+        edges = np.unique(np.asarray(edges, dtype=int))
+        byVert = {}
+        for e in edges:
+            for vert in self.edges[e]:
+                byVert.setdefault(vert, []).append(e)
+        chains, seen = [], set()
+        for e in edges:
+            if e in seen:
+                continue
+            chain, stack = [], [e]
+            seen.add(e)
+            while stack:
+                cur = stack.pop()
+                chain.append(cur)
+                for vert in self.edges[cur]:
+                    for nex in byVert[vert]:
+                        if nex not in seen:
+                            seen.add(nex)
+                            stack.append(nex)
+            chains.append(np.sort(chain))
+        return chains
+
+    def sortEdgeChain(self, edges):
+        """Order an unordered selection of edges forming one chain.
+        Returns (verts, edges, closed): the ordered vertices (a closed
+        chain doesn't repeat its first vert), the edges in the same order,
+        and whether the chain closes on itself. Open chains start from
+        their lowest index end, so the result doesn't depend on the
+        selection's order. Raises ValueError for branching selections."""
+        edges = np.unique(np.asarray(edges, dtype=int))
+        if not len(edges):
+            return np.zeros(0, dtype=int), edges, False
+        verts, counts = np.unique(self.edges[edges], return_counts=True)
+        if (counts > 2).any():
+            raise ValueError("Edges branch at vertices {0}".format(
+                verts[counts > 2].tolist()))
+        ends = verts[counts == 1]
+        closed = not len(ends)
+        start = verts[0] if closed else ends.min()
+
+        byVert = {}
+        for e in edges:
+            for vert in self.edges[e]:
+                byVert.setdefault(vert, []).append(e)
+        chainVerts, chainEdges = [start], []
+        used = set()
+        vert = start
+        while True:
+            nex = [e for e in byVert[vert] if e not in used]
+            if not nex:
+                break
+            e = min(nex)
+            used.add(e)
+            chainEdges.append(e)
+            a, b = self.edges[e]
+            vert = b if a == vert else a
+            if vert == start:
+                break
+            chainVerts.append(vert)
+        if len(chainEdges) != len(edges):
+            raise ValueError("Edges do not form a single chain")
+        return (np.array(chainVerts, dtype=int),
+                np.array(chainEdges, dtype=int), closed)
@@ -0,0 +1,969 @@
+import multiprocessing
+import numpy as np
+try:
+    from concurrent import futures
+    from concurrent.futures.process import BrokenProcessPool
+    from multiprocessing import spawn
+except ImportError:
+    # python 2 (no spawn context to start mayapy workers with) -
+    # mapJobs runs serially
+    futures = None
+
+
+"""Headless NURBS math. Nothing in here touches Maya - everything works on
+plain arrays of CVs, knots and parameters, so it can be run (and timed)
+outside of a Maya session. Knot vectors are in Maya's convention,
+ie numCVs + degree - 1 knots (the outermost knot on each end is dropped)."""
+
+
+"""
+fullKnots
+findSpans
+basisFunsDerivs
+SurfaceEvaluator
+    .closestPoints
+    .bezierPatches
+    .grevilleParams
+    .cvGeodesics
+PatchBVH
+    .closestPoints
+    .intersectRays
+mirrorCVs
+mirrorCVIndices
+uniformKnots
+curveBasis
+chordParams
+startLoopOnPlane
+fitCurve
+planarParams
+fitSurface
+evalRamp
+mapJobs
+"""
+
+
+def fullKnots(knots, degree):
+    """Pad a Maya-style knot vector out to the textbook numCVs + degree + 1
+    knots. The padding knots never take part in evaluation inside the
+    domain, so simply repeating the end knots is good enough. Args:
+    - knots: Maya knot vector (numCVs + degree - 1 floats)
+    - degree: degree of the curve in that direction."""
+    knots = np.asarray(knots, dtype=float)
+    return np.concatenate((knots[:1], knots, knots[-1:]))
+
+
+def findSpans(knots, degree, n, params):
+    """Vectorized knot span lookup. Args:
+    - knots: FULL knot vector (see fullKnots)
+    - degree: degree in this direction
+    - n: index of the last CV (numCVs - 1)
+    - params: array of parameters, assumed to be inside the domain."""
+    spans = np.searchsorted(knots, params, side="right") - 1
+    return np.clip(spans, degree, n)
+
+
+def basisFunsDerivs(knots, degree, spans, params, nDerivs=1):
+    """Non-zero basis functions and their derivatives for an array
+    of parameters, ie "The NURBS Book" A2.3 run over every param at once.
+    Returns an array of shape (len(params), nDerivs + 1, degree + 1) where
+    [i, k, j] is the kth derivative of basis function spans[i] - degree + j."""
+    p = degree
+    u = np.asarray(params, dtype=float)
+    num = u.shape[0]
+    ndu = np.zeros((num, p + 1, p + 1))
+    ndu[:, 0, 0] = 1.0
+    left = np.zeros((num, p + 1))
+    right = np.zeros((num, p + 1))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for j in range(1, p + 1):
+            left[:, j] = u - knots[spans + 1 - j]
+            right[:, j] = knots[spans + j] - u
+            saved = np.zeros(num)
+            for r in range(j):
+                # lower triangle holds the knot differences
+                ndu[:, j, r] = right[:, r + 1] + left[:, j - r]
+                temp = _safeDiv(ndu[:, r, j - 1], ndu[:, j, r])
+                # upper triangle holds the basis functions
+                ndu[:, r, j] = saved + right[:, r + 1] * temp
+                saved = left[:, j - r] * temp
+            ndu[:, j, j] = saved
+
+        ders = np.zeros((num, nDerivs + 1, p + 1))
+        ders[:, 0, :] = ndu[:, :, p]
+        # only bother with derivatives that aren't identically zero
+        for r in range(p + 1):
+            s1, s2 = 0, 1
+            a = np.zeros((num, 2, p + 1))
+            a[:, 0, 0] = 1.0
+            for k in range(1, min(nDerivs, p) + 1):
+                d = np.zeros(num)
+                rk, pk = r - k, p - k
+                if r >= k:
+                    a[:, s2, 0] = _safeDiv(a[:, s1, 0], ndu[:, pk + 1, rk])
+                    d = a[:, s2, 0] * ndu[:, rk, pk]
+                j1 = 1 if rk >= -1 else -rk
+                j2 = k - 1 if r - 1 <= pk else p - r
+                for j in range(j1, j2 + 1):
+                    a[:, s2, j] = _safeDiv(
+                        a[:, s1, j] - a[:, s1, j - 1], ndu[:, pk + 1, rk + j])
+                    d = d + a[:, s2, j] * ndu[:, rk + j, pk]
+                if r <= pk:
+                    a[:, s2, k] = _safeDiv(-a[:, s1, k - 1], ndu[:, pk + 1, r])
+                    d = d + a[:, s2, k] * ndu[:, r, pk]
+                ders[:, k, r] = d
+                s1, s2 = s2, s1
+
+    factor = float(p)
+    for k in range(1, min(nDerivs, p) + 1):
+        ders[:, k, :] *= factor
+        factor *= (p - k)
+
+    return ders
+
+
+def _safeDiv(a, b):
+    """Divide, with x/0 treated as 0 (repeated knots)."""
+    return np.where(b != 0.0, a / np.where(b != 0.0, b, 1.0), 0.0)
+
+
+def _binomial(n, k):
+    """Small integer binomial coefficient, for rational derivatives."""
+    result = 1
+    for i in range(1, k + 1):
+        result = result * (n - k + i) // i
+    return result
+
+
+class SurfaceEvaluator(object):
+    """Evaluate positions, derivatives, normals and tangents of a NURBS
+    surface for whole arrays of (u, v) parameters at once. Args:
+    - cvs: array of shape (numCVsInU, numCVsInV, 3)
+    - knotsU, knotsV: Maya-style knot vectors
+    - degreeU, degreeV: surface degrees
+    - weights: optional (numCVsInU, numCVsInV) array for rational surfaces
+    - formU, formV: "open", "closed" or "periodic". Periodic directions
+    wrap their parameters around the domain, the others are clamped."""
+    def __init__(self, cvs, knotsU, knotsV, degreeU=3, degreeV=3,
+                 weights=None, formU="open", formV="open"):
+        self.cvs = np.asarray(cvs, dtype=float)
+        self.degreeU = int(degreeU)
+        self.degreeV = int(degreeV)
+        self.formU = formU
+        self.formV = formV
+        self.knotsU = fullKnots(knotsU, self.degreeU)
+        self.knotsV = fullKnots(knotsV, self.degreeV)
+        self.weights = None
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float)
+            if not np.allclose(weights, 1.0):
+                self.weights = weights
+        self.domainU = (self.knotsU[self.degreeU],
+                        self.knotsU[-self.degreeU - 1])
+        self.domainV = (self.knotsV[self.degreeV],
+                        self.knotsV[-self.degreeV - 1])
+
+    @property
+    def numCVsInU(self):
+        return self.cvs.shape[0]
+
+    @property
+    def numCVsInV(self):
+        return self.cvs.shape[1]
+
+    def paramGrid(self, numU, numV, endpoint=False):
+        """Return flat (u, v) arrays of an evenly spaced grid over the
+        surface's domain, numU by numV samples."""
+        u = np.linspace(self.domainU[0], self.domainU[1], numU,
+                        endpoint=endpoint)
+        v = np.linspace(self.domainV[0], self.domainV[1], numV,
+                        endpoint=endpoint)
+        uu, vv = np.meshgrid(u, v, indexing="ij")
+        return uu.ravel(), vv.ravel()
+
+    def _toDomain(self, params, domain, form):
+        """Wrap (periodic) or clamp (open/closed) params into the domain."""
+        params = np.atleast_1d(np.asarray(params, dtype=float))
+        lo, hi = domain
+        if form == "periodic":
+            return lo + np.mod(params - lo, hi - lo)
+        return np.clip(params, lo, hi)
+
+    def _pinned(self, params, steps, domain, form):
+        """Which params sit on an open edge with their step pointing out."""
+        if form == "periodic":
+            return np.zeros(params.shape, dtype=bool)
+        return (((params <= domain[0]) & (steps < 0.0)) |
+                ((params >= domain[1]) & (steps > 0.0)))
+
+    def derivatives(self, u, v, order=1):
+        """Return array of shape (N, order + 1, order + 1, 3) where
+        [i, k, l] is the kth U and lth V partial derivative at (u[i], v[i])."""
+        u = self._toDomain(u, self.domainU, self.formU)
+        v = self._toDomain(v, self.domainV, self.formV)
+        u, v = np.broadcast_arrays(u, v)
+        p, q = self.degreeU, self.degreeV
+        spanU = findSpans(self.knotsU, p, self.numCVsInU - 1, u)
+        spanV = findSpans(self.knotsV, q, self.numCVsInV - 1, v)
+        nu = basisFunsDerivs(self.knotsU, p, spanU, u, order)
+        nv = basisFunsDerivs(self.knotsV, q, spanV, v, order)
+
+        # gather the (p+1) x (q+1) block of CVs which affects each param
+        iu = spanU[:, None] - p + np.arange(p + 1)
+        iv = spanV[:, None] - q + np.arange(q + 1)
+        block = self.cvs[iu[:, :, None], iv[:, None, :]]
+        if self.weights is None:
+            return np.einsum("nka,nlb,nabc->nklc", nu, nv, block)
+
+        # rational: derivatives of the homogeneous numerator and weight,
+        # then the quotient rule ("The NURBS Book" A4.4)
+        w = self.weights[iu[:, :, None], iv[:, None, :]]
+        aders = np.einsum("nka,nlb,nabc->nklc", nu, nv, block * w[..., None])
+        wders = np.einsum("nka,nlb,nab->nkl", nu, nv, w)
+        skl = np.zeros_like(aders)
+        for k in range(order + 1):
+            for l in range(order + 1):
+                val = aders[:, k, l].copy()
+                for j in range(1, l + 1):
+                    val -= (_binomial(l, j) * wders[:, 0, j, None] *
+                            skl[:, k, l - j])
+                for i in range(1, k + 1):
+                    val -= (_binomial(k, i) * wders[:, i, 0, None] *
+                            skl[:, k - i, l])
+                    val2 = np.zeros_like(val)
+                    for j in range(1, l + 1):
+                        val2 += (_binomial(l, j) * wders[:, i, j, None] *
+                                 skl[:, k - i, l - j])
+                    val -= _binomial(k, i) * val2
+                skl[:, k, l] = val / wders[:, 0, 0, None]
+        return skl
+
+    def positions(self, u, v):
+        """(N, 3) array of surface points."""
+        return self.derivatives(u, v, order=0)[:, 0, 0]
+
+    def tangents(self, u, v, normalize=True):
+        """Return U and V tangents as two (N, 3) arrays."""
+        ders = self.derivatives(u, v, order=1)
+        tanU, tanV = ders[:, 1, 0], ders[:, 0, 1]
+        if normalize:
+            return _normalized(tanU), _normalized(tanV)
+        return tanU, tanV
+
+    def normals(self, u, v):
+        """(N, 3) array of unit normals, tangentU x tangentV like Maya."""
+        tanU, tanV = self.tangents(u, v, normalize=False)
+        return _normalized(np.cross(tanU, tanV))
+
+    def evaluate(self, u, v):
+        """Everything in one pass: positions, unit normals and unit U and V
+        tangents, each as an (N, 3) array."""
+        ders = self.derivatives(u, v, order=1)
+        tanU, tanV = ders[:, 1, 0], ders[:, 0, 1]
+        return (ders[:, 0, 0], _normalized(np.cross(tanU, tanV)),
+                _normalized(tanU), _normalized(tanV))
+
+    def seedParams(self, positions, samplesPerSpan=4):
+        """Coarse starting params for closest point queries: the nearest
+        point of an evenly spaced grid, samplesPerSpan per span."""
+        numU = max(4, samplesPerSpan * (self.numCVsInU - self.degreeU))
+        numV = max(4, samplesPerSpan * (self.numCVsInV - self.degreeV))
+        # open directions need their far edge sampled, periodic ones don't
+        u = np.linspace(self.domainU[0], self.domainU[1], numU + 1,
+                        endpoint=self.formU != "periodic")
+        v = np.linspace(self.domainV[0], self.domainV[1], numV + 1,
+                        endpoint=self.formV != "periodic")
+        u, v = [g.ravel() for g in np.meshgrid(u, v, indexing="ij")]
+        return _nearestSamples(positions, self.positions(u, v), u, v)
+
+    def closestPoints(self, positions, iterations=12, tol=1e-10, seeds=None):
+        """Project every position onto the surface at once, with a vectorized
+        Newton solve on the squared distance, seeded from a coarse grid.
+        Returns (u, v, points) as arrays of length N. Args:
+        - positions: (N, 3) array-like of points to project
+        - iterations: max number of Newton steps
+        - tol: stop once no param moves more than this
+        - seeds: optional (u, v) arrays of starting params."""
+        pts = np.atleast_2d(np.asarray(positions, dtype=float))
+        if not pts.size:
+            return np.zeros(0), np.zeros(0), np.zeros((0, 3))
+        if seeds is None:
+            u, v = self.seedParams(pts)
+        else:
+            u, v = [np.array(s, dtype=float) for s in seeds]
+
+        for _ in range(iterations):
+            ders = self.derivatives(u, v, order=2)
+            r = ders[:, 0, 0] - pts
+            su, sv = ders[:, 1, 0], ders[:, 0, 1]
+            gu, gv = _dot(r, su), _dot(r, sv)
+            guu, guv, gvv = _dot(su, su), _dot(su, sv), _dot(sv, sv)
+            huu = guu + _dot(r, ders[:, 2, 0])
+            huv = guv + _dot(r, ders[:, 1, 1])
+            hvv = gvv + _dot(r, ders[:, 0, 2])
+            # where the true hessian isn't positive definite, the newton step
+            # may head uphill - fall back to plain gauss-newton there
+            bad = (huu * hvv - huv * huv <= 0.0) | (huu <= 0.0)
+            huu = np.where(bad, guu, huu)
+            huv = np.where(bad, guv, huv)
+            hvv = np.where(bad, gvv, hvv)
+            det = huu * hvv - huv * huv
+            du = _safeDiv(huv * gv - hvv * gu, det)
+            dv = _safeDiv(huv * gu - huu * gv, det)
+            # pinned against an open edge: solve along the edge instead
+            pinU = self._pinned(u, du, self.domainU, self.formU)
+            pinV = self._pinned(v, dv, self.domainV, self.formV)
+            du = np.where(pinV & ~pinU, _safeDiv(-gu, huu), du)
+            dv = np.where(pinU & ~pinV, _safeDiv(-gv, hvv), dv)
+            du = np.where(pinU, 0.0, du)
+            dv = np.where(pinV, 0.0, dv)
+
+            # simple backtracking so nothing ends up further away
+            dist = _dot(r, r)
+            for _ in range(4):
+                newU = self._toDomain(u + du, self.domainU, self.formU)
+                newV = self._toDomain(v + dv, self.domainV, self.formV)
+                diff = self.positions(newU, newV) - pts
+                worse = _dot(diff, diff) > dist
+                if not worse.any():
+                    break
+                du = np.where(worse, du * .5, du)
+                dv = np.where(worse, dv * .5, dv)
+            newU = np.where(worse, u, newU)
+            newV = np.where(worse, v, newV)
+
+            moved = max(np.abs(newU - u).max(), np.abs(newV - v).max())
+            u, v = newU, newV
+            if moved < tol:
+                break
+
+        return u, v, self.positions(u, v)
+
+    def bezierPatches(self):
+        """Decompose the surface into its Bezier patches, one per non-empty
+        pair of knot spans. Returns (patches, rangesU, rangesV) where patches
+        is (numSpansU, numSpansV, degreeU + 1, degreeV + 1, 3) and the ranges
+        are (numSpans, 2) arrays of each span's param interval.
+        Rational surfaces are decomposed in homogeneous space, so the
+        (positive weighted) patch still lies inside its points' bounds."""
+        p, q = self.degreeU, self.degreeV
+        spansU, matsU, rangesU = _bezierConversion(
+            self.knotsU, p, self.numCVsInU)
+        spansV, matsV, rangesV = _bezierConversion(
+            self.knotsV, q, self.numCVsInV)
+        if self.weights is None:
+            pw = np.concatenate(
+                (self.cvs, np.ones(self.cvs.shape[:2] + (1,))), axis=-1)
+        else:
+            pw = np.concatenate((self.cvs * self.weights[..., None],
+                                 self.weights[..., None]), axis=-1)
+
+        iu = spansU[:, None] - p + np.arange(p + 1)
+        iv = spansV[:, None] - q + np.arange(q + 1)
+        # convert the U direction, then the V direction
+        rows = np.einsum("aij,ajvc->aivc", matsU, pw[iu])
+        patches = np.einsum("bkl,aiblc->abikc", matsV, rows[:, :, iv])
+        return patches[..., :3] / patches[..., 3:], rangesU, rangesV
+
+    def grevilleParams(self):
+        """Greville abscissae in U and V: for each row/column of CVs,
+        the param it has the most influence at. Returns (u, v) arrays."""
+        return (_greville(self.knotsU, self.degreeU, self.numCVsInU),
+                _greville(self.knotsV, self.degreeV, self.numCVsInV))
+
+    def cvGeodesics(self, seeds, samples=4):
+        """Shortest distances along the surface over the grid of the CVs'
+        Greville points, relaxed from the seeded CVs to all of them at once.
+        Each CV is joined to its 8 grid neighbours and the 8 a knight's
+        move away (which keeps oblique distances within a few percent), and
+        every link is measured as an arc length on the surface (samples
+        chords each), so the UV metric is corrected for any stretching. Args:
+        - seeds: (numCVsInU, numCVsInV) array of starting distances,
+        inf for CVs which aren't seeds.
+        Returns a (numCVsInU, numCVsInV) array of distances."""
+        gu, gv = self.grevilleParams()
+        uu, vv = np.meshgrid(gu, gv, indexing="ij")
+        numU, numV = uu.shape
+        t = np.linspace(0.0, 1.0, samples + 1)
+
+        links = []
+        for du, dv in ((1, 0), (0, 1), (1, 1), (1, -1),
+                       (2, 1), (2, -1), (1, 2), (1, -2)):
+            src = (slice(0, numU - du), slice(max(0, -dv), numV - max(0, dv)))
+            dst = (slice(du, numU), slice(max(0, dv), numV - max(0, -dv)))
+            u0, v0 = uu[src][..., None], vv[src][..., None]
+            u = u0 + (uu[dst][..., None] - u0) * t
+            v = v0 + (vv[dst][..., None] - v0) * t
+            pts = self.positions(u.ravel(), v.ravel()).reshape(u.shape + (3,))
+            lengths = np.sqrt((np.diff(pts, axis=-2) ** 2).sum(-1)).sum(-1)
+            links.append((src, dst, lengths))
+
+        dist = np.array(seeds, dtype=float)
+        for _ in range(dist.size):
+            prev = dist.copy()
+            for src, dst, lengths in links:
+                dist[dst] = np.minimum(dist[dst], dist[src] + lengths)
+                dist[src] = np.minimum(dist[src], dist[dst] + lengths)
+            # the overlapping CVs of a periodic direction are the same CVs
+            if self.formU == "periodic":
+                d = self.degreeU
+                dist[:d] = dist[-d:] = np.minimum(dist[:d], dist[-d:])
+            if self.formV == "periodic":
+                d = self.degreeV
+                dist[:, :d] = dist[:, -d:] = np.minimum(
+                    dist[:, :d], dist[:, -d:])
+            if np.array_equal(dist, prev):
+                break
+        return dist
+
+
+def _greville(knots, degree, numCVs):
+    """Greville abscissae of a full knot vector."""
+    idx = np.arange(numCVs)[:, None] + np.arange(1, degree + 1)
+    return knots[idx].mean(axis=1)
+
+
+def _bezierConversion(knots, degree, numCVs):
+    """For every non-empty knot span of one direction, find the matrix which
+    turns the span's degree + 1 B-spline CVs into Bezier CVs: sample the span
+    at degree + 1 params and solve against the Bernstein basis there.
+    Returns (span indices, matrices, param ranges)."""
+    spans = np.array([i for i in range(degree, numCVs)
+                      if knots[i + 1] > knots[i]])
+    t = np.linspace(0.0, 1.0, degree + 1)
+    bernstein = np.array([[_binomial(degree, j) * tk ** j *
+                           (1.0 - tk) ** (degree - j)
+                           for j in range(degree + 1)] for tk in t])
+    ranges = np.stack((knots[spans], knots[spans + 1]), axis=-1)
+    params = _lerpRanges(ranges, t)
+    basis = basisFunsDerivs(
+        knots, degree, np.repeat(spans, degree + 1), params.ravel(), 0)
+    basis = basis[:, 0].reshape(len(spans), degree + 1, degree + 1)
+    mats = np.array([np.linalg.solve(bernstein, b) for b in basis])
+    return spans, mats, ranges
+
+
+def _dot(a, b):
+    """Row-wise dot product of two (N, 3) arrays."""
+    return np.einsum("ij,ij->i", a, b)
+
+
+def _nearestSamples(positions, samples, u, v, chunk=2048):
+    """For each position, return the (u, v) of the nearest sample point.
+    Done in chunks to keep the distance matrix a sane size."""
+    positions = np.atleast_2d(positions)
+    sampleSq = _dot(samples, samples)
+    nearest = np.empty(len(positions), dtype=int)
+    for i in range(0, len(positions), chunk):
+        block = positions[i:i + chunk]
+        distSq = sampleSq[None, :] - 2.0 * np.dot(block, samples.T)
+        nearest[i:i + chunk] = np.argmin(distSq, axis=1)
+    return u[nearest], v[nearest]
+
+
+def _normalized(vecs):
+    """Normalize rows of an (N, 3) array, leaving zero vectors alone."""
+    lengths = np.linalg.norm(vecs, axis=-1)[..., None]
+    return vecs / np.where(lengths > 0.0, lengths, 1.0)
+
+
+class PatchBVH(object):
+    """Bounding volume hierarchy over a surface's Bezier patches, to make
+    closest point and ray queries sub-linear in the number of spans.
+    Every patch also carries a small grid of sample points, which give
+    cheap upper bounds while traversing and good Newton seeds after. Args:
+    - evaluator: the SurfaceEvaluator to build over
+    - leafSize: max number of patches per leaf node
+    - samples: samples per patch in each direction, corners included."""
+    def __init__(self, evaluator, leafSize=4, samples=4):
+        self.evaluator = evaluator
+        patches, rangesU, rangesV = evaluator.bezierPatches()
+        numU, numV = patches.shape[:2]
+        pts = patches.reshape(numU * numV, -1, 3)
+        self.patchMins = pts.min(axis=1)
+        self.patchMaxs = pts.max(axis=1)
+        self.rangesU = np.repeat(rangesU, numV, axis=0)
+        self.rangesV = np.tile(rangesV, (numU, 1))
+
+        t = np.linspace(0.0, 1.0, samples)
+        su = _lerpRanges(self.rangesU, t)
+        sv = _lerpRanges(self.rangesV, t)
+        # (numPatches, samples * samples) params and points
+        self.sampleU = np.repeat(su, samples, axis=1)
+        self.sampleV = np.tile(sv, (1, samples))
+        self.samplePts = evaluator.positions(
+            self.sampleU.ravel(), self.sampleV.ravel()).reshape(
+                self.sampleU.shape + (3,))
+        self._build(leafSize)
+
+    @property
+    def numPatches(self):
+        return len(self.patchMins)
+
+    def _build(self, leafSize):
+        """Top-down median split along each node's longest axis.
+        Nodes are stored flat; leaves index into self.order."""
+        centers = (self.patchMins + self.patchMaxs) * .5
+        mins, maxs, left, right, start, count = [], [], [], [], [], []
+        reps, order = [], []
+        stack = [(np.arange(self.numPatches), None, None)]
+        while stack:
+            idx, parent, side = stack.pop()
+            node = len(mins)
+            if parent is not None:
+                (left if side == 0 else right)[parent] = node
+            mins.append(self.patchMins[idx].min(axis=0))
+            maxs.append(self.patchMaxs[idx].max(axis=0))
+            left.append(-1)
+            right.append(-1)
+            reps.append(idx[len(idx) // 2])
+            if len(idx) <= leafSize:
+                start.append(len(order))
+                count.append(len(idx))
+                order.extend(idx)
+                continue
+            start.append(0)
+            count.append(0)
+            axis = np.argmax(maxs[-1] - mins[-1])
+            idx = idx[np.argsort(centers[idx, axis], kind="mergesort")]
+            reps[-1] = idx[len(idx) // 2]
+            half = len(idx) // 2
+            stack.append((idx[half:], node, 1))
+            stack.append((idx[:half], node, 0))
+
+        self.nodeMins, self.nodeMaxs = np.array(mins), np.array(maxs)
+        self.left, self.right = np.array(left), np.array(right)
+        self.start, self.count = np.array(start), np.array(count)
+        self.order = np.array(order, dtype=int)
+        self.isLeaf = self.left < 0
+        # one surface point per node, from a patch near its middle -
+        # gives an upper bound on the distance before reaching any leaf
+        mid = self.samplePts.shape[1] // 2
+        self.nodeRepPatch = np.array(reps, dtype=int)
+        self.nodeRepPts = self.samplePts[self.nodeRepPatch, mid]
+        self.nodeRepU = self.sampleU[self.nodeRepPatch, mid]
+        self.nodeRepV = self.sampleV[self.nodeRepPatch, mid]
+
+    def _leafPatches(self, queries, nodes):
+        """Expand (query, leaf node) pairs into (query, patch) pairs."""
+        counts = self.count[nodes]
+        reps = np.repeat(np.arange(len(nodes)), counts)
+        offsets = np.arange(len(reps)) - np.repeat(np.cumsum(counts) - counts,
+                                                   counts)
+        return queries[reps], self.order[self.start[nodes][reps] + offsets]
+
+    def closestPoints(self, positions, iterations=12, tol=1e-10):
+        """Same as SurfaceEvaluator.closestPoints, but the seeds come from a
+        pruned traversal of the hierarchy instead of a whole-surface grid.
+        Returns (u, v, points) arrays."""
+        pts = np.atleast_2d(np.asarray(positions, dtype=float))
+        if not pts.size:
+            return np.zeros(0), np.zeros(0), np.zeros((0, 3))
+        bound = np.full(len(pts), np.inf)
+        seedU, seedV = np.zeros(len(pts)), np.zeros(len(pts))
+        queries = np.arange(len(pts))
+        nodes = np.zeros(len(pts), dtype=int)
+        # level by level, all queries at once
+        while len(queries):
+            # every node's representative point tightens the bound...
+            diff = self.nodeRepPts[nodes] - pts[queries]
+            repDist = _dot(diff, diff)
+            rq, pick = _improved(queries, repDist, bound)
+            seedU[rq] = self.nodeRepU[nodes[pick]]
+            seedV[rq] = self.nodeRepV[nodes[pick]]
+            # ...then prune any box which is already further than that
+            dist = _boxDistSq(pts[queries], self.nodeMins[nodes],
+                              self.nodeMaxs[nodes])
+            keep = dist <= bound[queries]
+            queries, nodes = queries[keep], nodes[keep]
+
+            leaf = self.isLeaf[nodes]
+            lq, patch = self._leafPatches(queries[leaf], nodes[leaf])
+            if len(lq):
+                diff = self.samplePts[patch] - pts[lq][:, None]
+                sampleDist = np.einsum("nsc,nsc->ns", diff, diff)
+                nearest = np.argmin(sampleDist, axis=1)
+                sampleDist = sampleDist[np.arange(len(lq)), nearest]
+                lq, pick = _improved(lq, sampleDist, bound)
+                seedU[lq] = self.sampleU[patch[pick], nearest[pick]]
+                seedV[lq] = self.sampleV[patch[pick], nearest[pick]]
+
+            inner = ~leaf
+            queries = np.concatenate((queries[inner], queries[inner]))
+            nodes = np.concatenate(
+                (self.left[nodes[inner]], self.right[nodes[inner]]))
+
+        return self.evaluator.closestPoints(
+            pts, iterations=iterations, tol=tol, seeds=(seedU, seedV))
+
+    def intersectRays(self, origins, directions, iterations=8, tol=1e-7):
+        """First hit of each ray with the surface. Candidate patches come
+        from a slab test against the hierarchy, then each candidate is
+        refined with a small Newton solve on S(u, v) = origin + t * dir,
+        seeded from the patch sample nearest the ray.
+        Returns (hit, u, v, t, points) - misses have hit False and
+        t set to inf. Args:
+        - origins, directions: (N, 3) array-likes, or a single ray each
+        - iterations: max Newton steps per candidate
+        - tol: max distance between ray and surface to count as a hit."""
+        origins = np.atleast_2d(np.asarray(origins, dtype=float))
+        dirs = np.atleast_2d(np.asarray(directions, dtype=float))
+        origins, dirs = np.broadcast_arrays(origins, dirs)
+        num = len(origins)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            invDirs = 1.0 / dirs
+
+        # gather every (ray, patch) pair whose boxes the ray passes through
+        rays = np.arange(num)
+        nodes = np.zeros(num, dtype=int)
+        candRays, candPatches = [], []
+        while len(rays):
+            keep = _slabHits(origins[rays], invDirs[rays],
+                             self.nodeMins[nodes], self.nodeMaxs[nodes])
+            rays, nodes = rays[keep], nodes[keep]
+            leaf = self.isLeaf[nodes]
+            lr, patch = self._leafPatches(rays[leaf], nodes[leaf])
+            candRays.append(lr)
+            candPatches.append(patch)
+            inner = ~leaf
+            rays = np.concatenate((rays[inner], rays[inner]))
+            nodes = np.concatenate(
+                (self.left[nodes[inner]], self.right[nodes[inner]]))
+
+        hit = np.zeros(num, dtype=bool)
+        u, v = np.zeros(num), np.zeros(num)
+        t = np.full(num, np.inf)
+        cr, cp = np.concatenate(candRays), np.concatenate(candPatches)
+        if not len(cr):
+            return hit, u, v, t, np.zeros((num, 3))
+
+        o, d = origins[cr], dirs[cr]
+        # seed from the sample nearest the ray's line
+        rel = self.samplePts[cp] - o[:, None]
+        along = np.einsum("nsc,nc->ns", rel, d) / _dot(d, d)[:, None]
+        off = rel - along[..., None] * d[:, None]
+        nearest = np.argmin(np.einsum("nsc,nsc->ns", off, off), axis=1)
+        idx = np.arange(len(cr))
+        cu = self.sampleU[cp, nearest]
+        cv = self.sampleV[cp, nearest]
+        ct = along[idx, nearest]
+        loU, hiU = self.rangesU[cp].T
+        loV, hiV = self.rangesV[cp].T
+        for _ in range(iterations):
+            ders = self.evaluator.derivatives(cu, cv, order=1)
+            su, sv = ders[:, 1, 0], ders[:, 0, 1]
+            r = ders[:, 0, 0] - o - ct[:, None] * d
+            # solve [su sv -d] * step = -r with cramer's rule
+            det = _dot(su, np.cross(sv, -d))
+            cu = np.clip(cu + _safeDiv(_dot(-r, np.cross(sv, -d)), det),
+                         loU, hiU)
+            cv = np.clip(cv + _safeDiv(_dot(su, np.cross(-r, -d)), det),
+                         loV, hiV)
+            ct = ct + _safeDiv(_dot(su, np.cross(sv, -r)), det)
+
+        pts = self.evaluator.positions(cu, cv)
+        r = pts - o - ct[:, None] * d
+        good = (_dot(r, r) <= tol * tol) & (ct >= 0.0)
+        cr, cu, cv, ct = cr[good], cu[good], cv[good], ct[good]
+        # keep the nearest hit along each ray
+        order = np.lexsort((ct, cr))
+        cr, first = np.unique(cr[order], return_index=True)
+        pick = order[first]
+        hit[cr] = True
+        u[cr], v[cr], t[cr] = cu[pick], cv[pick], ct[pick]
+        points = origins + np.where(hit, t, 0.0)[:, None] * dirs
+        points[hit] = self.evaluator.positions(u[hit], v[hit])
+        return hit, u, v, t, points
+
+
+def _improved(queries, dist, bound):
+    """Find each query's nearest candidate, keep only those which beat the
+    query's current bound and lower the bound to match (in place).
+    Returns (queries, candidate indices) of the improvements."""
+    order = np.lexsort((dist, queries))
+    queries, first = np.unique(queries[order], return_index=True)
+    pick = order[first]
+    better = dist[pick] < bound[queries]
+    queries, pick = queries[better], pick[better]
+    bound[queries] = dist[pick]
+    return queries, pick
+
+
+def _lerpRanges(ranges, t):
+    """(N, len(t)) params spread evenly across each of N param ranges."""
+    return ranges[:, :1] + t * (ranges[:, 1:] - ranges[:, :1])
+
+
+def _boxDistSq(points, mins, maxs):
+    """Squared distance from each point to its axis aligned box."""
+    gap = np.maximum(mins - points, 0.0) + np.maximum(points - maxs, 0.0)
+    return _dot(gap, gap)
+
+
+def _slabHits(origins, invDirs, mins, maxs):
+    """Whether each ray passes through its (slightly padded) box ahead of
+    its origin. Zero direction components give infs, which the slab test
+    handles as long as nan comparisons count as misses."""
+    pad = 1e-9 * (1.0 + np.abs(maxs - mins).max(axis=1))[:, None]
+    with np.errstate(invalid="ignore"):
+        t1 = (mins - pad - origins) * invDirs
+        t2 = (maxs + pad - origins) * invDirs
+        near = np.nanmax(np.minimum(t1, t2), axis=1)
+        far = np.nanmin(np.maximum(t1, t2), axis=1)
+    return (far >= np.maximum(near, 0.0))
+
+
+def mirrorCVs(cvs, mirVec):
+    """Mirror a (numCVsInU, numCVsInV, 3) CV grid across the plane of mirVec
+    (an axis vector), reversing U so the mirrored surface's normal still
+    faces the same way relative to its shape."""
+    flip = np.where(np.asarray(mirVec, dtype=float) != 0.0, -1.0, 1.0)
+    return np.asarray(cvs, dtype=float)[::-1] * flip
+
+
+def mirrorCVIndices(numU, numV):
+    """Flat CV index permutation between a surface and its mirror made by
+    mirrorCVs (U reversed): CV i of the mirror corresponds exactly to CV
+    mirrorCVIndices(numU, numV)[i] of the original. Any per-CV array,
+    eg deformer weights, is mirrored by indexing with it."""
+    return np.arange(numU * numV).reshape(numU, numV)[::-1].ravel()
+
+
+def uniformKnots(numSpans, degree=3, periodic=False):
+    """Maya-style uniform knot vector over the 0-1 range. Open curves are
+    clamped at both ends, periodic ones just keep going past them."""
+    if periodic:
+        return np.arange(1 - degree, numSpans + degree, dtype=float) / numSpans
+    return np.concatenate((np.zeros(degree - 1),
+                           np.linspace(0.0, 1.0, numSpans + 1),
+                           np.ones(degree - 1)))
+
+
+def curveBasis(knots, degree, numCVs, params, periodic=False):
+    """(len(params), numCVs) matrix of basis function values, so that
+    curve points are basis.dot(cvs). For periodic curves the overlapping
+    last degree CVs are folded onto the first ones, so the matrix only has
+    numCVs - degree columns, one per unique CV."""
+    full = fullKnots(knots, degree)
+    params = np.asarray(params, dtype=float)
+    spans = findSpans(full, degree, numCVs - 1, params)
+    funs = basisFunsDerivs(full, degree, spans, params, 0)[:, 0]
+    cols = spans[:, None] - degree + np.arange(degree + 1)
+    numCols = numCVs - degree if periodic else numCVs
+    basis = np.zeros((len(params), numCols))
+    rows = np.repeat(np.arange(len(params)), degree + 1)
+    np.add.at(basis, (rows, cols.ravel() % numCols), funs.ravel())
+    return basis
+
+
+def chordParams(points, closed=False):
+    """Chord length params in the 0-1 range for an ordered run of points.
+    A closed run's closing segment counts too, so its last point
+    stays short of 1."""
+    points = np.asarray(points, dtype=float)
+    if closed:
+        points = np.concatenate((points, points[:1]))
+    lengths = np.linalg.norm(np.diff(points, axis=0), axis=1)
+    params = np.concatenate(([0.0], np.cumsum(lengths)))
+    params /= params[-1] if params[-1] > 0.0 else 1.0
+    return params[:-1] if closed else params
+
+
+def startLoopOnPlane(points, normal, origin=(0, 0, 0)):
+    """Reorder a closed loop of points so it starts where it crosses the
+    plane, with the exact crossing point inserted first. A loop can cross
+    a plane more than once - the first crossing in loop order wins.
+    Returns None if the loop doesn't cross the plane at all."""
+    points = np.asarray(points, dtype=float)
+    dist = (points - origin).dot(np.asarray(normal, dtype=float))
+    nextDist = np.roll(dist, -1)
+    onPlane = np.flatnonzero(dist == 0.0)
+    if len(onPlane):
+        return np.roll(points, -onPlane[0], axis=0)
+    crossing = np.flatnonzero(dist * nextDist < 0.0)
+    if not len(crossing):
+        return None
+    i = crossing[0]
+    t = dist[i] / (dist[i] - nextDist[i])
+    j = (i + 1) % len(points)
+    pt = points[i] + t * (points[j] - points[i])
+    return np.concatenate(([pt], np.roll(points, -j, axis=0)))
+
+
+def fitCurve(points, numSpans, degree=3, periodic=False, smoothing=1e-4):
+    """Least squares B-spline fit to an ordered run of points, with uniform
+    knots and chord length params. Open curves pass exactly through the
+    first and last points. A light penalty on the CVs' second differences
+    keeps them sane when there are hardly more points than CVs.
+    Returns (cvs, knots) ready for pmc.curve - a periodic curve's CVs
+    include its overlapping last degree CVs. Args:
+    - points: (N, 3) ordered points. Closed loops shouldn't repeat the first
+    - numSpans: spans of the resulting curve
+    - periodic: fit a closed, periodic curve to a loop of points
+    - smoothing: weight of the second difference penalty, per point."""
+    if periodic and numSpans < degree:
+        raise ValueError("A periodic degree {0} curve needs at least {0} "
+                         "spans, not {1}".format(degree, numSpans))
+    points = np.asarray(points, dtype=float)
+    numCVs = numSpans + degree
+    knots = uniformKnots(numSpans, degree, periodic)
+    params = chordParams(points, closed=periodic)
+    basis = curveBasis(knots, degree, numCVs, params, periodic)
+    numCols = basis.shape[1]
+
+    diffs = _differences(numCols, 2, periodic)
+    weight = (smoothing * len(points)) ** .5
+
+    if periodic:
+        lhs = np.concatenate((basis, weight * diffs))
+        rhs = np.concatenate((points, np.zeros((len(diffs), 3))))
+        cvs = np.linalg.lstsq(lhs, rhs, rcond=None)[0]
+        return np.concatenate((cvs, cvs[:degree])), knots
+
+    # pin the end CVs to the end points, solve for the ones between
+    ends = points[[0, -1]]
+    inner = basis[:, 1:-1]
+    lhs = np.concatenate((inner, weight * diffs[:, 1:-1]))
+    rhs = np.concatenate((points - basis[:, [0, -1]].dot(ends),
+                          -weight * diffs[:, [0, -1]].dot(ends)))
+    cvs = np.linalg.lstsq(lhs, rhs, rcond=None)[0]
+    return np.concatenate((ends[:1], cvs, ends[1:])), knots
+
+
+def _differences(num, order=2, periodic=False):
+    """Matrix of the order-th finite differences of num values,
+    wrapping around if periodic."""
+    stencil = np.diff(np.eye(order + 1), n=order, axis=0)[0]
+    rows = num if periodic else max(num - order, 0)
+    diffs = np.zeros((rows, num))
+    for i in range(rows):
+        np.add.at(diffs[i], (i + np.arange(order + 1)) % num, stencil)
+    return diffs
+
+
+def planarParams(points):
+    """Params for scattered points by projection onto their best fit plane:
+    U along the direction of greatest spread, V across it, both
+    stretched to fill the 0-1 range. Returns (u, v) arrays."""
+    points = np.asarray(points, dtype=float)
+    centered = points - points.mean(axis=0)
+    axes = np.linalg.svd(centered, full_matrices=False)[2][:2]
+    proj = centered.dot(axes.T)
+    lo, hi = proj.min(axis=0), proj.max(axis=0)
+    proj = (proj - lo) / np.where(hi > lo, hi - lo, 1.0)
+    return proj[:, 0], proj[:, 1]
+
+
+def fitSurface(points, u, v, spansU, spansV, degree=3, smoothing=1e-4):
+    """Least squares fit of an open, uniform knot NURBS surface to scattered
+    points at the given params. A smoothness penalty on the CVs' second
+    differences (plus the twist term) settles any CVs with little or no
+    data near them, eg the corners of a surface fit to a round region.
+    Returns (cvs, knotsU, knotsV), cvs being (numCVsInU, numCVsInV, 3).
+    Args:
+    - points: (N, 3) array of points to fit
+    - u, v: param of each point, in the 0-1 range (see planarParams)
+    - spansU, spansV: spans of the resulting surface
+    - smoothing: weight of the smoothness penalty, per point. Higher is
+        flatter, lower follows the points more closely."""
+    points = np.asarray(points, dtype=float)
+    numU, numV = spansU + degree, spansV + degree
+    knotsU = uniformKnots(spansU, degree)
+    knotsV = uniformKnots(spansV, degree)
+    basisU = curveBasis(knotsU, degree, numU, u)
+    basisV = curveBasis(knotsV, degree, numV, v)
+    # tensor product basis, columns in u-major CV order
+    basis = (basisU[:, :, None] * basisV[:, None, :]).reshape(
+        len(points), numU * numV)
+
+    penalty = np.concatenate((
+        np.kron(_differences(numU, 2), np.eye(numV)),
+        np.kron(np.eye(numU), _differences(numV, 2)),
+        np.kron(_differences(numU, 1), _differences(numV, 1)) * 2 ** .5))
+    weight = (smoothing * len(points)) ** .5
+    lhs = np.concatenate((basis, weight * penalty))
+    rhs = np.concatenate((points, np.zeros((len(penalty), 3))))
+    cvs = np.linalg.lstsq(lhs, rhs, rcond=None)[0]
+    return cvs.reshape(numU, numV, 3), knotsU, knotsV
+
+
+def evalRamp(x, positions, values, interps):
+    """Evaluate a ramp curve (as in remapValue/softSelect) at all x at once.
+    Each key's interp sets how the segment after it is interpolated:
+    0 none (hold), 1 linear, 2 smooth, 3 spline. Outside the keys,
+    the end values hold. Args:
+    - positions, values, interps: key arrays, sorted by position."""
+    x = np.asarray(x, dtype=float)
+    if len(positions) == 1:
+        return np.full(x.shape, values[0])
+
+    x = np.clip(x, positions[0], positions[-1])
+    seg = np.clip(np.searchsorted(positions, x, side="right") - 1,
+                  0, len(positions) - 2)
+    x0, v0, v1 = positions[seg], values[seg], values[seg + 1]
+    h = positions[seg + 1] - x0
+    t = (x - x0) / np.where(h > 0, h, 1.0)
+    kind = interps[seg]
+
+    s = np.select([kind == 0, kind == 2],
+                  [np.zeros_like(t), t * t * (3 - 2 * t)], t)
+    out = v0 + (v1 - v0) * s
+
+    spline = kind == 3
+    if spline.any():
+        # cubic hermite, tangents from the neighbouring keys
+        tangents = np.empty(len(values))
+        tangents[1:-1] = ((values[2:] - values[:-2]) /
+                          (positions[2:] - positions[:-2]))
+        tangents[0] = (values[1] - values[0]) / (positions[1] - positions[0])
+        tangents[-1] = ((values[-1] - values[-2]) /
+                        (positions[-1] - positions[-2]))
+        t, h, seg = t[spline], h[spline], seg[spline]
+        t2, t3 = t * t, t * t * t
+        out[spline] = ((2 * t3 - 3 * t2 + 1) * v0[spline] +
+                       (t3 - 2 * t2 + t) * h * tangents[seg] +
+                       (3 * t2 - 2 * t3) * v1[spline] +
+                       (t3 - t2) * h * tangents[seg + 1])
+    # past the last key, even a held segment has ended
+    out[x >= positions[-1]] = values[-1]
+    return out
+
+
+
+# a fitSurface takes about 1e-7 s per (point x CV), while spawning the
+# workers (each importing numpy, far slower from mayapy) takes around a
+# second, so a pool is only worth it for about 2 s of serial work.
+# Curve fits never come close, and are always run serially.
+PARALLEL_MIN_WORK = 2e7
+
+
+def mapJobs(func, jobs, work, maxWorkers=None, executable=None):
+    """Return [func(*job) for job in jobs], run in a pool of worker processes
+    when there's enough work to be worth it, more than one CPU and
+    concurrent.futures is available - otherwise, or if the pool can't start,
+    serially. func has to be a module level function and the jobs plain
+    data (eg arrays), so they can be sent to the workers. Args:
+    - work: estimated cost of all the jobs, as their total number of
+        fitted points times CVs (see PARALLEL_MIN_WORK)
+    - maxWorkers: max number of processes, default one per CPU
+    - executable: python interpreter for the workers. Inside Maya this has
+        to be mayapy, since sys.executable is Maya itself."""
+    jobs = list(jobs)
+    if (futures is None or work < PARALLEL_MIN_WORK or len(jobs) < 2 or
+            multiprocessing.cpu_count() < 2):
+        return [func(*job) for job in jobs]
+
+    # the spawn executable is global to multiprocessing: only swap it
+    # while the workers start (they all do so in pool.map), then restore it
+    context = multiprocessing.get_context("spawn")
+    oldExecutable = spawn.get_executable()
+    try:
+        if executable:
+            context.set_executable(executable)
+        with futures.ProcessPoolExecutor(maxWorkers,
+                                         mp_context=context) as pool:
+            return list(pool.map(func, *zip(*jobs)))
+    except (OSError, BrokenProcessPool):
+        return [func(*job) for job in jobs]
+    finally:
+        context.set_executable(oldExecutable)
@@ -1,8 +1,10 @@
+import numpy as np
 import pymel.core as pmc
 from functools import partial
 
 from bkTools.mayaSceneUtil import mergeShapes, addShapeToTrans, nextAvailableIndex,\
     get_selected_cb_attrs, readJson, writeJson
+from bkTools import meshUtil, matrixUtil as mu, surfaceUtil as su
 
 __author__ = "Brendan Kelly"
 __email__ = "clamdragon@gmail.com"
@@ -85,16 +87,8 @@ def mirror_guides(cmpnts=None, axis="x", behavior=True):
     :return: None
     """
     # construct world reflection matrix
-    ref_mtx = pmc.dt.Matrix()
-    for i, ax in enumerate("xyz"):
-        if ax in axis.lower():
-            ref_mtx[i] *= -1
-
-    behavior_mtx = pmc.dt.Matrix()
-    if behavior:
-        behavior_mtx[0] *= -1
-        behavior_mtx[1] *= -1
-        behavior_mtx[2] *= -1
+    ref_mtx = np.diag([-1.0 if ax in axis.lower() else 1.0 for ax in "xyz"] + [1.0])
+    behavior_mtx = np.diag([-1.0, -1.0, -1.0, 1.0] if behavior else [1.0] * 4)
 
     func = mirror_cmpnts
     if cmpnts is None:
@@ -105,19 +99,21 @@ def mirror_guides(cmpnts=None, axis="x", behavior=True):
             cmpnts = pmc.selected(transforms=True)
             func = mirror_hierarchy_flat
 
-    l = len(cmpnts) / 2
-    func(zip(cmpnts[:l], cmpnts[l:]), ref_mtx, behavior_mtx)
+    l = len(cmpnts) // 2
+    func(list(zip(cmpnts[:l], cmpnts[l:])), ref_mtx, behavior_mtx)
 
 
-def mirror_cmpnts(cmpnts, ref_mtx, behavior_mtx):
+def mirror_cmpnts(cmpnts, ref_mtx, behavior_mtx, dirty=True):
     """
     Traverse container objects to find their guides and all nested cmpnts.
-    :param cmpnt: component which will be affected by this mirroring
-    :param target_cmpnt: component which will be targeted for worldspace mirroring
-    :param axis: world axis (combo) over which to reflect
-    :param behavior: whether or not to apply a local fix to the guides to mirror rotations over translation
-    :return:
+    :param cmpnts: zipped list of (component which will be affected by this mirroring,
+    component which will be targeted for worldspace mirroring)
+    :param ref_mtx: reflection matrix
+    :param behavior_mtx: local fix matrix, to flip the axes for mirrored rotation over translation
+    :param dirty: whether or not to dgdirty everything mirrored once at the end
+    :return: list of all mirrored guides
     """
+    mirrored = []
     for cmpnt, target_cmpnt in cmpnts:
         try:
             objs = ((cmpnt.guideNode.get(), target_cmpnt.guideNode.get()),)
@@ -125,46 +121,56 @@ def mirror_cmpnts(cmpnts, ref_mtx, behavior_mtx):
             # could be DAG container and not an actual cmpnt. continue traversal.
             pass
         else:
-            mirror_hierarchy_flat(objs, ref_mtx, behavior_mtx)
+            mirrored.extend(mirror_hierarchy_flat(objs, ref_mtx, behavior_mtx, dirty=False))
 
-        mirror_cmpnts(zip(child_cmpnts(cmpnt), child_cmpnts(target_cmpnt)), ref_mtx, behavior_mtx)
+        mirrored.extend(mirror_cmpnts(
+            zip(child_cmpnts(cmpnt), child_cmpnts(target_cmpnt)), ref_mtx, behavior_mtx, dirty=False))
 
+    if dirty and mirrored:
+        pmc.dgdirty(mirrored)
+    return mirrored
 
-def mirror_hierarchy_flat(objs, ref_mtx, behavior_mtx):
+
+def mirror_hierarchy_flat(objs, ref_mtx, behavior_mtx, dirty=True):
     """
-    Flat mirroring - siblings first, THEN children.
-    :param children: zipped list of guide transforms which will be mirrored onto, and mirroed from
+    Flat mirroring - siblings first, THEN children. Each level's world matrices are
+    read in one pass and reflected in one vectorized multiply, since a level's
+    sources may be moved by the level above.
+    :param objs: zipped list of guide transforms which will be mirrored onto, and mirrored from
     :param ref_mtx: reflection matrix. default x axis reflection
     :param behavior_mtx: local fix matrix, to flip the axes for mirrored rotation over translation
-    :return: None
+    :param dirty: whether or not to dgdirty everything mirrored once at the end
+    :return: list of all mirrored transforms
     """
-    for obj, targ_obj in objs:
-        mirror_obj(obj, targ_obj, ref_mtx, behavior_mtx)
-
-    for ch, targ_ch in objs:
-        next_level = zip(ch.getChildren(), targ_ch.getChildren())
-        mirror_hierarchy_flat(next_level, ref_mtx, behavior_mtx)
-
+    ref_mtx = np.array(ref_mtx.tolist(), dtype=float)
+    behavior_mtx = np.array(behavior_mtx.tolist(), dtype=float)
+    xform = pmc.nt.Transform
+
+    mirrored = []
+    level = [(o, t) for o, t in objs if isinstance(o, xform) and isinstance(t, xform)]
+    while level:
+        world_mtxs = mu.getWorldMatrices([t for o, t in level])
+        reflected = np.matmul(np.matmul(behavior_mtx, world_mtxs), ref_mtx)
+        for (obj, targ_obj), mtx in zip(level, reflected):
+            set_reflected_matrix(obj, mtx)
+            mirrored.append(obj)
+
+        level = [pair for obj, targ_obj in level for pair in zip(
+            [c for c in obj.getChildren() if isinstance(c, xform)],
+            [c for c in targ_obj.getChildren() if isinstance(c, xform)])]
+
+    if dirty and mirrored:
+        # refresh (cause maya can be dumb)
+        pmc.dgdirty(mirrored)
+    return mirrored
 
-def mirror_obj(this, mir, ref_mtx, behavior_mtx):
-    """Perform a reflection about given matrix on t and its children with respect to mir.
-    Also copies user-defined attribute values."""
 
-    try:
-        reflected_target = pmc.dt.TransformationMatrix(behavior_mtx * mir.wm.get() * ref_mtx)
-        reflected_target.setScale((1, 1, 1), space="transform")
-        this.setMatrix(reflected_target, ws=True)
-        # refresh (cause maya can be dumb)
-        pmc.dgdirty(this)
-    except AttributeError:
-        pass
-    except:
-        raise
+def set_reflected_matrix(this, reflected):
+    """Set the worldspace matrix of this to the given (4, 4) reflected matrix, at standard scale."""
+    reflected_target = pmc.dt.TransformationMatrix(pmc.dt.Matrix(reflected.tolist()))
+    reflected_target.setScale((1, 1, 1), space="transform")
+    this.setMatrix(reflected_target, ws=True)
 
-    # user-defined, numeric attrs
-    # NOPE, flip_orientation should be ignored
-    # for a, ta in zip(this.listAttr(ud=True, o=True), mir.listAttr(ud=True, o=True)):
-    #     a.set(ta.get())
 
 def save_guide_xforms(n=None):
     """Read guide xform values from the current sceneand save to file."""
@@ -270,9 +276,19 @@ def makeParGrp(obj=None):
 
 
 def get_avg_pos():
-    cmpnts = pmc.selected(flatten=True)
-    verts = set(v for c in cmpnts for v in c.connectedVertices())
-    return sum(v.getPosition(space="world") for v in verts) / len(verts)
+    """Average world position of the vertices connected to the selected
+    mesh components (a vertex's are its neighbours, as with PyMEL's
+    connectedVertices), looked up in bulk per mesh and component type."""
+    groups = {}
+    for c in pmc.selected(flatten=True):
+        groups.setdefault((c.node(), type(c)), []).append(c)
+    verts = {}
+    for cmpnts in groups.values():
+        mesh, comp_type, indices = su.getCmpntIndices(cmpnts)
+        conn = su.getMeshTopology(mesh).connected(indices, comp_type, "Vertices")
+        verts[mesh] = np.union1d(verts.get(mesh, []), conn).astype(int)
+    total = sum(su.getMeshPoints(mesh)[v].sum(axis=0) for mesh, v in verts.items())
+    return pmc.dt.Point(*(total / sum(len(v) for v in verts.values())))
 
 
 def make_jnt_at_avg_pos():
@@ -424,18 +440,22 @@ def make_hair_joint_chain(obj, step=5):
     n = obj.name().split("_")
     n.append("rig{:02d}")
     pmc.select(cl=True)
-    edge_indices = pmc.polySelect(obj, edgeLoop=0, noSelection=True)[::-step]
+    topo = su.getMeshTopology(obj)
+    points = su.getMeshPoints(obj)
+    # ordered from the loop's lowest index end vertex (a generated tube's
+    # root), so the chain never flips with the direction of the walk
+    edge_indices = topo.sortEdgeChain(topo.edgeLoop(0))[1][::-step]
     jnts = []
     for ni, i in enumerate(edge_indices):
-        ring = pmc.polySelect(obj, edgeRing=i, noSelection=True)
+        ring = topo.edgeRing(i).tolist()
         vi = 0
         if len(ring) == 1:
             # see if its index-1 vertex is either the first or last
             # (pinch point breaks edge ring)
-            if obj.e[ring[0]].connectedVertices()[1] in (obj.vtx[0], obj.vtx[-1]):
+            if topo.edges[ring[0], 1] in (0, topo.numVerts - 1):
                 vi = 1
-        avg_pos = sum(obj.e[ri].getPoint(vi, space="world") for ri in ring) \
-                  / len(ring)
+        avg_pos = pmc.dt.Point(*meshUtil.meanPosition(
+            points, topo.edges[ring, vi]))
 
         if ni:
             # get eulers that transform from default to aim vector (local)
@@ -459,13 +479,11 @@ def make_curve_for_cards(cards=None, numCVs=5):
     """
     if not cards:
         cards = pmc.selected()
-    cvs = []
-    for i in range(numCVs):
-        total = sum(c.vtx[i*2].getPosition() + c.vtx[i*2+1].getPosition() for c in cards)
-        avg = total / (len(cards) * 2.0)
-        cvs.append(avg)
+    # each pair of verts across a card makes one CV
+    pts = [su.getMeshPoints(c, "object")[:numCVs * 2] for c in cards]
+    cvs = np.mean(pts, axis=0).reshape(numCVs, 2, 3).mean(axis=1)
 
-    return pmc.curve(d=3, p=cvs)
+    return pmc.curve(d=3, p=cvs.tolist())
 
 
 def make_joints_for_cards(cards=None, head_jnt=None, numCVs=5, w=2):
@@ -1,7 +1,9 @@
 import pymel.core as pmc
 import logging
+import numpy as np
 
 from pymel import core as pmc
+import matrixUtil as mu
 
 """
 Utilities centered around Maya smooth bindings.
@@ -88,28 +90,90 @@ def skin_chain_to_tube(obj, jnts):
                     weightDistribution=1, dropoffRate=dropoff)
 
 
+def getInfluences(skinClus):
+    """Return (matrix indices, influence nodes) of the skinCluster's
+    connected influences, from one connection query. Indices may be
+    sparse, so they're needed to line influences up with bindPreMatrix."""
+    conns = pmc.listConnections(skinClus.matrix, source=True,
+                                destination=False, connections=True)
+    return [p.index() for p, _ in conns], [j for _, j in conns]
+
+
+def resetBindPoses(skinClusters):
+    """Make the current pose of all influences the bind pose of the given
+    skinClusters. Each skin's whole bindPreMatrix array is reset by
+    Maya's own undoable moveJointsMode round trip (on connects it to the
+    influences' worldInverseMatrix, off keeps the current values), then
+    see resetDagPoses."""
+    skinClusters = list(skinClusters)
+    for sc in skinClusters:
+        sc.moveJointsMode(True)
+        sc.moveJointsMode(False)
+    resetDagPoses(skinClusters)
+
+
+def resetDagPoses(skinClusters):
+    """Recache the skinClusters' bind matrices and reset their bind poses
+    to the current pose, each bind pose shared by several skins just once.
+    Call after their bindPreMatrix is updated (eg by moveJointsMode)."""
+    poses = {}
+    for sc in skinClusters:
+        sc.recacheBindMatrices()
+        bindPose = sc.bindPose.get()
+        if bindPose:
+            poses.setdefault(bindPose, set()).update(getInfluences(sc)[1])
+
+    for bindPose, jnts in poses.items():
+        pmc.dagPose(list(jnts), n=bindPose, reset=True)
+
+
+def getJntsOffBindPose(skinClusters, tol=1e-4):
+    """Check every influence of the skinClusters against its bind pose at
+    once: all world matrices come from one query, each skin's
+    bindPreMatrix from one getAttr, and world * bindPreMatrix must be
+    identity within tol. Returns a dict of skinCluster: [influences not at
+    bind pose], only for skins which have any."""
+    skinClusters = list(skinClusters)
+    infs = [getInfluences(sc) for sc in skinClusters]
+    allJnts = list(set(j for _, jnts in infs for j in jnts))
+    if not allJnts:
+        return {}
+    row = dict((j, i) for i, j in enumerate(allJnts))
+    worlds = mu.getWorldMatrices(allJnts)
+
+    offPose = {}
+    for sc, (indices, jnts) in zip(skinClusters, infs):
+        if not jnts:
+            continue
+        plug = sc.bindPreMatrix
+        stored = dict(zip(plug.getArrayIndices(), np.reshape(
+            np.array(plug.get(), dtype=float), (-1, 4, 4))))
+        bindPre = np.array([stored.get(i, np.identity(4)) for i in indices])
+        err = np.abs(np.matmul(worlds[[row[j] for j in jnts]], bindPre)
+                     - np.identity(4)).max(axis=(1, 2))
+        bad = [j for j, e in zip(jnts, err) if e > tol]
+        if bad:
+            offPose[sc] = bad
+    return offPose
+
+
 def setBindPose(meshXform):
     """Set the current skeleton pose as the bind pose for a transform.
     All relevant sub-shapes will be fixed. Move joints BEFORE using this
     (so skin is deformed) and skin will reset. Args:
     - meshXForm: TRANSFORM node of the skincluster affectes mesh."""
+    skins = []
     for shape in meshXform.getShapes():
         try:
-            skinClus = shape.inputs(type="skinCluster")[0]
+            skins.append(shape.inputs(type="skinCluster")[0])
         except IndexError:
             # perhaps an "Orig" shape, or just generally bad argument
             # ignore it.
             continue
 
-        jnts = skinClus.matrix.inputs()
-        for i, j in enumerate(jnts):
-            # skinCluster stores each joint's worldInverseMatrix
-            # at its bind pose
-            skinClus.bindPreMatrix[i].set(j.worldInverseMatrix.get())
-
-        pmc.dagPose(jnts, n=skinClus.bindPose.get(), reset=True)
-
-        print("Successfully reset bind pose on {0}".format(shape.name()))
+    resetBindPoses(skins)
+    for sc in skins:
+        print("Successfully reset bind pose on {0}".format(sc.name()))
 
 
 def set_verts_to_jnt():
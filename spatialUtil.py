@@ -0,0 +1,277 @@
+import numpy as np
+
+
+"""Headless point math for symmetry. Like nurbsUtil and meshUtil, nothing
+in here touches Maya - positions are read in bulk and passed in as
+(N, 3) arrays, and every point is handled in one array operation.
+MirrorTable is the bookkeeping of which node mirrors which."""
+
+
+"""
+planeDistances
+reflectPoints
+onMirrorPlane
+KDTree
+    .query
+    .queryRadius
+mirrorPairs
+MirrorTable
+"""
+
+
+def planeDistances(points, normal, origin=(0, 0, 0)):
+    """Signed distance of each of the (N, 3) points from the plane
+    through origin with the given normal."""
+    normal = np.asarray(normal, dtype=float)
+    normal = normal / np.linalg.norm(normal)
+    return np.dot(np.asarray(points, dtype=float) - origin, normal)
+
+
+def reflectPoints(points, normal, origin=(0, 0, 0)):
+    """Reflect all (N, 3) points across the plane through origin
+    with the given normal (eg a symmetry axis vector)."""
+    normal = np.asarray(normal, dtype=float)
+    normal = normal / np.linalg.norm(normal)
+    dist = planeDistances(points, normal, origin)
+    return np.asarray(points, dtype=float) - 2 * dist[:, None] * normal
+
+
+def onMirrorPlane(points, normal, tol=.01, origin=(0, 0, 0)):
+    """Boolean mask of the points within tol of the plane of symmetry,
+    ie which are "middle" objects and mirror onto themselves."""
+    return np.abs(planeDistances(points, normal, origin)) < tol
+
+
+class KDTree(object):
+    """Static 3d KD-tree of a point array, for nearest neighbour and radius
+    queries in O(log N) each instead of testing every point. Nodes are kept
+    in flat lists, each with the bounding box of its points. Args:
+    - points: (N, 3) array
+    - leafSize: most points held by a leaf, which are tested all at once."""
+    def __init__(self, points, leafSize=8):
+        self.points = np.reshape(np.asarray(points, dtype=float), (-1, 3))
+        self.leafSize = leafSize
+        # points of node i are index[ranges[i][0]:ranges[i][1]]
+        self.index = np.arange(len(self.points))
+        self.ranges = []
+        self.boxes = []
+        self.splits = []
+        self.children = []
+        if len(self.points):
+            self._build(0, len(self.points))
+            self._flatten()
+
+    def _build(self, start, end):
+        node = len(self.ranges)
+        idx = self.index[start:end]
+        pts = self.points[idx]
+        lo, hi = pts.min(axis=0), pts.max(axis=0)
+        self.ranges.append((start, end))
+        self.boxes.append((lo, hi))
+        self.splits.append(None)
+        self.children.append(None)
+        if end - start > self.leafSize:
+            # split the widest dimension at its median
+            axis = int(np.argmax(hi - lo))
+            order = np.argsort(pts[:, axis], kind="mergesort")
+            self.index[start:end] = idx[order]
+            mid = (start + end) // 2
+            self.splits[node] = (axis, self.points[self.index[mid], axis])
+            self.children[node] = (self._build(start, mid),
+                                   self._build(mid, end))
+        return node
+
+    def _flatten(self):
+        """Node arrays for querying many points at once: children (-1 for
+        leaves), split axis and value, and each leaf's point indices
+        padded with -1 to leafSize."""
+        numNodes = len(self.ranges)
+        self._lo = np.array([lo for lo, _ in self.boxes])
+        self._hi = np.array([hi for _, hi in self.boxes])
+        self._kids = np.array([k or (-1, -1) for k in self.children])
+        self._axis = np.array([s[0] if s else 0 for s in self.splits])
+        self._value = np.array([s[1] if s else 0.0 for s in self.splits])
+        self._leafIdx = np.full((numNodes, self.leafSize), -1, dtype=int)
+        for node in np.nonzero(self._kids[:, 0] < 0)[0]:
+            start, end = self.ranges[node]
+            self._leafIdx[node, :end - start] = self.index[start:end]
+
+    def _boxDistSq(self, node, p):
+        lo, hi = self.boxes[node]
+        d = np.maximum(lo - p, 0.0) + np.maximum(p - hi, 0.0)
+        return d.dot(d)
+
+    def _scanLeaves(self, points, queries, leaves, best, bestSq):
+        """Test each query point against every point of its paired leaf,
+        keeping any nearer than the query's best so far."""
+        idx = self._leafIdx[leaves]
+        dsq = ((self.points[idx] - points[queries][:, None]) ** 2).sum(-1)
+        dsq[idx < 0] = np.inf
+        col = dsq.argmin(axis=1)
+        rows = np.arange(len(idx))
+        found, foundSq = idx[rows, col], dsq[rows, col]
+        # a query may be paired with several leaves: keep its nearest
+        order = np.lexsort((foundSq, queries))
+        queries, found, foundSq = queries[order], found[order], foundSq[order]
+        first = np.ones(len(queries), dtype=bool)
+        first[1:] = queries[1:] != queries[:-1]
+        queries, found, foundSq = queries[first], found[first], foundSq[first]
+        better = foundSq <= bestSq[queries]
+        best[queries[better]] = found[better]
+        bestSq[queries[better]] = foundSq[better]
+
+    def query(self, points, maxDist=np.inf):
+        """Nearest tree point to each of the (M, 3) query points, all
+        searched together: every point first descends to the leaf it falls
+        in, which gives a bound to prune with, then the tree is walked
+        breadth first as arrays of (query, node) pairs.
+        Returns (dists, indices) arrays; index is -1 (and dist inf)
+        where no point is within maxDist."""
+        points = np.reshape(np.asarray(points, dtype=float), (-1, 3))
+        best = np.full(len(points), -1, dtype=int)
+        bestSq = np.full(len(points), float(maxDist) ** 2)
+        if not len(self.points) or not len(points):
+            return np.full(len(points), np.inf), best
+
+        queries = np.arange(len(points))
+        home = np.zeros(len(points), dtype=int)
+        inner = self._kids[home, 0] >= 0
+        while inner.any():
+            nodes = home[inner]
+            right = points[inner, self._axis[nodes]] >= self._value[nodes]
+            home[inner] = self._kids[nodes, right.astype(int)]
+            inner = self._kids[home, 0] >= 0
+        self._scanLeaves(points, queries, home, best, bestSq)
+
+        nodes = np.zeros(len(points), dtype=int)
+        while len(queries):
+            p = points[queries]
+            d = (np.maximum(self._lo[nodes] - p, 0.0) +
+                 np.maximum(p - self._hi[nodes], 0.0))
+            near = (d * d).sum(axis=1) <= bestSq[queries]
+            queries, nodes = queries[near], nodes[near]
+            leaf = self._kids[nodes, 0] < 0
+            # the home leaves were already scanned
+            scan = leaf & (nodes != home[queries])
+            if scan.any():
+                self._scanLeaves(points, queries[scan], nodes[scan],
+                                 best, bestSq)
+            queries = np.repeat(queries[~leaf], 2)
+            nodes = self._kids[nodes[~leaf]].ravel()
+
+        dists = np.where(best >= 0, np.sqrt(bestSq), np.inf)
+        return dists, best
+
+    def queryRadius(self, point, radius):
+        """Sorted indices of every tree point within radius of point."""
+        p = np.asarray(point, dtype=float)
+        rSq = radius ** 2
+        found = []
+        stack = [0] if len(self.points) else []
+        while stack:
+            node = stack.pop()
+            if self._boxDistSq(node, p) > rSq:
+                continue
+            kids = self.children[node]
+            if kids is None:
+                start, end = self.ranges[node]
+                idx = self.index[start:end]
+                dsq = ((self.points[idx] - p) ** 2).sum(axis=1)
+                found.append(idx[dsq <= rSq])
+            else:
+                stack.extend(kids)
+        if not found:
+            return np.empty(0, dtype=int)
+        return np.sort(np.concatenate(found))
+
+
+def mirrorPairs(points, normal, tol=.01, origin=(0, 0, 0)):
+    """Match every point to its reflection across the plane, through a
+    KDTree. Returns an array of the partner index of each point: itself
+    for points on the plane, -1 for points without a partner within tol.
+    Pairs are only kept if each is the other's nearest match."""
+    points = np.reshape(np.asarray(points, dtype=float), (-1, 3))
+    tree = KDTree(points)
+    partners = tree.query(reflectPoints(points, normal, origin), tol)[1]
+    partners[onMirrorPlane(points, normal, tol, origin)] = -2
+    mutual = partners >= 0
+    mutual[mutual] = partners[partners[mutual]] == np.nonzero(mutual)[0]
+    partners[~mutual & (partners >= 0)] = -1
+    middle = partners == -2
+    partners[middle] = np.nonzero(middle)[0]
+    return partners
+
+
+class MirrorTable(object):
+    """Mirror pairs (a centre object is paired with itself) and which
+    control drives which joint, as dicts kept current connection by
+    connection. Keys can be any hashable node; surfaceUtil.MirrorIndex
+    fills it from the scene."""
+    def __init__(self):
+        self.mirrors = {}
+        self.jntCtrls = {}
+        self.ctrlJnts = {}
+
+    def clear(self):
+        self.mirrors.clear()
+        self.jntCtrls.clear()
+        self.ctrlJnts.clear()
+
+    def _alive(self, node):
+        """Whether node still exists, see _lookup."""
+        return True
+
+    def _lookup(self, table, node):
+        other = table.get(node)
+        if other is not None and not self._alive(other):
+            # deleted since it was indexed
+            del table[node]
+            return None
+        return other
+
+    def mirror(self, node):
+        """Return the node's mirror, itself if it is a centre object,
+        or None if it has no mirror."""
+        return self._lookup(self.mirrors, node)
+
+    def ctrlForJnt(self, jnt):
+        """Return the rig control of the joint, or None if it's unrigged."""
+        return self._lookup(self.jntCtrls, jnt)
+
+    def jntForCtrl(self, ctrl):
+        """Return the joint driven by the control, or None."""
+        return self._lookup(self.ctrlJnts, ctrl)
+
+    def pair(self, node, mirNode):
+        """Record node and mirNode as each other's mirror."""
+        self.mirrors[node] = mirNode
+        self.mirrors[mirNode] = node
+
+    def unpair(self, node, mirNode):
+        """Forget the pair, leaving either side's other pairing alone."""
+        for a, b in ((node, mirNode), (mirNode, node)):
+            if self.mirrors.get(a) == b:
+                del self.mirrors[a]
+
+    def addCtrl(self, jnt, ctrl):
+        """Record that ctrl drives jnt."""
+        self.jntCtrls[jnt] = ctrl
+        self.ctrlJnts[ctrl] = jnt
+
+    def removeCtrl(self, jnt, ctrl):
+        """Forget that ctrl drives jnt."""
+        if self.jntCtrls.get(jnt) == ctrl:
+            del self.jntCtrls[jnt]
+        if self.ctrlJnts.get(ctrl) == jnt:
+            del self.ctrlJnts[ctrl]
+
+    def connectionChanged(self, src, dst, attr, made):
+        """Update the pairs for a connection from src into dst's attr
+        being made (or broken, if not made). Args:
+        - attr: "mirror" for a .mirror pairing (src.message into its own
+        .mirror for a centre object), "rangeU" for a control driving
+        the dst joint."""
+        if attr == "mirror":
+            (self.pair if made else self.unpair)(src, dst)
+        elif attr == "rangeU":
+            (self.addCtrl if made else self.removeCtrl)(dst, src)
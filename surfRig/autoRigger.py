@@ -8,12 +8,14 @@ along the surface. """
 # pylint: disable=locally-disabled, expression-not-assigned
 
 from functools import partial
+import numpy as np
 import pymel.core as pmc
 
 import bkTools.mayaSceneUtil
 import bkTools.skinUtil
 from bkTools import (rigCtrlUtil as rcu, qtUtil as qtu,
-                     matrixUtil as mu, surfaceUtil as su)
+                     matrixUtil as mu, surfaceUtil as su, nurbsUtil as nu,
+                     spatialUtil)
 import surfRigUi, jointControls as jc, parentControls as pc, deformerControls as dc
 
 # if mtoa is loaded prior to lookdevkit loading, floatCorrect nodes are fucked
@@ -137,26 +139,71 @@ CONTEXT CLASS - SURFACE EDITOR
 """
 
 
+# nodes which pass a rig joint's transform on to other transforms
+_matrixRelays = ("decomposeMatrix", "multMatrix", "wtAddMatrix",
+                 "pickMatrix", "blendMatrix", "aimMatrix", "inverseMatrix")
+
+
+def getSurfSkins(surfs):
+    """Set of skinClusters affected by editing any of the surfs, so only
+    those have to be suspended and reset instead of every skin in the
+    scene: skins bound to the surfs' rigged joints or anything below them,
+    or to any transform those drive through constraints or matrix nodes
+    (eg bind joints constrained to the rig). Read fresh on every call,
+    with one connection query per step along the way."""
+    skins, seen = set(), set()
+    frontier = [j for surf in surfs for j in jc.getRiggedJnts(surf)]
+    while frontier:
+        xforms = [n for n in frontier if isinstance(n, pmc.nt.Transform)]
+        if xforms:
+            frontier += pmc.listRelatives(
+                xforms, allDescendents=True, type="joint")
+        frontier = list(set(frontier) - seen)
+        if not frontier:
+            break
+        seen.update(frontier)
+
+        driven = set()
+        for src, dst in pmc.listConnections(
+                frontier, source=False, destination=True,
+                connections=True, plugs=True):
+            # .mirror and .message only pair and list nodes
+            if src.attrName(longName=True) in ("message", "mirror"):
+                continue
+            node = dst.node()
+            if isinstance(node, pmc.nt.SkinCluster):
+                skins.add(node)
+            elif (isinstance(node, pmc.nt.Transform) or
+                  node.type() in _matrixRelays):
+                driven.add(node)
+        frontier = list(driven)
+    return skins
+
+
 class SurfaceEditor(object):
     """Context object for surface editing.
     Args are setting from the UI: mirror(bool), mirVec(vector), lockJnts(bool)."""
     def __init__(self, lockJnts, mirVec):
         self.lockJnts = lockJnts
         self.mirVec = mirVec
+        # skinClusters suspended in preDrag, to be reset in postDrag
+        self.skins = []
+        # per surface CVs at preDrag, to find what the drag actually moved.
+        # None means the mirror must be fully redone
+        self.preDragCVs = {}
 
     def preDrag(self):
-        """Ensure bind pose, then suspend the skinCluster (to adjust joints),
-        create CPOS for joint lock"""        
-
-        # just do ALL skinClusters in the scene.
-        # requires everything be at bind pose, but that's an acceptable
-        # trade off for better performance and ensuring
-        # bind joints doesn't insulate a cluster
-        skins = pmc.ls(type="skinCluster")
-        jnts = {}
+        """Ensure bind pose, then suspend the skinCluster (to adjust joints)"""
+
+        mirIdx = su.getMirrorIndex()
         surfs = su.getSelectedSurfs(withAttr="layeredTexture")
+        # only the skins fed by the edited surfaces' (and mirrors') joints,
+        # re-read every drag as skins or joints may have been added since
+        editSurfs = list(surfs)
+        if self.mirVec:
+            editSurfs += [m for m in map(mirIdx.mirror, surfs) if m]
+        self.skins = list(getSurfSkins(editSurfs))
         for surf in surfs:
-            jnts[surf] = []
             # first, get the skins and try to achieve in bind pose
             # by zeroing all controls
             #self.skins.update(getAffectedClusters(surf))
@@ -164,12 +211,7 @@ class SurfaceEditor(object):
                 #pmc.makeIdentity(c)
                 pmc.xform(c, t=(0, 0, 0), ro=(0, 0, 0), s=(1, 1, 1))
 
-                try:
-                    jnts[surf].append(c.rangeU.outputs()[0])
-                except AttributeError:
-                    pass
-
-            mirSurf = surf.mirror.get()
+            mirSurf = mirIdx.mirror(surf)
             if self.mirVec and mirSurf:
                 #self.skins.update(getAffectedClusters(mirSurf))
                 for c in mirSurf.controls.get():
@@ -177,66 +219,55 @@ class SurfaceEditor(object):
                     pmc.xform(c, t=(0, 0, 0), ro=(0, 0, 0), s=(1, 1, 1))
 
         # ensure bind pose and disconnect skin
-        safeSuspendSkins(skins)
+        safeSuspendSkins(self.skins)
 
         for surf in surfs:
-            # now, ensure good surface components and lock joints
-            mirSurf = surf.mirror.get()
+            # now, ensure good surface components
+            mirSurf = mirIdx.mirror(surf)
             # if rebuild mirror is necessary, it must happen in PRE drag,
             # causes fatal error in post drag!
             if self.mirVec and mirSurf:
-                mirrorSurfSpans(surf, mirSurf)
-
-            if self.lockJnts:
-                #jnts = [c.rangeU.outputs()[0] for c in surf.controls.get() 
-                #        if hasattr(c, "rangeU")]
-                for j in jnts[surf]:
-                    # now attempt to keep the joint as close as possible to
-                    # it's position when it was rigged (saved)
-                    cpos = pmc.nt.ClosestPointOnSurface(skipSelect=True)
-                    surf.ws >> cpos.inputSurface
-                    cpos.inPosition.set(j.origPos.get())
-                    j.paramU.unlock()
-                    cpos.u >> j.paramU
-                    j.paramV.unlock()
-                    cpos.v >> j.paramV
-
+                knotsChanged = mirrorSurfSpans(surf, mirSurf)
+                self.preDragCVs[surf] = None if knotsChanged else \
+                    su.getSurfSnapshot(surf).cvs
 
     def postDrag(self):
-        """Delete CPOS, mirror SURFACE and JOINT if necessary,
-        and then LASTLY restore the skinClusters"""
+        """Mirror SURFACE, reproject locked JOINTS (and mirror them)
+        if necessary, and then LASTLY restore the skinClusters"""
         
+        mirIdx = su.getMirrorIndex()
         surfs = su.getSelectedSurfs(withAttr="layeredTexture")
         for surf in surfs:
             # mirror surf
-            mirSurf = surf.mirror.get()
+            mirSurf = mirIdx.mirror(surf)
             if self.mirVec and mirSurf and mirSurf not in surfs:
-                mirrorSurfCVs(surf, mirSurf, self.mirVec)
+                mirrorMovedSurfCVs(surf, mirSurf, self.mirVec,
+                                   self.preDragCVs.pop(surf, None))
                 
-            ctrls = [c for c in surf.controls.get() if hasattr(c, "rangeU")]
-            for c in ctrls:
-                j = c.rangeU.outputs()[0]
-                if self.lockJnts:
-                    # unlock & mirror joints
-                    cpos = j.paramU.inputs()[0]
-                    pmc.delete(cpos)
-                    j.paramU.lock()
-                    j.paramV.lock()
-
-                    # if lockJnts is off, don't need to mirror the jnt param
-                    # because it didn't change
-                    mirJ = j.mirror.get()
-                    # joint AND mirJoint skins (could be different)
-                    if self.mirVec and mirJ and c.mirror.get() not in ctrls:
-                        # U is inverted
-                        mirJ.paramU.unlock()
-                        mirJ.paramU.set(1.0 - j.paramU.get())
-                        mirJ.paramU.lock()
-                        mirJ.paramV.unlock()
-                        mirJ.paramV.set(j.paramV.get())
-                        mirJ.paramV.lock()
-
-        resetSkins(pmc.ls(type="skinCluster"))
+            # if lockJnts is off, joint params didn't change at all
+            ctrls = [c for c in surf.controls.get() if mirIdx.jntForCtrl(c)]
+            if not self.lockJnts or not ctrls:
+                continue
+            # keep joints as close as possible to their positions when
+            # rigged (saved), all reprojected onto the edited surface at once
+            jnts = [mirIdx.jntForCtrl(c) for c in ctrls]
+            u, v = su.closestOnSurf(
+                surf, [j.origPos.get() for j in jnts], local=False)[:2]
+            for c, j, ju, jv in zip(ctrls, jnts, u, v):
+                with jointMover(j):
+                    j.paramU.set(ju)
+                    j.paramV.set(jv)
+
+                mirJ = mirIdx.mirror(j)
+                # joint AND mirJoint skins (could be different)
+                if self.mirVec and mirJ and mirIdx.mirror(c) not in ctrls:
+                    # U is inverted
+                    with jointMover(mirJ):
+                        mirJ.paramU.set(1.0 - ju)
+                        mirJ.paramV.set(jv)
+
+        resetSkins(self.skins)
+        self.skins = []
 
 
 def surfaceEditMode(state, orig):
@@ -249,29 +280,25 @@ def surfaceEditMode(state, orig):
 
 def safeSuspendSkins(skinClusters):
     """Ensure that the skinClusters are all at their bind poses.
-    If they are, suspenct them all."""
+    If they are, suspend them all."""
+    offPose = bkTools.skinUtil.getJntsOffBindPose(skinClusters)
+    if offPose:
+        pmc.select(cl=True)
+        raise AssertionError(
+            "Bind pose could not be achieved! Ensure all controls are "
+            "zeroed. The following joints are transformed:\n{0}".format(
+                "\n".join("{0}: {1}".format(sc, ", ".join(map(str, jnts)))
+                          for sc, jnts in offPose.items())))
     for sc in skinClusters:
-        bp = sc.bindPose.get()
-        notAtPose = bp.getAtPose()
-        if notAtPose:
-            # returns joints which are NOT at bind pose. abort.
-            raise AssertionError(
-                "Bind pose could not be achieved for {0}! Ensure "
-                "all controls are zeroed. The following joints "
-                "are transformed:\n{1}".format(sc, notAtPose))
-            pmc.select(cl=True)
-    for sc in skinClusters:                
         sc.moveJointsMode(True)
 
 
 def resetSkins(skinClusters):
     """Reset the bind pose on the given skinClusters"""
-    for sc in pmc.ls(type="skinCluster"):
-        # reset skinCluster
+    for sc in skinClusters:
+        # sets bindPreMatrix from the joints' current pose
         sc.moveJointsMode(False)
-        sc.recacheBindMatrices()
-        jnts = sc.matrix.inputs()
-        pmc.dagPose(jnts, name=sc.bindPose.get(), reset=True)
+    bkTools.skinUtil.resetDagPoses(skinClusters)
 
 
 """
@@ -320,6 +347,8 @@ class SurfaceRigger(object):
             partial(self.makeNewSurf, simple=False))
         self.ui.simpleSurfButton.clicked.connect(
             partial(self.makeNewSurf, simple=True))
+        self.ui.fitSurfButton.clicked.connect(
+            partial(self.makeNewSurf, fit=True))
         self.ui.initSurfButton.clicked.connect(self.initUserSurf)
 
         self.ui.selectCVsButton.clicked.connect(
@@ -352,8 +381,8 @@ class SurfaceRigger(object):
         self.ui.resetBindPoseButton.clicked.connect(resetBindPose)
         self.ui.fixOrientsButton.clicked.connect(self.fixOrientsForSel)
         self.ui.surfaceEditButton.clicked.connect(self.safeEditSurf)
-        #self.ui.newSoftClusterButton.clicked.connect(self.makeSoftCluster)
-        #self.ui.newSoftModButton.clicked.connect()
+        self.ui.newSoftClusterButton.clicked.connect(self.makeSoftCluster)
+        self.ui.newSoftModButton.clicked.connect(self.makeSoftMod)
         self.ui.clusterHandleButton.clicked.connect(self.makeHandleCtrl)
         self.ui.setupBlendshapesButton.clicked.connect(dc.ctrlBlendshapes)
         self.ui.mergeBlendshapesButton.clicked.connect(dc.mergeBlendshapes)
@@ -444,10 +473,11 @@ class SurfaceRigger(object):
         return n
 
     @qtu.SlotExceptionRaiser
-    def makeNewSurf(self, simple=False):
-        """Slot method for BOTH "new surface" buttons.
-        "Simple" arg indicates simple ie 2x3 nurbs plane, otherwise
-        it's a full edge-guided surface."""
+    def makeNewSurf(self, simple=False, fit=False):
+        """Slot method for ALL "new surface" buttons.
+        "Simple" arg indicates simple ie 2x3 nurbs plane, "fit" a surface
+        fit to the mesh region inside each edge loop, otherwise
+        it's a full edge-guided surface for each selected edge chain."""
 
         with bkTools.mayaSceneUtil.MayaUndoChunkManager():
             objName = self.ui.surfNameEdit.text()
@@ -455,22 +485,26 @@ class SurfaceRigger(object):
                 pmc.warning(
                     "No name provided for surface! Default name applied.")
                 objName = "untitled_surface"
-            # convention is the formattable base string
-            n = self.getTypeBaseName(objName, self.names["surface"])
 
             if simple:
-                surf = su.makeSimpleSurf(name=n.format(type=self.names["surface"]))
+                surfs = [su.makeSimpleSurf()]
+            elif fit:
+                surfs = su.makeFitSurfs()
             else:
                 symAx = self.ui.symAxis.currentText()
                 symVec = mu.getVectorForAxis(symAx)
 
-                surf = su.makeSurfFromEdges(
-                    name=n.format(type=self.names["surface"]), symVec=symVec)
-
-            if not surf:
-                return
+                surfs = su.makeSurfsFromEdges(symVec=symVec)
 
-            self.initExistingSurf(surf, n)
+            for surf in surfs:
+                # convention is the formattable base string.
+                # one at a time, so each new surf gets the next {num}
+                n = self.getTypeBaseName(objName, self.names["surface"])
+                name = n.format(type=self.names["surface"])
+                surf.rename(name)
+                # the shape was named after the default name at creation
+                surf.getShape().rename(name + "Shape")
+                self.initExistingSurf(surf, n)
 
             # set the tool symmetry settings to make editing surface easier
             #pmc.symmetricModelling(about="world", axis=symAx)
@@ -606,6 +640,40 @@ class SurfaceRigger(object):
                     jnt.name()))
                 pmc.select(jnt)
 
+    @qtu.SlotExceptionRaiser
+    def makeSoftCluster(self):
+        """Slot for button press, newSoftClusterButton.
+        Make a soft cluster on each surface with selected CVs, weighted by
+        the current soft select settings, and select the new handles."""
+        self.makeSoftDeformers(dc.makeSoftClusterOnSurf)
+
+    @qtu.SlotExceptionRaiser
+    def makeSoftMod(self):
+        """Slot for button press, newSoftModButton.
+        As makeSoftCluster, but with a softMod on each surface."""
+        self.makeSoftDeformers(dc.makeSoftModOnSurf)
+
+    def makeSoftDeformers(self, makeFunc):
+        """Call makeFunc(surf, surfCVs, name) (see makeSoftClusterOnSurf)
+        for each surface with selected CVs, and select the new handles."""
+        # CVs are "double3"
+        origSel = pmc.selected(flatten=True, type="double3")
+        if not origSel:
+            pmc.warning(
+                "Select at least one surface CV with SoftSelection on.")
+            return
+
+        handles = []
+        with bkTools.mayaSceneUtil.MayaUndoChunkManager():
+            for surf in set(cv.node().getTransform() for cv in origSel):
+                surfCVs = [cv for cv in origSel
+                           if cv.node().getTransform() == surf]
+                name = self.getBaseNameFromObj(surf, "surface")
+                handle = makeFunc(surf, surfCVs, name)[1]
+                if handle:
+                    handles.append(handle)
+        pmc.select(handles)
+
     @qtu.SlotExceptionRaiser
     def makeHandleCtrl(self):
         """Slot for button press, clusterHandleButton.
@@ -738,7 +806,8 @@ class SurfaceRigger(object):
         """Create a new surface which is the given surface
         mirrored across the given axis."""
 
-        mirSurf = surf.mirror.get()
+        mirIdx = su.getMirrorIndex()
+        mirSurf = mirIdx.mirror(surf)
         if not mirSurf:
             srcN = self.getBaseNameFromObj(surf, "surface")
             n = srcN.replace(src, tar)
@@ -747,7 +816,7 @@ class SurfaceRigger(object):
 
             mirSurf = pmc.duplicate(
                 surf, n=n.format(type=self.names["surface"]))[0]
-            surf.mirror >> mirSurf.mirror
+            mirIdx.connect(surf, mirSurf)
             mirSurf.controlsFlipped.set(True)
 
             # create groups, shading stuff and relevant connections
@@ -767,22 +836,23 @@ class SurfaceRigger(object):
         mirSurf, mirStr = target["surf"], target["side"]
 
         jnts = surf.unriggedJnts.get()
+        ns = []
+        for j in jnts:
+            srcN = self.getBaseNameFromObj(j, "joint")
+            n = srcN.replace(origStr, mirStr)
+            if n == srcN:
+                # if no change to name, force one
+                n = n.format(type="mir_{type}")
+            ns.append(n)
+
         addTo = bkTools.mayaSceneUtil.addNodeToAssetCB(mirSurf.container.get())
         with bkTools.mayaSceneUtil.NodeOrganizer(addTo):
-            for j in jnts:
-                srcN = self.getBaseNameFromObj(j, "joint")
-                n = srcN.replace(origStr, mirStr)
-                if n == srcN:
-                    # if no change to name, force one
-                    n = n.format(type="mir_{type}")
-
-                mirJ = mirrorJointAcross(
-                    j, mirVec, (mirSurf, n, self.names, self.rotOrder))
-                try:
-                    print("Joint {0} successfully mirrored to {1}!".format(
-                        j.name(), mirJ.name()))
-                except AttributeError:
-                    pass
+            mirJnts = mirrorJointsAcross(
+                jnts, mirVec, (mirSurf, ns, self.names, self.rotOrder))
+        for j, mirJ in zip(jnts, mirJnts):
+            if mirJ:
+                print("Joint {0} successfully mirrored to {1}!".format(
+                    j.name(), mirJ.name()))
 
     def rigSurf(self, surf):
         """Rig the given surface. At this point, the connections are as such:
@@ -797,22 +867,14 @@ class SurfaceRigger(object):
         for jnt in jnts:
             n = self.getBaseNameFromObj(jnt, "joint")
             ctrl = self.makeJntCtrl(surf, jnt, n)
-            
-            try:
-                mirCtrl = jnt.mirror.get().rangeU.inputs()[0]
-            except AttributeError:
-                # jnt has no mirror, surf has no mirror
-                pass
-            except IndexError:
-                # jnt is not rigged yet, ignore
-                pass
-            else:
-                try:
-                    ctrl.mirror >> mirCtrl.mirror
-                except RuntimeError:
-                    # error "cannot connected to itself" means
-                    # center object, connect just like the joint
-                    ctrl.message >> ctrl.mirror
+
+            # no mirror jnt, or it is not rigged yet: ignore.
+            # a center jnt's ctrl is its own mirror, just like the joint
+            mirIdx = su.getMirrorIndex()
+            mirJnt = mirIdx.mirror(jnt)
+            mirCtrl = mirIdx.ctrlForJnt(mirJnt) if mirJnt else None
+            if mirCtrl:
+                mirIdx.connect(ctrl, mirCtrl)
 
             # create dynamic "follicle" and other nodes to allow
             # ctrl to control rigjnt in a nice way
@@ -913,26 +975,28 @@ class SurfaceRigger(object):
         if not pars:
             pmc.warning("No parent controls selected.")
 
+        mirIdx = su.getMirrorIndex()
         with bkTools.mayaSceneUtil.MayaUndoChunkManager():
             for p in pars:
-                mirP = p.mirror.get()
+                mirP = mirIdx.mirror(p)
 
                 # the only controls I want are ones with mirror images
-                ctrls = [c for c in p.childControls.outputs() if c.mirror.get()]
+                ctrls = [c for c in p.childControls.outputs()
+                         if mirIdx.mirror(c)]
                 if not mirP:
                     # create one!
-                    mirCtrls = [c.mirror.get() for c in ctrls]
+                    mirCtrls = [mirIdx.mirror(c) for c in ctrls]
                     if set(ctrls) == set(mirCtrls):
                         pmc.warning("Selected parent {0} is already "
                                     "symmetrical! Skipped.".format(p.name()))
                         continue
 
                     mirP = self.parentCtrls(mirCtrls)
-                    p.mirror >> mirP.mirror
+                    mirIdx.connect(p, mirP)
 
                 # update all of the mirP weights and custom attrs
                 for c in ctrls:
-                    mirC = c.mirror.get()
+                    mirC = mirIdx.mirror(c)
                     attr = pc.getParWtAttr(c, p)
                     mirAttr = pc.getParWtAttr(mirC, mirP)
                     
@@ -1109,63 +1173,150 @@ def makeStickyLoc(surf, ctrl, n, ctrlGrp, skipAxis=None):
     return loc
 
 
-def mirrorJointAcross(jnt, mirVec, addJntArgs, tol=.01):
-    """Given two joints and an axis, mirror the first joint across the axis"""
-
-    # now, get inverted ws translate
-    pos = jnt.getTranslation(ws=True)
-    if abs(pos[mirVec.index(1)]) < tol:
-        # close enough to axis of reflection, consider a "middle" jnt
-        jnt.message >> jnt.mirror
-        return
-    
-    mirJnt = jc.addRigJnt(*addJntArgs)
-
-    mirJnt.SurfaceUV_LimitsOnJoint.set(jnt.SurfaceUV_LimitsOnJoint.get())
-    mirJnt.rangeU.set(jnt.rangeU.get())
-    mirJnt.rangeV.set(jnt.rangeV.get())
-    jnt.mirror >> mirJnt.mirror
-    # reflection of pos across mirVec
-    inv = pos - 2 * pos.dot(mirVec) * mirVec
+def mirrorJointsAcross(jnts, mirVec, addJntsArgs, tol=.01):
+    """Mirror all of the given joints across the axis in one pass:
+    one bulk position read, one reflection of every position and one
+    jc.addRigJnts build. Joints within tol of the axis of reflection are
+    their own mirror. addJntsArgs are (surf, ns, names, rotOrder) as for
+    jc.addRigJnts, with a name per joint. Returns the new joints,
+    None in place of each "middle" jnt."""
+    if not jnts:
+        return []
+    mirSurf, ns, names, rotOrder = addJntsArgs
+
+    pos = np.reshape(pmc.xform(jnts, q=True, ws=True, t=True), (-1, 3))
+    inv = spatialUtil.reflectPoints(pos, mirVec)
+    middle = spatialUtil.onMirrorPlane(pos, mirVec, tol)
+
+    mirIdx = su.getMirrorIndex()
+    toMirror = []
+    for i, jnt in enumerate(jnts):
+        if middle[i]:
+            # close enough to axis of reflection, consider a "middle" jnt
+            mirIdx.connect(jnt, jnt)
+        else:
+            toMirror.append(i)
+
+    newJnts = jc.addRigJnts(
+        mirSurf, [ns[i] for i in toMirror], names, rotOrder, inv[toMirror])
+
+    mirJnts = [None] * len(jnts)
+    for i, mirJnt in zip(toMirror, newJnts):
+        jnt = jnts[i]
+        mirJnt.SurfaceUV_LimitsOnJoint.set(jnt.SurfaceUV_LimitsOnJoint.get())
+        mirJnt.rangeU.set(jnt.rangeU.get())
+        mirJnt.rangeV.set(jnt.rangeV.get())
+        mirIdx.connect(jnt, mirJnt)
+        mirJnts[i] = mirJnt
+    return mirJnts
+
+
+def pairMirrorsByPosition(mirVec, tol=.01, overwrite=False):
+    """Find and connect the mirror of every rig surface, joint, control and
+    parent control by position alone, for rigs made before mirroring was
+    used or imported from other scenes. Each kind is only matched with its
+    own kind: positions are reflected across mirVec and matched to their
+    nearest reflection within tol through a KD-tree, then all of the
+    .mirror connections are written in one batch. Joints and controls on
+    the axis become their own mirror. Unless overwrite, objects which
+    already have a mirror are left alone. Returns the new pairs."""
+    mirIdx = su.getMirrorIndex(refresh=True)
+    pars = pmc.ls("*.childControls", objectsOnly=True, recursive=True)
+    ctrls = set(pmc.ls("*.parentControls", objectsOnly=True, recursive=True))
+    ctrls = list(ctrls.difference(pars))
+    jnts = [j for j in pmc.ls("*.SurfaceUV_LimitsOnJoint",
+                              objectsOnly=True, recursive=True)
+            if isinstance(j, pmc.nt.Joint)]
+    surfs = su.getAllSurfs(withAttr="layeredTexture")
+
+    def pivots(nodes):
+        return np.reshape(
+            pmc.xform(nodes, q=True, ws=True, rotatePivot=True), (-1, 3))
+
+    def centers(nodes):
+        boxes = np.array([pmc.exactWorldBoundingBox(n) for n in nodes])
+        return (boxes[:, :3] + boxes[:, 3:]) / 2
+
+    pairs = []
+    # a surface or parent control can't be its own mirror
+    for kind, nodes, getPos, selfPairs in (
+            ("joints", jnts, pivots, True),
+            ("controls", ctrls, pivots, True),
+            ("surfaces", surfs, centers, False),
+            ("parent controls", pars, centers, False)):
+        if not overwrite:
+            nodes = [n for n in nodes if not mirIdx.mirror(n)]
+        if not nodes:
+            continue
+        partners = spatialUtil.mirrorPairs(getPos(nodes), mirVec, tol)
+        for i, j in enumerate(partners):
+            if j > i or (j == i and selfPairs):
+                pairs.append((nodes[i], nodes[j]))
+        unmatched = (partners < 0).sum()
+        if unmatched:
+            pmc.warning("{0} of {1} {2} found no mirror within {3}.".format(
+                unmatched, len(nodes), kind, tol))
 
-    mirJnt.setTranslation(inv, ws=True)
-    return mirJnt
+    with bkTools.mayaSceneUtil.MayaUndoChunkManager():
+        mirIdx.connectPairs(pairs)
+    return pairs
 
 
 def mirrorSurfSpans(surf, mirSurf):
-    """Precursor to CVs being mirrored - spans and knots must be identical"""
+    """Precursor to CVs being mirrored - spans and knots must be identical.
+    Returns whether mirSurf had to be changed at all."""
+    snap = su.getSurfSnapshot(surf)
+    mirSnap = su.getSurfSnapshot(mirSurf)
+    ku = [1.0 - k for k in reversed(snap.knotsU)]
+    kv = snap.knotsV
     # ensure same spans
-    su, sv = surf.spansU.get(), surf.spansV.get()
-    if mirSurf.spansU.get() != su or mirSurf.spansV.get() != sv:
+    if mirSnap.spansU != snap.spansU or mirSnap.spansV != snap.spansV:
         pmc.rebuildSurface(
-            mirSurf.getShape(), su=su, sv=sv, keepCorners=True,
-            replaceOriginal=True, rebuildType=0, endKnots=1)
+            mirSurf.getShape(), su=snap.spansU, sv=snap.spansV,
+            keepCorners=True, replaceOriginal=True, rebuildType=0, endKnots=1)
+    elif (np.allclose(mirSnap.knotsU, ku) and
+            np.allclose(mirSnap.knotsV, kv)):
+        # already matching, leave it be
+        return False
 
     # now that spans are the same, ensure knots are placed correctly
-    ku = [1.0 - k for k in surf.getKnotsInU()]
-    mirSurf.setKnotsInU(reversed(ku), 0, len(ku) - 1)
-    kv = surf.getKnotsInV()
+    mirSurf.setKnotsInU(ku, 0, len(ku) - 1)
     mirSurf.setKnotsInV(kv, 0, len(kv) - 1)
-    
+    return True
+
 
 def mirrorSurfCVs(surf, mirSurf, mirVec):
     """Perform the CV mirroring across symAx action.
     First arg is orig surf, second is mirror surf, third is symmetry axis"""
 
-    cvU = range(surf.numCVsInU())
-    cvV = range(surf.numCVsInV())
     # rather than having to perform a (apparently unstable)
     # reverseSurface operation, just do it manually by
     # reversing U cvs and knots for mirror surface!
-    for u, mirU in zip(cvU, reversed(cvU)):
-        for v in cvV:
-            pos = surf.getCV(u, v)
-            mPos = pos * [-1 if c else 1 for c in mirVec]
-            mirSurf.setCV(mirU, v, mPos)
-
-    # fix display
-    mirSurf.doubleSided.set(0)
-    mirSurf.doubleSided.set(1)
+    cvs = su.getSurfSnapshot(surf).cvs
+    su.setSurfCVs(mirSurf, nu.mirrorCVs(cvs, mirVec))
+
+
+def mirrorMovedSurfCVs(surf, mirSurf, mirVec, before, tol=1e-6,
+                       syncTol=1e-4):
+    """Mirror only the CVs which have moved since the before CV grid
+    (eg a snapshot from the start of a drag) onto an already mirrored
+    surface. Falls back on mirroring everything if the grid changed size,
+    or if mirSurf wasn't the reflection of before (within syncTol) to
+    begin with, so an out of sync pair gets fixed."""
+    cvs = su.getSurfSnapshot(surf).cvs
+    mirCVs = su.getSurfSnapshot(mirSurf).cvs
+    if (before is None or not before.shape == cvs.shape == mirCVs.shape or
+            not np.allclose(mirCVs, nu.mirrorCVs(before, mirVec),
+                            rtol=0.0, atol=syncTol)):
+        mirrorSurfCVs(surf, mirSurf, mirVec)
+        return
+    moved = np.nonzero((np.abs(cvs - before) > tol).any(axis=-1))
+    if not len(moved[0]):
+        return
+    mirrored = nu.mirrorCVs(cvs, mirVec)
+    # U is reversed on the mirror
+    mirU = cvs.shape[0] - 1 - moved[0]
+    su.setSurfCVsAt(mirSurf, zip(mirU, moved[1]), mirrored[mirU, moved[1]])
 
 
 def fixSurfaceOrients(surf, allAxes, rotOrder):
@@ -1258,125 +1409,6 @@ CURRENTLY UNUSED - EXPERIMENTAL UTILITIES
 """
 
 
-"""
-    def makeSoftCluster(self):
-        #Slot for button press, gather required selection data
-        #and create a soft cluster for relevant CVs
-        #with rcu.MayaUndoChunkManager():
-            # CVs are "double3"
-            origSel = pmc.selected(flatten=True, type="double3")
-            if not origSel:
-                pmc.warning(
-                    "Select at least one surface CV with SoftSelection on.")
-                return    
-            surfs = pmc.selected(objectsOnly=True)
-            for surf in surfs:
-                surfCVs = [cv for cv in origSel if cv.node() == surf]
-                name = surf.name() + "{0}"
-                handle = makeSoftClusterOnSurf(surf, surfCVs, name)[1]
-                if self.ui.clusterCtrlCheck.isChecked():
-                    ctrl = self.makeHandleCtrl(surf, handle, name)
-                    ctrl.surface.connect(surf.controls, nextAvailable=True)
-
-
-def makeSoftClusterOnSurf(surf, origSel, n):
-    #Create a cluster of CVs from a softselection
-    if not origSel:
-        pmc.warning(
-            "Select one or more CVs and set softSelect distance as desired.")
-        return None, None
-    if pmc.softSelect(q=True, softSelectFalloff=True):
-        # Volume mode is 0
-        pmc.warning("Soft Select tool must be set to \"Volume\" mode.")
-        return None, None
-    if not pmc.softSelect(q=True, softSelectEnabled=True):
-        pmc.warning(
-            "Standard cluster created. Enable soft-select for a soft cluster.")
-        return pmc.cluster(n=n.format(type="cluster"), relative=True)
-    cluster, handle = pmc.cluster(
-        surf.cv, n=n.format(type="softCluster"), relative=True)
-
-    # find a good place for handle origin
-    i = 0
-    pos = pmc.dt.Vector(0, 0, 0)
-    for cv in origSel:
-        i += 1
-        pos += surf.getCV(*cv.indices()[0])
-    # already have ensured sel is non-empty so i can't be 0
-    pos /= i
-    handle.origin.set(pos)
-    handle.origin >> handle.rotatePivot
-    handle.origin >> handle.scalePivot
-    
-    # get soft select info
-    #falloffType = pmc.softSelect(q=True, ssf=True)
-    maxDist = pmc.softSelect(q=True, ssd=True)
-    #uvDist = pmc.softSelect(q=True, sud=True)
-    
-    cvDistDict, removeList = getVolumeDistances(surf, origSel, maxDist)
-    cSet = cluster.outputs(type="objectSet")[0]
-    for cv in removeList:
-        pmc.sets(cSet, remove=cv)
-    setClusterWeights(cluster, cvDistDict, maxDist)
-
-    print("Cluster {0} successfully created.".format(cluster.name()))
-
-    return cluster, handle
-
-
-def getVolumeDistances(surf, origSel, maxDist):
-    #Return dict of CV: distance considered
-    #from a direct vector subtraction.
-    cvDistDict = {}
-    removeList = []
-
-    for cv in surf.cv:
-        ind = cv.indices()[0]
-        pos = surf.getCV(*ind)
-        distList = []
-        for o in origSel:
-            # have to check distanc from each
-            # originally selected CV smallest distance
-            oInd = o.indices()[0]
-            oPos = surf.getCV(*oInd)
-            distList.append((oPos - pos).length())
-        dist = min(distList)
-        if dist < maxDist:
-            cvDistDict[cv] = dist
-        else:
-            # PRUNE FROM MEMBERSHIP!!!
-            removeList.append(cv)
-    
-    return cvDistDict, removeList
-
-
-def setClusterWeights(cluster, cvDistDict, maxDist):
-    #Given the CV: distance dict, set the 
-    #cluster weights according to falloff
-
-    # softSelect falloff curve query returns a comma-separated string of floats
-    # have to massage the data to use it for remapValue node
-    # make ints, make packets of 3, reverse position/value indices
-    curveVals = [float(i) for i in pmc.softSelect(q=True, ssc=True).split(",")]
-    remapVals = [
-        [curveVals[i+1], curveVals[i], curveVals[i+2]]
-        for i in range(0, len(curveVals), 3)]
-
-    rv = pmc.nt.RemapValue()
-    # automatically scales falloff curve to inputMax
-    rv.inputMax.set(maxDist)
-    for i, pt in enumerate(remapVals):
-        rv.value[i].set(*pt)
-
-    # run distance through curve remap to get weight
-    for cv in cvDistDict:
-        rv.inputValue.set(cvDistDict[cv])
-        pmc.percent(cluster, cv, v=rv.outValue.get())
-    
-    pmc.delete(rv)
-"""
-
-
 class skinDetacher(object):
     """Context manager to safely detach and reattach skin clusters.
     Problem is, it still requires a bind pose reset afterwards."""
@@ -1430,25 +1462,31 @@ class surfEditContext(object):
         # jnts is a dictionary of joint: starting position
         jnts = jc.getRiggedJnts(surf)
         self.jnts = dict.fromkeys(jnts)
-        self.scs = list(set(
-            [sc for j in jnts for sc in j.outputs(type="skinCluster")]))
+        self.scs = list(getSurfSkins([surf]))
 
     def __enter__(self):
         """Detach all skin clusters and save joint worldspace positions."""
         safeSuspendSkins(self.scs)
 
-        for j in self.jnts:
-            self.jnts[j] = self.surf.getPointAtParam(
-                j.paramU.get(), j.paramV.get(), space="world")
+        if not self.jnts:
+            return
+        params = [(j.paramU.get(), j.paramV.get()) for j in self.jnts]
+        u, v = zip(*params)
+        ev = su.getSurfEvaluator(self.surf, "world")
+        for j, p in zip(self.jnts, ev.positions(u, v)):
+            self.jnts[j] = p
 
     def __exit__(self, *args):
         """Ensure joints are back where they should be, and reattach skins."""
-        for j, p in self.jnts.items():
-            # worldspace!
-            u, v = su.closestOnSurf(self.surf, p, local=False)
-            with jointMover(j):
-                j.paramU.set(u)
-                j.paramV.set(v)
+        if self.jnts:
+            # worldspace! all joints reprojected in one pass
+            jnts = list(self.jnts)
+            u, v = su.closestOnSurf(
+                self.surf, [self.jnts[j] for j in jnts], local=False)[:2]
+            for j, ju, jv in zip(jnts, u, v):
+                with jointMover(j):
+                    j.paramU.set(ju)
+                    j.paramV.set(jv)
 
         resetSkins(self.scs)
 
@@ -1460,7 +1498,7 @@ def editJntParams(jnt, u, v, tryMir=True):
         with jointMover(jnt):
             jnt.paramU.set(u)
             jnt.paramV.set(v)
-    mir = jnt.mirror.get()
+    mir = su.getMirrorIndex().mirror(jnt)
     if tryMir and mir:
         editJntParams(mir, 1.0 - u, v, False)
 
@@ -1470,8 +1508,9 @@ def moveJointsToSurf(jnts, newSurf):
     from their old surface to the target (ie, slide along the new surface)"""
 
     # surface must be REBUILT to 0-1 params and INITIALIZED
+    mirIdx = su.getMirrorIndex()
     for jnt in jnts:
-        ctrl = jnt.rangeU.inputs()[0]
+        ctrl = mirIdx.ctrlForJnt(jnt)
         oldSurf = ctrl.surface.get()
         # replace surf.local inputs: statPosi, dynPosi
         statPosi = jnt.inputs(type="pointOnSurfaceInfo")[0]
@@ -1508,12 +1547,13 @@ def copySubSurfs(jnt):
     for just its parametric range.
     This is a NO construction history operation!"""
 
-    surf = jnt.rangeU.inputs()[0].surface.get()
+    surf = su.getMirrorIndex().ctrlForJnt(jnt).surface.get()
     u, v = jnt.paramU.get(), jnt.paramV.get()
     ru, rv = jnt.rangeU.get(), jnt.rangeV.get()
 
-    minU, maxU, subIndexU = getSubsurfRange(u, ru, surf.formInU())
-    minV, maxV, subIndexV = getSubsurfRange(v, rv, surf.formInV())
+    snap = su.getSurfSnapshot(surf)
+    minU, maxU, subIndexU = getSubsurfRange(u, ru, snap.formU)
+    minV, maxV, subIndexV = getSubsurfRange(v, rv, snap.formV)
 
     # output surface - if first param is 0, then [0] is correct surf
     # if first param is NOT 0, then surf[0] is the surf between 0 and it
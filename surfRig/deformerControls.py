@@ -1,13 +1,24 @@
+import numpy as np
 import pymel.core as pmc
 
 import bkTools.mayaSceneUtil
 from bkTools import rigCtrlUtil as rcu, matrixUtil as mu, surfaceUtil as su
+from bkTools import nurbsUtil as nu, spatialUtil, weightUtil
 import jointControls as jc
 
 
 """
 Deformer-related functions for surfRig:
+makeSoftClusterOnSurf
+makeSoftModOnSurf
+getVolumeDistances
+getSurfaceDistances
+setClusterWeights
+setSurfaceFalloffOnSoftMod
+softModFalloff
+falloffWeights
 getSurfUvAndWeight
+getSurfWeights
 sortAndPruneUvs
 getUvFromCtrl
 makeWeightedCtrl
@@ -23,36 +34,252 @@ mergeBlendshapes
 """
 
 
+def makeSoftClusterOnSurf(surf, origSel, n, falloff=None):
+    """Create a relative cluster from a soft selection of surface CVs:
+    only the CVs within the soft select distance of the selected ones are
+    members, weighted by the soft select falloff curve. falloff is
+    "volume" (straight line distance) or "surface" (distance along the
+    surface), by default the soft select falloff mode.
+    Returns (cluster, handle), or (None, None) if nothing was made."""
+    if not origSel:
+        pmc.warning(
+            "Select one or more CVs and set softSelect distance as desired.")
+        return None, None
+    if falloff is None:
+        # Volume mode is 0, Surface is 1
+        falloff = {0: "volume", 1: "surface"}.get(
+            pmc.softSelect(q=True, softSelectFalloff=True))
+    if falloff not in falloffModes:
+        pmc.warning(
+            "Soft Select tool must be set to \"Volume\" or \"Surface\" mode.")
+        return None, None
+    if not pmc.softSelect(q=True, softSelectEnabled=True):
+        pmc.warning(
+            "Standard cluster created. Enable soft-select for a soft cluster.")
+        return pmc.cluster(origSel, n=n.format(type="cluster"), relative=True)
+
+    maxDist = pmc.softSelect(q=True, ssd=True)
+    indices, dists = falloffModes[falloff](surf, origSel, maxDist)
+    members = ["{0}.cv[{1}][{2}]".format(surf.name(), u, v)
+               for u, v in indices]
+    cluster, handle = pmc.cluster(
+        members, n=n.format(type="softCluster"), relative=True)
+
+    # find a good place for handle origin - average of the selected CVs
+    cvs = su.getSurfSnapshot(surf).cvs
+    pos = np.mean([cvs[cv.indices()[0]] for cv in origSel], axis=0)
+    handle.origin.set(pos)
+    handle.origin >> handle.rotatePivot
+    handle.origin >> handle.scalePivot
+
+    setClusterWeights(cluster, surf, indices, dists, maxDist)
+    print("Cluster {0} successfully created.".format(cluster.name()))
+
+    return cluster, handle
+
+
+def makeSoftModOnSurf(surf, origSel, n, falloff=None):
+    """Create a relative softMod centred on the selected surface CVs, its
+    falloffRadius and falloffCurve taken from soft select. In "surface"
+    falloff mode (by default the soft select one) its weights on the
+    surface follow the distance along the surface instead (see
+    setSurfaceFalloffOnSoftMod).
+    Returns (softMod, handle), or (None, None) if nothing was made."""
+    if not origSel:
+        pmc.warning(
+            "Select one or more CVs and set softSelect distance as desired.")
+        return None, None
+    if falloff is None:
+        falloff = {0: "volume", 1: "surface"}.get(
+            pmc.softSelect(q=True, softSelectFalloff=True))
+    if falloff not in falloffModes:
+        pmc.warning(
+            "Soft Select tool must be set to \"Volume\" or \"Surface\" mode.")
+        return None, None
+
+    maxDist = pmc.softSelect(q=True, ssd=True)
+    curve = pmc.softSelect(q=True, ssc=True)
+    cvs = su.getSurfSnapshot(surf, "world").cvs
+    center = np.mean([cvs[cv.indices()[0]] for cv in origSel], axis=0)
+    softMod, handle = pmc.softMod(
+        surf, n=n.format(type="softMod"), relative=True,
+        falloffCenter=center.tolist(), falloffRadius=maxDist)
+    keys = np.reshape([float(i) for i in curve.split(",")], (-1, 3))
+    ramp = softMod.falloffCurve
+    for i in ramp.getArrayIndices():
+        ramp[i].remove()
+    for i, (value, position, interp) in enumerate(keys):
+        ramp[i].falloffCurve_Position.set(position)
+        ramp[i].falloffCurve_FloatValue.set(value)
+        ramp[i].falloffCurve_Interp.set(int(interp))
+
+    if falloff == "surface":
+        setSurfaceFalloffOnSoftMod(softMod, surf, maxDist, curve)
+    print("SoftMod {0} successfully created.".format(softMod.name()))
+
+    return softMod, handle
+
+
+def getVolumeDistances(surf, origSel, maxDist):
+    """Straight line distance of every CV of the surface to its nearest
+    selected CV, through a KD-tree of the selected ones. CVs beyond
+    maxDist are pruned. Returns ((K, 2) array of u, v CV indices,
+    (K,) array of their distances)."""
+    cvs = su.getSurfSnapshot(surf).cvs
+    sel = np.array([cv.indices()[0] for cv in origSel], dtype=int)
+    tree = spatialUtil.KDTree(cvs[sel[:, 0], sel[:, 1]])
+    dists = tree.query(np.reshape(cvs, (-1, 3)), maxDist)[0]
+    return _prunedDistances(dists, cvs.shape[:2], maxDist)
+
+
+def getSurfaceDistances(surf, origSel, maxDist):
+    """As getVolumeDistances, but measured along the surface (see
+    nurbsUtil.SurfaceEvaluator.cvGeodesics) from the cached evaluator,
+    so weights don't bleed across to nearby but separate parts of the
+    surface, like the other lip or eyelid."""
+    ev = su.getSurfEvaluator(surf)
+    sel = np.array([cv.indices()[0] for cv in origSel], dtype=int)
+    seeds = np.full((ev.numCVsInU, ev.numCVsInV), np.inf)
+    seeds[sel[:, 0], sel[:, 1]] = 0.0
+    dists = ev.cvGeodesics(seeds).ravel()
+    return _prunedDistances(dists, seeds.shape, maxDist)
+
+
+def _prunedDistances(dists, shape, maxDist):
+    """Only the flat CV distances within maxDist, with their (u, v)
+    indices in a CV grid of the given shape."""
+    keep = np.nonzero(dists < maxDist)[0]
+    indices = np.column_stack(np.unravel_index(keep, shape))
+    return indices, dists[keep]
+
+
+falloffModes = {
+    "volume": getVolumeDistances,
+    "surface": getSurfaceDistances}
+
+
+def setClusterWeights(cluster, surf, indices, dists, maxDist, curve=None):
+    """Weight the cluster on the surface CVs at the (u, v) indices by their
+    distances through the soft select falloff curve (see falloffWeights),
+    written to its weightList in one set. Returns the weights."""
+    weights = falloffWeights(dists, maxDist, curve)
+    numU, numV = su.getSurfSnapshot(surf).cvs.shape[:2]
+    dense = np.zeros((numU, numV))
+    indices = np.asarray(indices)
+    dense[indices[:, 0], indices[:, 1]] = weights
+    _setSurfWeights(cluster, surf, dense)
+    return weights
+
+
+def setSurfaceFalloffOnSoftMod(softMod, surf, maxDist=None, curve=None):
+    """Weight the softMod on the surface by distance along the surface
+    from its falloff center, through the falloff curve (default the soft
+    select one) over maxDist (default its falloffRadius). Everything is
+    measured in world space, like the softMod's own falloff. Its shared
+    falloffRadius is left alone: instead each CV's weight is divided by
+    the volume falloff the softMod applies on top of it (see
+    softModFalloff), so only this surface's weights change. That holds
+    for the current radius and center.
+    Returns the (numCVsInU, numCVsInV) weights."""
+    if maxDist is None:
+        maxDist = softMod.falloffRadius.get()
+    ev = su.getSurfEvaluator(surf, "world")
+    center = np.array(softMod.falloffCenter.get(), dtype=float)
+    u, v = su.closestOnSurf(surf, center, local=False)
+
+    # seed the CVs around the center with their straight line distance
+    gu, gv = ev.grevilleParams()
+    nearU = np.clip(np.searchsorted(gu, u) + np.array([-1, 0]),
+                    0, len(gu) - 1)
+    nearV = np.clip(np.searchsorted(gv, v) + np.array([-1, 0]),
+                    0, len(gv) - 1)
+    uu, vv = np.meshgrid(gu[nearU], gv[nearV], indexing="ij")
+    onSurf = ev.positions(np.atleast_1d(u), np.atleast_1d(v))[0]
+    seeds = np.full((ev.numCVsInU, ev.numCVsInV), np.inf)
+    seeds[np.ix_(nearU, nearV)] = np.sqrt(((ev.positions(
+        uu.ravel(), vv.ravel()) - onSurf) ** 2).sum(-1)).reshape(uu.shape)
+    weights = falloffWeights(ev.cvGeodesics(seeds), maxDist, curve)
+
+    # cancel out the volume falloff on this surface's CVs
+    cvs = su.getSurfSnapshot(surf, "world").cvs
+    volume = softModFalloff(
+        softMod, np.sqrt(((cvs - center) ** 2).sum(-1)))
+    weights = np.where(volume > 1e-6,
+                       weights / np.where(volume > 1e-6, volume, 1.0), 0.0)
+    _setSurfWeights(softMod, surf, weights)
+    return weights
+
+
+def softModFalloff(softMod, dists):
+    """The softMod's own volume falloff at each world space distance from
+    its center: its falloffCurve ramp over its falloffRadius."""
+    ramp = softMod.falloffCurve
+    keys = [(ramp[i].falloffCurve_FloatValue.get(),
+             ramp[i].falloffCurve_Position.get(),
+             ramp[i].falloffCurve_Interp.get())
+            for i in ramp.getArrayIndices()]
+    curve = ",".join("{0},{1},{2}".format(*k) for k in keys)
+    return falloffWeights(dists, softMod.falloffRadius.get(), curve)
+
+
+def _setSurfWeights(dfm, surf, weights):
+    """Write a (numCVsInU, numCVsInV) array as the deformer's weights on
+    the surface, with one setAttr."""
+    weightUtil.setWeights(dfm, surf.getShape(), weights)
+
+
+def falloffWeights(dists, maxDist, curve=None):
+    """Weight of each distance through a soft select style falloff curve
+    stretched over 0 - maxDist, evaluated in Python (no remapValue node).
+    curve is a softSelect curve string of value,position,interp triples,
+    default the current soft select curve."""
+    if curve is None:
+        curve = pmc.softSelect(q=True, ssc=True)
+    keys = np.reshape([float(i) for i in curve.split(",")], (-1, 3))
+    keys = keys[np.argsort(keys[:, 1], kind="mergesort")]
+    values, positions, interps = keys.T
+    return nu.evalRamp(np.asarray(dists, dtype=float) / maxDist,
+                       positions, values, interps.astype(int))
+
+
 def getSurfUvAndWeight(c, tol=0.1):
     """Given a cluster, return a list of tuples for each surface containing
     the surface weight, the surf, and the average and weighted UV position"""
     objSet = c.message.outputs(type="objectSet")[0]
-    cpos = pmc.nt.ClosestPointOnSurface()
-    uvs = []
-    totalWt = sum(pmc.percent(c, objSet, q=True, v=True))
-
+    members = []
     for surf in objSet:
         shape = surf.node().getTransform()
-        shape.local >> cpos.inputSurface
-        surfWt = sum(pmc.percent(c, surf, q=True, v=True))
+        cvs = su.getSurfSnapshot(shape).cvs
+        indices = np.array(surf.indices(), dtype=int).reshape(-1, 2)
+        cvWts = getSurfWeights(c, shape)[indices[:, 0], indices[:, 1]]
+        members.append((shape, cvs[indices[:, 0], indices[:, 1]], cvWts))
+    totalWt = sum(cvWts.sum() for shape, pts, cvWts in members)
+
+    uvs = []
+    for shape, pts, cvWts in members:
+        surfWt = cvWts.sum()
         if uvs and surfWt < (totalWt * tol):
             # if surface consists of less than 10% (default) of total
             # weight, forget about it (as long as UVs isn't empty)
             continue
-        pos = pmc.dt.Vector()
-        for cv in surf:
-            cvWt = pmc.percent(c, cv, q=True, v=True)[0]
-            ind = cv.indices()[0]
-            cpos.inPosition.set(shape.getCV(*ind))
-            pos += cpos.position.get() * cvWt
-        avgPos = pos / surfWt
-        cpos.inPosition.set(avgPos)
-        uvs.append((surfWt, shape, cpos.u.get(), cpos.v.get()))
-    pmc.delete(cpos)
+        # project all the CVs in one go
+        projected = su.closestOnSurf(shape, pts)[2]
+        avgPos = np.dot(cvWts, projected) / surfWt
+        u, v = su.closestOnSurf(shape, avgPos)
+        uvs.append((surfWt, shape, u, v))
 
     return sortAndPruneUvs(uvs)
 
 
+def getSurfWeights(dfm, surf):
+    """(numCVsInU, numCVsInV) array of the deformer's weights on the
+    surface, read from its weightList in one query. Unset weights are 1."""
+    numU, numV = su.getSurfSnapshot(surf).cvs.shape[:2]
+    # weight index of surface CV [u][v] is u * numCVsInV + v
+    weights = weightUtil.getWeights(dfm, surf.getShape(), numU * numV)
+    return weights.reshape(numU, numV)
+
+
 def sortAndPruneUvs(uvs, threshold=0.25):
     """Massage the UVs list to sort in descending order
     and remove small weights"""
@@ -1,3 +1,4 @@
+import numpy as np
 import pymel.core as pmc
 
 import bkTools.mayaSceneUtil
@@ -11,6 +12,7 @@ makeFollCtrl
 makeCtrlShape
 makeJntDynamic
 addRigJnt
+addRigJnts
 setupJntLimits
 setJntColor
 hiliteDimension
@@ -20,8 +22,9 @@ limitJntInDimension
 
 def getRiggedJnts(surf):
     """Return a list of rigged joints associated with the given surface."""
-    return [c.rangeU.outputs(type="joint")[0] for c in surf.controls.get()
-            if hasattr(c, "rangeU")]
+    mirIdx = su.getMirrorIndex()
+    jnts = [mirIdx.jntForCtrl(c) for c in surf.controls.get()]
+    return [j for j in jnts if j]
 
 
 def makeFollCtrl(name, ctrlGrp, typeDict=None, rotOrder="xyz", shape="circle"):
@@ -140,54 +143,85 @@ def makeJntDynamic(surf, jnt, ctrl, rotOrder, n):
     jntRot.outputRotate >> jnt.rotate
 
 
-def addRigJnt(surf, n, names, rotOrder):
+def addRigJnt(surf, n, names, rotOrder, pos=None):
     """Make geoConstrained rig joint, follicle and ClosestPointOnSurface.
     User moves joint around and follicle follows, to preserve params.
-    At rig time, connection is removed and joint is parented under foll"""
+    At rig time, connection is removed and joint is parented under foll.
+    Joint starts at the surface point closest to pos (world space, 
+    default origin)"""
+    if pos is None:
+        pos = (0, 0, 0)
+    jnts = addRigJnts(surf, [n], names, rotOrder, [pos])
+    if jnts:
+        pmc.select(jnts[0])
+        return jnts[0]
+
+
+def addRigJnts(surf, ns, names, rotOrder, positions):
+    """Make many rig joints (as addRigJnt) in one planned build:
+    the display, selection and surface setup is done once, all of the
+    joints are placed with a single batched closest point query, and each
+    kind of node is made and hooked up for all joints at once. Args:
+    - ns: list of name format strings, one per joint
+    - positions: (N, 3) world space positions to start the joints nearest."""
 
     # need the transform
     if isinstance(surf, pmc.nt.NurbsSurface):
         surf = surf.getTransform()
     elif not hasattr(surf, "layeredTexture"):
         pmc.warning("addRigJnt input requires a nurbs surface")
-        return
+        return []
 
     bkTools.mayaSceneUtil.displayTextures()
-    # pmc.joint freaks out if selection is not perfect.
-    # just clear it
-    pmc.select(clear=True)
 
     grp = surf.getParent()
+    ctrlsGrp = surf.sCtrlsGrp.get()
     # make radius dependent on size of the surface - 1/2 its square "side length"
-    jnt = pmc.joint(n=n.format(type=names["joint"]), radius=surf.area() ** .5 / 2)
-    jnt.setParent(grp)
-    pmc.geometryConstraint(surf, jnt)
-    cpos = pmc.nt.ClosestPointOnSurface(n=n.format(type="CPOS"))
+    radius = surf.area() ** .5 / 2
+    # start the joints ON the surface, so the constraints have nothing to solve
+    onSurf = su.closestOnSurf(
+        surf, np.reshape(positions, (-1, 3)), local=False)[2]
+
+    # each stage is done for every joint before the next, all joints going
+    # straight under grp (pmc.joint would nest each under the last made),
+    # their local positions from one matrix read
+    toLocal = np.linalg.inv(mu.getWorldMatrices([grp])[0])
+    local = np.dot(np.c_[onSurf, np.ones(len(onSurf))], toLocal)[:, :3]
+    jnts = [pmc.createNode("joint", n=n.format(type=names["joint"]),
+                           parent=grp, skipSelect=True) for n in ns]
+    for jnt, pos in zip(jnts, local):
+        jnt.translate.set(*pos)
+        jnt.radius.set(radius)
+        jnt.addAttr("mirror", at="message")
+        # so surf can find its jnts later
+        jnt.message.connect(surf.unriggedJnts, nextAvailable=True)
+    for jnt in jnts:
+        pmc.geometryConstraint(surf, jnt)
+
     # cpos uses .ws, posi uses .local
     # before rigging, may have wierd results if xformed
     # but rigging inputs worldspace position to CPOS and it works out
-    surf.ws.connect(cpos.inputSurface)
-    jnt.translate.connect(cpos.inPosition)
+    cposNodes = [pmc.createNode("closestPointOnSurface",
+                                n=n.format(type="CPOS"), skipSelect=True)
+                 for n in ns]
+    for jnt, cpos in zip(jnts, cposNodes):
+        surf.ws.connect(cpos.inputSurface)
+        jnt.translate.connect(cpos.inPosition)
 
     # ctrl should only be oriented according to normal, not U and V
-    #ax = mu.getAxisForVector(self.follVec)
-    ctrlGrp, posi = su.fakeFollicle(
-        surf, name=n.format(type="stat{0}"), local=True, 
-        axes=rotOrder[0], rotOrder=rotOrder)[0:2]
-    ctrlGrp.setParent(surf.sCtrlsGrp.get())
-    # follicles are percent based ONLY, the fuckers.
-    # so the surface is normalized 0-1 in both u and v
-    cpos.parameterU.connect(posi.u)
-    cpos.parameterV.connect(posi.v)
-
-    # so surf can find its jnts later
-    jnt.message.connect(surf.unriggedJnts, nextAvailable=True)
-
-    setupJntLimits(surf, jnt, posi, n)
-    jnt.addAttr("mirror", at="message")
-
-    pmc.select(jnt)
-    return jnt
+    follicles = [su.fakeFollicle(
+        surf, name=n.format(type="stat{0}"), local=True,
+        axes=rotOrder[0], rotOrder=rotOrder)[0:2] for n in ns]
+    pmc.parent([ctrlGrp for ctrlGrp, _ in follicles], ctrlsGrp)
+    for jnt, cpos, (_, posi), n in zip(jnts, cposNodes, follicles, ns):
+        # follicles are percent based ONLY, the fuckers.
+        # so the surface is normalized 0-1 in both u and v
+        cpos.parameterU.connect(posi.u)
+        cpos.parameterV.connect(posi.v)
+        setupJntLimits(surf, jnt, posi, n)
+
+    pmc.select(clear=True)
+    return jnts
 
 
 def setupJntLimits(srf, jnt, posi, name):
@@ -1,5 +1,6 @@
 """Older functions related to surface-based rigging."""
 import pymel.core as pmc
+from bkTools import meshUtil, surfaceUtil as su
 
 
 
@@ -36,29 +37,39 @@ def organizeNodes():
 
 # trying to reduce complex edge sort to just True/False
 #
-def polyEdgeSort(self, other, direc, sel):
-    # vertices for the edge being compared to
-    vts = [v for v in iter(other.connectedVertices())]
-    # conn = [e for e in getConnectedCmpnts([vts[direc]], "Edges") if e != self]
-    # get all of the edges flowing from either the [0] or [1] vert
-    conn = [e for e in iter(vts[direc].connectedEdges()) if e != other]
-    # get overlap between selection and conn...
-    # should be exactly one edge
-    try:
-        nex = list(set(conn) & set(sel))[0]
-    except IndexError:
-        # no edges flowing from vert are in selection
-        # usually means end of selected edge arc
-        # can I assume that this means it's in the
-        # other direction?
-        return not bool(direc)
-    else:
-        # loop continues in this direc, see if it's target
-        if self == nex:
+def edgeSortData(sel):
+    """The (topology, selected edge indices) that polyEdgeSort needs,
+    looked up once per selection rather than once per comparison."""
+    mesh, _, selInds = su.getCmpntIndices(sel)
+    return su.getMeshTopology(mesh), set(selInds)
+
+
+def polyEdgeSort(self, other, direc, topo, selInds):
+    """Whether edge self is found by following the selected edges away from
+    edge other, out of its [direc] vertex. Walks the mesh's cached topology
+    rather than the edges' connected components. Args:
+    - topo, selInds: from edgeSortData of the selection."""
+    start = cur = other.index()
+    vert = topo.edges[cur, direc]
+    while True:
+        # get all of the edges flowing from the vert, overlap with selection.
+        # should be exactly one edge
+        conn = [e for e in meshUtil.csrRows(
+            topo.vertEdgeOffsets, topo.vertEdges, [vert])[1]
+            if e != cur and e in selInds]
+        if not conn or conn[0] == start:
+            # no edges flowing from vert are in selection
+            # usually means end of selected edge arc
+            # can I assume that this means it's in the
+            # other direction?
+            return not bool(direc)
+        cur = conn[0]
+        if cur == self.index():
+            # loop continues in this direc, and found the target
             return bool(direc)
-        else:
-            # next up
-            return polyEdgeSort(self, nex, direc, sel)
+        # next up
+        a, b = topo.edges[cur]
+        vert = b if a == vert else a
 
 
 def getFacePerimeterCurve(faces):
@@ -143,20 +154,11 @@ def makeAssets():
         s.container >> cont.surface
 
 
-def makeMirrorable():
-    ctrls = [c for c in pmc.ls() if 
-        (hasattr(c, "parentControls") and not hasattr(c, "childControls"))]
-    for c in ctrls:
-        c.addAttr("mirror", at="message")
-        mirC = c.rangeU.outputs()[0].mirror.get().rangeU.inputs()[0]
-        try:
-            c.mirror >> mirC.mirror
-        except AttributeError:
-            pass
-
-    for p in pars:
-        if not hasattr(p, "mirror"):
-            p.addAttr("mirror", at="message")
+def makeMirrorable(mirVec=(1, 0, 0), tol=.01):
+    """Connect mirrors for an old rig, now by position. See
+    autoRigger.pairMirrorsByPosition."""
+    from bkTools.surfRig import autoRigger
+    return autoRigger.pairMirrorsByPosition(mirVec, tol)
 
 
 def fixPosiWeights():
@@ -77,6 +77,9 @@ class Ui_SurfRigWindow(object):
         self.simpleSurfButton = QtWidgets.QPushButton(self.centralwidget)
         self.simpleSurfButton.setObjectName("simpleSurfButton")
         self.horizontalLayout_16.addWidget(self.simpleSurfButton)
+        self.fitSurfButton = QtWidgets.QPushButton(self.centralwidget)
+        self.fitSurfButton.setObjectName("fitSurfButton")
+        self.horizontalLayout_16.addWidget(self.fitSurfButton)
         self.initSurfButton = QtWidgets.QPushButton(self.centralwidget)
         self.initSurfButton.setObjectName("initSurfButton")
         self.horizontalLayout_16.addWidget(self.initSurfButton)
@@ -309,6 +312,12 @@ class Ui_SurfRigWindow(object):
         self.verticalLayout_4.setObjectName("verticalLayout_4")
         self.horizontalLayout_7 = QtWidgets.QHBoxLayout()
         self.horizontalLayout_7.setObjectName("horizontalLayout_7")
+        self.newSoftClusterButton = QtWidgets.QPushButton(self.deformersGrp)
+        self.newSoftClusterButton.setObjectName("newSoftClusterButton")
+        self.horizontalLayout_7.addWidget(self.newSoftClusterButton)
+        self.newSoftModButton = QtWidgets.QPushButton(self.deformersGrp)
+        self.newSoftModButton.setObjectName("newSoftModButton")
+        self.horizontalLayout_7.addWidget(self.newSoftModButton)
         self.clusterHandleButton = QtWidgets.QPushButton(self.deformersGrp)
         self.clusterHandleButton.setObjectName("clusterHandleButton")
         self.horizontalLayout_7.addWidget(self.clusterHandleButton)
@@ -375,6 +384,8 @@ class Ui_SurfRigWindow(object):
         self.newSurfButton.setText(QtCompat.translate("SurfRigWindow", "Create surface from guides", None, -1))
         self.simpleSurfButton.setToolTip(QtCompat.translate("SurfRigWindow", "Create a 2x3 span nurbs plane at the average position of selected edges.", None, -1))
         self.simpleSurfButton.setText(QtCompat.translate("SurfRigWindow", "Create simple surface", None, -1))
+        self.fitSurfButton.setToolTip(QtCompat.translate("SurfRigWindow", "Create a NURBS surface fit to the mesh inside the selected closed edge loop.", None, -1))
+        self.fitSurfButton.setText(QtCompat.translate("SurfRigWindow", "Fit surface to region", None, -1))
         self.initSurfButton.setToolTip(QtCompat.translate("SurfRigWindow", "Create hierarchy and attributes on selected user-made surface(s),\n"
 "allowing them to be used fully with this surface rigging tool.", None, -1))
         self.initSurfButton.setText(QtCompat.translate("SurfRigWindow", "Initialize existing surface", None, -1))
@@ -473,6 +484,12 @@ class Ui_SurfRigWindow(object):
         self.deformersGrp.setToolTip(QtCompat.translate("SurfRigWindow", "The strength of mesh-guided surface rigging is its ability to define blendshape-ready regions.\n"
 "SoftMod deformers, SoftClusters (available online), and MayaMuscle systems are also highly recommended.", None, -1))
         self.deformersGrp.setTitle(QtCompat.translate("SurfRigWindow", "Deformer tools", None, -1))
+        self.newSoftClusterButton.setToolTip(QtCompat.translate("SurfRigWindow", "Create a soft cluster on each surface from its selected CVs,\n"
+"weighted by the current soft select distance and falloff curve.", None, -1))
+        self.newSoftClusterButton.setText(QtCompat.translate("SurfRigWindow", "Soft cluster from CVs", None, -1))
+        self.newSoftModButton.setToolTip(QtCompat.translate("SurfRigWindow", "Create a softMod on each surface from its selected CVs,\n"
+"weighted by the current soft select distance, falloff curve and mode.", None, -1))
+        self.newSoftModButton.setText(QtCompat.translate("SurfRigWindow", "SoftMod from CVs", None, -1))
         self.clusterHandleButton.setToolTip(QtCompat.translate("SurfRigWindow", "Create control shapes for selected relative-mode deformer handles.\n"
 "The controls move as their associated surfaces are deformed by other means.", None, -1))
         self.clusterHandleButton.setText(QtCompat.translate("SurfRigWindow", "Control selected deformer", None, -1))
@@ -1,5 +1,16 @@
+import os
+import re
+import sys
+import numpy as np
 import pymel.core as pmc
+import maya.api.OpenMaya as om2
+from maya.OpenMaya import (MNodeMessage, MPolyMessage, MSceneMessage,
+                            MMessage, MDGMessage, MEventMessage, MFnAttribute)
 import matrixUtil as mu
+import nurbsUtil as nu
+import meshUtil
+import spatialUtil
+import weightUtil
 
 
 __author__ = "Brendan Kelly"
@@ -12,23 +23,50 @@ __email__ = "clamdragon@gmail.com"
 """
 getAllSurfs
 getSelectedSurfs
+getApiSurf
+SurfSnapshot
+getSurfSnapshot
+evictSurfSnapshots
+clearSurfCache
+surfCacheStats
+setSurfCVs
+setSurfCVsAt
+getSurfEvaluator
+getApiMesh
+getMeshTopology
+evictMeshTopology
+clearMeshCache
+getMeshPoints
+getMeshNormals
+getCmpntVerts
+getCmpntAvgPos
+getCmpntIndices
+indexedCmpnts
 fakeFollicle
 makeFakeFollMatrix
 getSelPolyEdges
 getSymSelection
 makeNiceCurveFromEdges
 makeSurfFromEdges
+makeSurfsFromEdges
+makeFitSurf
+makeFitSurfs
 makeOpenSurf
 orientSurf
 makeSimpleSurf
 flattenComponents
+getConnectedIndices
 getConnectedCmpnts
 getPolyAvgNormal
 getMirrorParam
 closestOnSurf
+intersectSurf
 avgSurfVectors
 makeOrigShape
 origShapeMode
+MirrorIndex
+getMirrorIndex
+clearMirrorIndex
 mirrorSurfWeights
 makeFollOnSel
 makeFollicle
@@ -63,6 +101,326 @@ def getSelectedSurfs(withAttr=None):
         return list(set(surfs))
 
 
+# maya.api space and form constants, by their pymel names
+_apiSpaces = {
+    "object": om2.MSpace.kObject,
+    "preTransform": om2.MSpace.kObject,
+    "world": om2.MSpace.kWorld}
+_apiForms = {
+    om2.MFnNurbsSurface.kOpen: "open",
+    om2.MFnNurbsSurface.kClosed: "closed",
+    om2.MFnNurbsSurface.kPeriodic: "periodic"}
+
+
+def getApiSurf(surf):
+    """Return a maya.api MFnNurbsSurface for the given surface
+    transform or shape, for bulk data access."""
+    if isinstance(surf, pmc.nt.Transform):
+        surf = surf.getShape()
+    sel = om2.MSelectionList()
+    sel.add(surf.longName())
+    return om2.MFnNurbsSurface(sel.getDagPath(0))
+
+
+class SurfSnapshot(object):
+    """Immutable copy of a surface's geometry - CVs, weights, knots, degrees,
+    spans and forms - read in one go through maya.api.
+    Get these from getSurfSnapshot, which caches them per surface."""
+    def __init__(self, fn, space="object"):
+        self.space = space
+        self.handle = om2.MObjectHandle(fn.object())
+        pts = np.array([tuple(p) for p in fn.cvPositions(_apiSpaces[space])])
+        shape = (fn.numCVsInU, fn.numCVsInV)
+        self.cvs = _frozen(pts[:, :3].reshape(shape + (3,)))
+        # w holds the weight, which is 1 everywhere for non-rational surfaces
+        self.weights = _frozen(pts[:, 3].reshape(shape))
+        self.knotsU = tuple(fn.knotsInU())
+        self.knotsV = tuple(fn.knotsInV())
+        self.degreeU, self.degreeV = fn.degreeInU, fn.degreeInV
+        self.spansU, self.spansV = fn.numSpansInU, fn.numSpansInV
+        self.formU, self.formV = _apiForms[fn.formInU], _apiForms[fn.formInV]
+        self._evaluator = None
+        self._bvh = None
+
+    @property
+    def numCVsInU(self):
+        return self.cvs.shape[0]
+
+    @property
+    def numCVsInV(self):
+        return self.cvs.shape[1]
+
+    @property
+    def evaluator(self):
+        """nurbsUtil.SurfaceEvaluator for this snapshot, built on first use."""
+        if self._evaluator is None:
+            self._evaluator = nu.SurfaceEvaluator(
+                self.cvs, self.knotsU, self.knotsV, self.degreeU,
+                self.degreeV, weights=self.weights,
+                formU=self.formU, formV=self.formV)
+        return self._evaluator
+
+    @property
+    def bvh(self):
+        """nurbsUtil.PatchBVH over this snapshot's patches, built on first use
+        and dropped along with the snapshot when the surface changes."""
+        if self._bvh is None:
+            self._bvh = nu.PatchBVH(self.evaluator)
+        return self._bvh
+
+    @property
+    def searcher(self):
+        """Whatever answers closest point queries fastest for this surface -
+        the BVH once there are enough patches to pay for building it,
+        otherwise the evaluator's plain grid search."""
+        if self.spansU * self.spansV >= BVH_MIN_PATCHES:
+            return self.bvh
+        return self.evaluator
+
+
+def _frozen(arr):
+    """Make a numpy array read-only, so snapshots can be safely shared."""
+    arr.flags.writeable = False
+    return arr
+
+
+# below this many spans, a grid search is cheaper than building a BVH
+BVH_MIN_PATCHES = 64
+
+# snapshot cache, keyed by (shape, space). Entries are evicted by
+# dirty callbacks on the shape, so they're only ever as old as the last edit
+_surfCache = {}
+_surfCallbacks = {}
+_surfCacheStats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def getSurfSnapshot(surf, space="object"):
+    """Return the cached SurfSnapshot of the given surface transform or shape,
+    reading the surface only if it has changed since the last call."""
+    if isinstance(surf, pmc.nt.Transform):
+        surf = surf.getShape()
+    key = (surf, space)
+    snap = _surfCache.get(key)
+    if snap is not None and snap.handle.isValid():
+        _surfCacheStats["hits"] += 1
+        return snap
+
+    _surfCacheStats["misses"] += 1
+    snap = SurfSnapshot(getApiSurf(surf), space)
+    _surfCache[key] = snap
+    if surf not in _surfCallbacks:
+        _watchSurf(surf)
+    return snap
+
+
+def _watchSurf(shape):
+    """Add the callbacks which evict the shape's snapshots when it changes
+    (any dirtied plug, ie CV edits, deformers, parent transforms)
+    or is deleted."""
+    def dirty(*args):
+        evictSurfSnapshots(shape)
+
+    def removed(*args):
+        evictSurfSnapshots(shape, unwatch=True)
+
+    mobj = shape.__apimobject__()
+    _surfCallbacks[shape] = (
+        MNodeMessage.addNodeDirtyCallback(mobj, dirty),
+        MNodeMessage.addNodePreRemovalCallback(mobj, removed))
+
+
+def evictSurfSnapshots(shape, unwatch=False):
+    """Drop all cached snapshots of the given shape, optionally
+    removing its callbacks too."""
+    for key in [k for k in _surfCache if k[0] == shape]:
+        del _surfCache[key]
+        _surfCacheStats["invalidations"] += 1
+    if unwatch:
+        for cbid in _surfCallbacks.pop(shape, ()):
+            MMessage.removeCallback(cbid)
+
+
+def clearSurfCache():
+    """Drop every cached snapshot and remove all cache callbacks."""
+    for shape in list(_surfCallbacks):
+        evictSurfSnapshots(shape, unwatch=True)
+    _surfCache.clear()
+
+
+def surfCacheStats(reset=False):
+    """Return a copy of the snapshot cache's hit/miss/invalidation counters,
+    eg to confirm it's doing its job during SurfaceEditor drags."""
+    stats = dict(_surfCacheStats, size=len(_surfCache))
+    if reset:
+        for k in _surfCacheStats:
+            _surfCacheStats[k] = 0
+    return stats
+
+
+def setSurfCVs(surf, cvs, space="object"):
+    """Write a whole (numCVsInU, numCVsInV, 3) CV grid to the surface with
+    one bulk set and one updateSurface."""
+    if isinstance(surf, pmc.nt.Transform):
+        surf = surf.getShape()
+    surf.setCVs([pmc.dt.Point(*p) for p in np.reshape(cvs, (-1, 3))],
+                space=space)
+    surf.updateSurface()
+
+
+def setSurfCVsAt(surf, indices, points, space="object"):
+    """Write just the CVs at the given (u, v) indices, then one
+    updateSurface. Cheaper than setSurfCVs when only a few have changed."""
+    if isinstance(surf, pmc.nt.Transform):
+        surf = surf.getShape()
+    for (u, v), p in zip(indices, points):
+        surf.setCV(int(u), int(v), pmc.dt.Point(*p), space=space)
+    surf.updateSurface()
+
+
+def getSurfEvaluator(surf, space="object"):
+    """Return a headless nurbsUtil.SurfaceEvaluator for the surface, from its
+    cached snapshot. It gives positions, normals and tangents for whole
+    arrays of params in one call."""
+    return getSurfSnapshot(surf, space).evaluator
+
+
+def getApiMesh(mesh):
+    """Return a maya.api MFnMesh for the given mesh transform or shape."""
+    if isinstance(mesh, pmc.nt.Transform):
+        mesh = mesh.getShape()
+    sel = om2.MSelectionList()
+    sel.add(mesh.longName())
+    return om2.MFnMesh(sel.getDagPath(0))
+
+
+# topology cache, keyed by mesh shape. Only topology changes evict entries -
+# moving, deforming or skinning the mesh leaves them valid
+_meshCache = {}
+_meshCallbacks = {}
+_edgeInfo = re.compile(r"EDGE\s+(\d+):\s+(\d+)\s+(\d+)")
+
+
+def _readMeshTopology(fn):
+    """Build a meshUtil.MeshTopology from bulk index arrays of the mesh."""
+    counts, verts = fn.getVertices()
+    # edge ids are Maya's own, so they can't be derived from the faces, and
+    # the API only gives them one edge at a time. One polyInfo lists them
+    # all instead, its "EDGE id: vert vert Hard" lines parsed in one pass
+    info = pmc.polyInfo("{0}.e[*]".format(fn.fullPathName()),
+                        edgeToVertex=True) or []
+    ids = np.array(_edgeInfo.findall("".join(info)), dtype=int).reshape(-1, 3)
+    edges = np.zeros((fn.numEdges, 2), dtype=int)
+    edges[ids[:, 0]] = ids[:, 1:]
+    return meshUtil.MeshTopology(fn.numVertices, edges, counts, verts)
+
+
+def getMeshTopology(mesh):
+    """Return the cached meshUtil.MeshTopology of the given mesh transform
+    or shape, reading the mesh only if its topology has changed."""
+    if isinstance(mesh, pmc.nt.Transform):
+        mesh = mesh.getShape()
+    cached = _meshCache.get(mesh)
+    if cached is not None and cached[0].isValid():
+        return cached[1]
+
+    fn = getApiMesh(mesh)
+    topo = _readMeshTopology(fn)
+    _meshCache[mesh] = (om2.MObjectHandle(fn.object()), topo)
+    if mesh not in _meshCallbacks:
+        _watchMesh(mesh)
+    return topo
+
+
+def _watchMesh(shape):
+    """Add the callbacks which evict the mesh's topology when it changes
+    or the mesh is deleted."""
+    def changed(*args):
+        evictMeshTopology(shape)
+
+    def removed(*args):
+        evictMeshTopology(shape, unwatch=True)
+
+    mobj = shape.__apimobject__()
+    _meshCallbacks[shape] = (
+        MPolyMessage.addPolyTopologyChangedCallback(mobj, changed),
+        MNodeMessage.addNodePreRemovalCallback(mobj, removed))
+
+
+def evictMeshTopology(shape, unwatch=False):
+    """Drop the cached topology of the given mesh shape, optionally
+    removing its callbacks too."""
+    _meshCache.pop(shape, None)
+    if unwatch:
+        for cbid in _meshCallbacks.pop(shape, ()):
+            MMessage.removeCallback(cbid)
+
+
+def clearMeshCache():
+    """Drop every cached topology and remove all mesh cache callbacks."""
+    for shape in list(_meshCallbacks):
+        evictMeshTopology(shape, unwatch=True)
+    _meshCache.clear()
+
+
+def getMeshPoints(mesh, space="world"):
+    """(numVerts, 3) array of every vertex position of the mesh,
+    read in one call."""
+    pts = getApiMesh(mesh).getPoints(_apiSpaces[space])
+    return np.array(pts)[:, :3]
+
+
+def getMeshNormals(mesh, compType="Faces", space="world"):
+    """(N, 3) array of unit normals for every face or vertex of the mesh.
+    Vertex normals are Maya's own (so locked normals are respected),
+    face normals are computed from the points and cached topology."""
+    if compType == "Vertices":
+        normals = getApiMesh(mesh).getVertexNormals(False, _apiSpaces[space])
+        return np.array(normals)
+    return meshUtil.faceNormals(getMeshPoints(mesh, space),
+                                getMeshTopology(mesh))
+
+
+def getCmpntVerts(cmpnts):
+    """The vertices of the given mesh components, of any one type
+    (a vertex's are itself). Returns (mesh shape, array of indices)."""
+    mesh, compType, indices = getCmpntIndices(cmpnts)
+    if compType == "Vertices":
+        return mesh, np.unique(indices)
+    return mesh, getMeshTopology(mesh).connected(indices, compType, "Vertices")
+
+
+def getCmpntAvgPos(cmpnts, space="world"):
+    """Average position of the given mesh components' vertices."""
+    mesh, verts = getCmpntVerts(cmpnts)
+    return pmc.dt.Point(*meshUtil.meanPosition(getMeshPoints(mesh, space),
+                                                verts))
+
+
+_cmpntTypes = (
+    (pmc.MeshVertex, "Vertices"), (pmc.MeshEdge, "Edges"),
+    (pmc.MeshFace, "Faces"))
+_cmpntAttrs = {"Vertices": "vtx", "Edges": "e", "Faces": "f"}
+
+
+def getCmpntIndices(cmpnts):
+    """Given mesh components of one type (flattened or not),
+    return (mesh shape, component type, array of indices).
+    Type is named like the PyMEL methods: Vertices, Edges or Faces."""
+    indices = []
+    for c in cmpnts:
+        indices.extend(c.indices())
+    compType = [t for cls, t in _cmpntTypes if isinstance(cmpnts[0], cls)][0]
+    return cmpnts[0].node(), compType, np.array(indices, dtype=int)
+
+
+def indexedCmpnts(mesh, compType, indices):
+    """Flat list of PyMEL components of the mesh shape, from indices."""
+    if not len(indices):
+        return []
+    name = "{0}.{1}[{{0}}]".format(mesh.name(), _cmpntAttrs[compType])
+    return pmc.ls([name.format(i) for i in indices], flatten=True)
+
+
 def fakeFollicle(srf, name=None, local=False, axes="xyz", rotOrder="xyz"):
     """A less expensive "follicle", made by combination of a
     pointOnSurfaceInfo and decomposed FourByFourMatrix node."""
@@ -144,57 +502,116 @@ def getSymSelection():
 
 def makeNiceCurveFromEdges(sel, symVec=None, numSpans=None):
     """Take selection of poly edges and turn into
-    nice nurbs curve with seam along axis of sym (if relevant)"""
-
+    nice nurbs curve with seam along axis of sym (if relevant).
+    The edges are ordered from the mesh topology and the curve is
+    least squares fit to their points, so nothing is built in the scene
+    except the final curve."""
+    mesh, _, edges = getCmpntIndices(sel)
+    job = _curveFitJob(getMeshTopology(mesh), getMeshPoints(mesh), edges,
+                       symVec, numSpans)
+    return _curveFromFit(nu.fitCurve(*job), periodic=job[-1])
+
+
+def _curveFitJob(topo, points, edges, symVec=None, numSpans=None):
+    """Arguments for nurbsUtil.fitCurve for one chain of edges. Just plain
+    arrays, so the fit itself can be run in another process."""
+    verts, _, closed = topo.sortEdgeChain(edges)
     # how many spans?
     if not numSpans:
-        # clamp it to 1-8; over 8 is excessive and numSpans arg of 0 is ignored
+        # clamp it to 1-8; over 8 is excessive
         #numSpans = max(1, min(8, (len(sel) / 8) * 2))
-        numSpans = max(1, min(8, len(sel) / 4))
-
-    # form 2 is "best guess", pretty reliable for
-    # distinguishing periodic vs open
-    crv = pmc.PyNode(pmc.polyToCurve(dg=3, f=2, ch=0)[0])
+        numSpans = max(1, min(8, len(edges) // 4))
+    if closed:
+        # a periodic cubic needs at least 3 spans
+        numSpans = max(numSpans, 3)
+
+    pts = points[verts]
+    if symVec and closed:
+        # start the loop on the plane of symmetry, so that
+        # the fit curve's seam doesn't result in unexpected asymmetry
+        # IF it actually crosses the plane. If not, could be intentional,
+        # so no warning.
+        onPlane = nu.startLoopOnPlane(pts, symVec)
+        if onPlane is not None:
+            pts = onPlane
+    return pts, numSpans, 3, closed
+
+
+def _curveFromFit(fit, periodic):
+    """Make the curve for a fitCurve result."""
+    cvs, knots = fit
+    crv = pmc.curve(d=3, p=cvs.tolist(), k=knots.tolist(), periodic=periodic)
     pmc.xform(crv, centerPivots=True)
+    return crv
 
-    if symVec and crv.form() != "open":
-        # move seam to along axis, so that
-        # rebuilding the curve doesn't result in unexpected asymmetry
-        intPt = getMirrorParam(crv, symVec)
-        # IF it actually crosses the axis
-        try:
-            intPt = float(intPt.split(" ")[0])
-            pmc.select(crv.u[intPt])
-            pmc.mel.eval("moveNurbsCurveSeam")
-        except (AttributeError, pmc.MelError):
-            # AttributeError means there is no good mnirror seam.
-            # could be intentional, so no warning.
-            # MelError means seam is already at the best point.
-            pass
-
-    # rebuilding surface instead of curve keeps weird all-0-cv bugs away
-    #
-    # try rebuild curve instead of surface to help w/ recurring asym issue
-    # or wait wasn't that solved by kc=0?
-    #
-    pmc.rebuildCurve(
-        crv, rebuildType=0, keepRange=0, spans=numSpans, ch=0, rpo=True)
 
-    return crv
+def _mayapyPath():
+    """Interpreter for worker processes. Inside Maya, sys.executable is
+    Maya itself - mayapy lives next to it (or in ../bin on OSX)."""
+    folder, exe = os.path.split(sys.executable)
+    if exe.lower().startswith(("mayapy", "python")):
+        return sys.executable
+    exe = "mayapy.exe" if os.name == "nt" else "mayapy"
+    for path in (os.path.join(folder, exe),
+                 os.path.join(folder, os.pardir, "bin", exe)):
+        if os.path.isfile(path):
+            return os.path.normpath(path)
+    return None
+
+
+def _getSelChains():
+    """Symmetry-aware selection of mesh edges, split into separate chains.
+    Returns (mesh, topology, points, chains), or None if there's no
+    useful selection."""
+    sel = getSymSelection()
+    if not sel or len(sel) < 2:
+        return None
+    mesh, _, edges = getCmpntIndices(sel)
+    topo = getMeshTopology(mesh)
+    return mesh, topo, getMeshPoints(mesh), topo.edgeChains(edges)
 
 
 def makeSurfFromEdges(name="untitled_SURF_RIG", symVec=None, numSpans=None):
     """Create a surface based on the selected mesh edges"""
+    surfs = makeSurfsFromEdges(name, symVec, numSpans)
+    return surfs[0] if surfs else None
 
-    sel = getSymSelection()
-    if not sel or len(sel) < 2:
-        pmc.warning("Surface not created. Select two or more mesh edges.")
-        return
-    crv = makeNiceCurveFromEdges(sel, symVec, numSpans)
 
+def makeSurfsFromEdges(name="untitled_SURF_RIG", symVec=None, numSpans=None):
+    """Create a surface for every separate chain of selected mesh edges,
+    eg a whole face template at once. All the curve fits are done up front
+    (each only takes milliseconds, so serially), then the surfaces are
+    built from them one by one."""
+
+    chainSel = _getSelChains()
+    if not chainSel:
+        pmc.warning("Surface not created. Select two or more mesh edges.")
+        return []
+    mesh, topo, points, chains = chainSel
+    fitChains, jobs = [], []
+    for chain in chains:
+        try:
+            jobs.append(_curveFitJob(topo, points, chain, symVec, numSpans))
+        except ValueError as err:
+            pmc.warning("Edges {0} skipped: {1}.".format(chain.tolist(), err))
+            continue
+        fitChains.append(chain)
+    fits = [nu.fitCurve(*job) for job in jobs]
+
+    surfs = []
+    for chain, job, fit in zip(fitChains, jobs, fits):
+        crv = _curveFromFit(fit, periodic=job[-1])
+        surfs.append(_surfFromCurve(
+            crv, mesh, indexedCmpnts(mesh, "Edges", chain), name))
+    return surfs
+
+
+def _surfFromCurve(crv, mesh, edges, name):
+    """Extrude (open) or loft (closed) the guide curve into a surface,
+    which replaces the curve."""
     # find distance to offset curve by
     if crv.form() == "open":
-        surf = makeOpenSurf(crv, sel[0].node(), name)
+        surf = makeOpenSurf(crv, mesh, name)
     else:
         crv2 = pmc.duplicate(crv)[0]
         # loops get scaled
@@ -223,12 +640,62 @@ def makeSurfFromEdges(name="untitled_SURF_RIG", symVec=None, numSpans=None):
 
     # determine if its normal is "backwards" - get normal of random vert,
     # then normal of surf at the closest point to that vert
-    surf = orientSurf(surf, sel)
+    surf = orientSurf(surf, edges)
     pmc.delete(crv)
 
     return surf
 
 
+def makeFitSurf(name="untitled_SURF_RIG", spansU=3, spansV=2,
+                smoothing=1e-4):
+    """Create a surface fit straight to the mesh inside the selected, closed
+    edge loop: a least squares fit of all the vertices in the region,
+    params from their projection onto the region's best fit plane.
+    Args:
+    - spansU, spansV: spans of the new surface. U runs along the region's
+        longest side
+    - smoothing: see nurbsUtil.fitSurface"""
+    surfs = makeFitSurfs(name, spansU, spansV, smoothing)
+    return surfs[0] if surfs else None
+
+
+def makeFitSurfs(name="untitled_SURF_RIG", spansU=3, spansV=2,
+                 smoothing=1e-4):
+    """makeFitSurf for every separate selected edge loop at once, with the
+    fits done in parallel if they're big enough (see nurbsUtil.mapJobs)."""
+
+    chainSel = _getSelChains()
+    if not chainSel:
+        pmc.warning("Surface not created. Select a closed mesh edge loop.")
+        return []
+    mesh, topo, points, chains = chainSel
+    loops, jobs = [], []
+    for chain in chains:
+        try:
+            loop, _, closed = topo.sortEdgeChain(chain)
+        except ValueError as err:
+            pmc.warning("Edges {0} skipped: {1}.".format(chain.tolist(), err))
+            continue
+        if not closed:
+            pmc.warning("Edges {0} skipped, they don't form a loop.".format(
+                chain.tolist()))
+            continue
+        pts = points[topo.enclosedVerts(loop)]
+        u, v = nu.planarParams(pts)
+        loops.append(chain)
+        jobs.append((pts, u, v, spansU, spansV, 3, smoothing))
+    work = sum(len(job[0]) for job in jobs) * (spansU + 3) * (spansV + 3)
+    fits = nu.mapJobs(nu.fitSurface, jobs, work, executable=_mayapyPath())
+
+    surfs = []
+    for chain, (cvs, knotsU, knotsV) in zip(loops, fits):
+        surf = pmc.surface(du=3, dv=3, ku=knotsU.tolist(),
+                           kv=knotsV.tolist(), p=cvs.reshape(-1, 3).tolist(),
+                           n=name)
+        surfs.append(orientSurf(surf, indexedCmpnts(mesh, "Edges", chain)))
+    return surfs
+
+
 def makeOpenSurf(crv, mesh, name):
     """New method for making the surface for OPEN curves
     make profile curve with 1/4 length of path curve
@@ -259,14 +726,13 @@ def orientSurf(surf, edges):
     just a cosmetic issue, but is nice to get right"""
 
     # mesh normal
-    plyNrm = getPolyAvgNormal(getConnectedCmpnts(edges, "Vertices"))
-    # nurbs surface normal
-    srfNrm = pmc.dt.Vector()
-    # just get a sampling
-    for u in [.1, .4, .6, .9]:
-        for v in [.1, .4, .6, .9]:
-            srfNrm += surf.normal(u, v, space="world")
-    srfNrm.normalize()
+    mesh, vts = getConnectedIndices(edges, "Vertices")
+    plyNrm = pmc.dt.Vector(*meshUtil.sumNormals(
+        getMeshNormals(mesh, "Vertices"), vts))
+    # nurbs surface normal - just get a sampling
+    u, v = np.meshgrid([.1, .4, .6, .9], [.1, .4, .6, .9])
+    srfNrm = getSurfEvaluator(surf, "world").normals(u.ravel(), v.ravel())
+    srfNrm = pmc.dt.Vector(*srfNrm.sum(axis=0)).normal()
 
     # negative dot product indicates they're pointing in *roughly*
     # opposite directions. Good enough to say it needs reversed.
@@ -281,9 +747,10 @@ def makeSimpleSurf(name="UNTITLED_SURF_RIG"):
     with the average normal."""
     sel = getSymSelection()
     if sel:
-        vts = getConnectedCmpnts(sel, "Vertices")
-        normal = getPolyAvgNormal(vts)
-        pos = sum(v.getPosition("world") for v in vts) / len(vts)
+        mesh, vts = getConnectedIndices(sel, "Vertices")
+        normal = pmc.dt.Vector(*meshUtil.sumNormals(
+            getMeshNormals(mesh, "Vertices"), vts))
+        pos = pmc.dt.Point(*meshUtil.meanPosition(getMeshPoints(mesh), vts))
     else:
         pmc.warning("No guide edges selected, surface created at origin.")
         normal = (1, 0, 0)
@@ -297,31 +764,33 @@ def flattenComponents(cmpnts):
     (internal array?), eg MeshEdge[96:111]
     this function makes the list pythonic"""
 
-    pCmps = []
-    for c in cmpnts:
-        pCmps.extend([d for d in iter(c)])
-    return pCmps
+    if not cmpnts:
+        return []
+    return pmc.ls(cmpnts, flatten=True)
+
+
+def getConnectedIndices(inComp, compType="Faces"):
+    """Like getConnectedCmpnts, but answered from the mesh's cached
+    topology without making any components.
+    Returns (mesh shape, array of indices)."""
+    mesh, inType, indices = getCmpntIndices(inComp)
+    topo = getMeshTopology(mesh)
+    return mesh, topo.connected(indices, inType, compType)
 
 
 def getConnectedCmpnts(inComp, compType="Faces"):
     """Return Maya mesh components as a PYTHON list,
     not whatever kind of internal typed list it does by default"""
-
-    outComp = set()
-    inComp = flattenComponents(inComp)
-    for c in inComp:
-        getCmpnts = getattr(c, "connected{0}".format(compType))
-        outComp.update(flattenComponents(getCmpnts()))
-    return list(outComp)
+    mesh, indices = getConnectedIndices(inComp, compType)
+    return indexedCmpnts(mesh, compType, indices)
 
 
 def getPolyAvgNormal(faces):
-    """For the list of MeshFaces, get the average normal vector"""
-    v = pmc.dt.Vector()
-    for f in faces:
-        v += f.getNormal("world")
-    v.normalize()
-    return v
+    """For the list of MeshFaces (or MeshVertices), get the average
+    normal vector"""
+    mesh, compType, indices = getCmpntIndices(faces)
+    normals = getMeshNormals(mesh, compType)
+    return pmc.dt.Vector(*meshUtil.sumNormals(normals, np.unique(indices)))
 
 
 def getMirrorParam(crv, symVec):
@@ -341,37 +810,36 @@ def getMirrorParam(crv, symVec):
     return intPt
 
 
-def closestOnSurf(surf, pos, local=True, point=False):
-    """Convenience function since nurbsSurface.closestPoint is bugged"""
-
-    cpos = pmc.nt.ClosestPointOnSurface()
-    if local:
-        sa = surf.local
-    else:
-        sa = surf.ws
-    sa >> cpos.inputSurface
-    cpos.inPosition.set(pos)
+def closestOnSurf(surf, positions, local=True, point=False):
+    """Closest point(s) on surface, without any ClosestPointOnSurface node.
+    A single position returns (u, v), or the point if point=True, as before.
+    An (N, 3) list/array of positions is projected in one batched solve
+    and returns (u, v, points) arrays."""
+    snap = getSurfSnapshot(surf, "object" if local else "world")
+    pts = np.asarray(positions, dtype=float)
+    u, v, result = snap.searcher.closestPoints(pts)
+    if pts.ndim > 1:
+        return u, v, result
     if point:
-        result = cpos.position.get()
-    else:
-        result = cpos.u.get(), cpos.v.get()
-    pmc.delete(cpos)
-    return result
+        return pmc.dt.Point(*result[0])
+    return u[0], v[0]
+
+
+def intersectSurf(surf, origins, directions, local=False):
+    """Nearest hit of each ray with the surface, through its cached BVH.
+    Returns (hit, u, v, t, points) arrays, see nurbsUtil.PatchBVH."""
+    snap = getSurfSnapshot(surf, "object" if local else "world")
+    return snap.bvh.intersectRays(origins, directions)
 
 
 def avgSurfVectors(surf):
     """Given a surface, get the approximate average normal, tangentU and tangentV"""
-    norm, tanU, tanV = pmc.dt.Vector(), pmc.dt.Vector(), pmc.dt.Vector()
-    for u in range(10):
-        u /= 10.0
-        for v in range(10):
-            v /= 10.0
-            norm += surf.normal(u, v)
-            tu, tv = surf.getTangents(u, v)
-            tanU += tu
-            tanV += tv
+    ev = getSurfEvaluator(surf)
+    # 10x10 sampling, one batched evaluation
+    u, v = ev.paramGrid(10, 10)
+    vecs = ev.evaluate(u, v)[1:]
 
-    return norm.normal(), tanU.normal(), tanV.normal()
+    return tuple(pmc.dt.Vector(*vec.sum(axis=0)).normal() for vec in vecs)
 
 
 def makeOrigShape(obj):
@@ -407,23 +875,193 @@ def origShapeMode(surfs, state):
                 pass
 
 
-def mirrorSurfWeights(dfmType="cMuscleSplineDeformer"):
-    """Mirror weights from one selected surface to the other,
-    for easily collecting all necessary nodes when the surfaces
-    and deformers are separate."""
+class MirrorIndex(spatialUtil.MirrorTable):
+    """Every .mirror pairing in the scene (surfaces, joints, controls and
+    parent controls) and which control drives which joint through rangeU,
+    each read with one bulk connection query instead of a listConnections
+    per object. Kept current by getMirrorIndex's connection callback.
+    A centre object is paired with itself."""
+    def __init__(self):
+        super(MirrorIndex, self).__init__()
+        self.refresh()
+
+    def refresh(self):
+        """Re-read all pairs from the scene."""
+        self.clear()
+
+        plugs = pmc.ls("*.mirror", recursive=True)
+        if plugs:
+            for plug, other in pmc.listConnections(plugs, connections=True):
+                self.mirrors[plug.node()] = other
+
+        plugs = [p for p in pmc.ls("*.rangeU", recursive=True)
+                 if isinstance(p.node(), pmc.nt.Joint)]
+        if plugs:
+            for plug, ctrl in pmc.listConnections(
+                    plugs, source=True, destination=False, connections=True):
+                self.addCtrl(plug.node(), ctrl)
+
+    def _alive(self, node):
+        return node.exists()
+
+    def connect(self, node, mirNode):
+        """Connect the two nodes' .mirror attrs (or node.message to its own
+        .mirror if they are the same, centre object) and record the pair."""
+        if node == mirNode:
+            node.message >> node.mirror
+        else:
+            node.mirror >> mirNode.mirror
+        self.pair(node, mirNode)
+
+    def connectPairs(self, pairs):
+        """connect many (node, mirNode) pairs in one pass, first breaking
+        any old .mirror connections of the nodes (and adding the attr
+        to any node without one)."""
+        for node, mirNode in pairs:
+            for n in set((node, mirNode)):
+                if not hasattr(n, "mirror"):
+                    n.addAttr("mirror", at="message")
+                    continue
+                n.mirror.disconnect()
+                old = self.mirrors.get(n)
+                if old is not None:
+                    self.unpair(n, old)
+            self.connect(node, mirNode)
+
+
+_mirrorIndex = None
+_mirrorCallbacks = []
+
+
+def getMirrorIndex(refresh=False):
+    """Return the scene's cached MirrorIndex, building it on first use.
+    Any .mirror or .rangeU connection being made or broken (including by
+    deleting a paired node) is applied to it in place. It is dropped when
+    the whole scene changes under it: on open, new, import, reference
+    loads, undo and redo."""
+    global _mirrorIndex
+    if refresh or _mirrorIndex is None:
+        _mirrorIndex = MirrorIndex()
+    if not _mirrorCallbacks:
+        for msg in (MSceneMessage.kAfterOpen, MSceneMessage.kAfterNew,
+                    MSceneMessage.kAfterImport,
+                    MSceneMessage.kAfterCreateReference,
+                    MSceneMessage.kAfterLoadReference,
+                    MSceneMessage.kAfterUnloadReference,
+                    MSceneMessage.kAfterRemoveReference):
+            _mirrorCallbacks.append(
+                MSceneMessage.addCallback(msg, clearMirrorIndex))
+        for event in ("Undo", "Redo"):
+            _mirrorCallbacks.append(
+                MEventMessage.addEventCallback(event, clearMirrorIndex))
+        _mirrorCallbacks.append(
+            MDGMessage.addConnectionCallback(_mirrorConnectionChanged))
+    return _mirrorIndex
+
+
+def _mirrorConnectionChanged(srcPlug, dstPlug, made, *args):
+    """Apply a .mirror or .rangeU connection change to the index.
+    Called for every connection in the scene, so bail out early."""
+    if _mirrorIndex is None:
+        return
+    attr = MFnAttribute(dstPlug.attribute()).name()
+    if attr not in ("mirror", "rangeU"):
+        return
+    dst = pmc.PyNode(dstPlug.node())
+    if attr == "rangeU" and not isinstance(dst, pmc.nt.Joint):
+        return
+    _mirrorIndex.connectionChanged(
+        pmc.PyNode(srcPlug.node()), dst, attr, made)
+
+
+def clearMirrorIndex(*args):
+    """Drop the cached MirrorIndex, to be rebuilt on next use."""
+    global _mirrorIndex
+    _mirrorIndex = None
+
+
+def mirrorSurfWeights(dfmType=None, sides=None):
+    """Mirror the weights of the deformers (by default every weighted
+    deformer - cluster, softMod, wire... - skin and muscle spline deformer)
+    on the selected surface onto their mirrors on the mirror surface
+    (or the second selected surface).
+    CVs correspond exactly by the mirror's reversed U (see mirrorSurfCVs),
+    so each deformer's weights are remapped as one array permutation, with
+    no spatial search. Skin influences swap for their own mirrors.
+    A deformer's mirror is itself if it deforms both surfaces, else its
+    .mirror pair, else the mirror surface's deformer named with the side
+    swapped. Deformers without one are skipped. Args:
+    - sides: (side, mirror side) name strings, eg ("L_", "R_"). By default
+        whatever differs between the two surfaces' names."""
     surf = pmc.selected()[0]
-    dfm = surf.history(type=dfmType)[0]
-    try:
-        mirSurf = surf.mirror.get()
-    except AttributeError:
+    mirIdx = getMirrorIndex()
+    mirSurf = mirIdx.mirror(surf)
+    if not mirSurf:
         try:
             mirSurf = pmc.selected()[1]
         except IndexError:
             pmc.error("No surface to mirror to!")
             return
 
-    mirDfm = mirSurf.history(type=dfmType)[0]
-    pmc.copyDeformerWeights(ss=surf, ds=mirSurf, sd=dfm, dd=mirDfm, mm="YZ")
+    numU, numV = getSurfSnapshot(surf).cvs.shape[:2]
+    if getSurfSnapshot(mirSurf).cvs.shape[:2] != (numU, numV):
+        pmc.error("{0} and {1} have different CVs, mirror the surface "
+                  "first.".format(surf.name(), mirSurf.name()))
+    perm = nu.mirrorCVIndices(numU, numV)
+
+    if dfmType is None:
+        dfmType = ["weightGeometryFilter", "skinCluster"]
+        if pmc.pluginInfo("MayaMuscle", q=True, loaded=True):
+            dfmType.append("cMuscleSplineDeformer")
+    if sides is None:
+        sides = _nameDifference(surf.nodeName(), mirSurf.nodeName())
+    shape, mirShape = surf.getShape(), mirSurf.getShape()
+    mirDfms = dict((d.nodeName(), d) for d in mirSurf.history(type=dfmType))
+    for dfm in surf.history(type=dfmType):
+        mirDfm = _mirrorDeformer(dfm, mirDfms, mirIdx, sides)
+        if mirDfm is None:
+            pmc.warning("{0} has no mirror on {1}, skipped.".format(
+                dfm.name(), mirSurf.name()))
+            continue
+
+        if isinstance(dfm, pmc.nt.SkinCluster):
+            infMap = {}
+            for inf in dfm.influenceObjects():
+                mirInf = mirIdx.mirror(inf)
+                if mirInf:
+                    infMap[inf.name()] = mirInf.name()
+            weightUtil.mirrorSkinWeights(dfm, mirDfm, perm, infMap)
+        else:
+            weightUtil.mirrorWeights(dfm, shape, mirDfm, mirShape, perm)
+
+
+def _nameDifference(name, mirName):
+    """The (part of name, part of mirName) left once their common start
+    and end are stripped, eg ("L", "R") for L_lip_surf and R_lip_surf."""
+    start = 0
+    while (start < min(len(name), len(mirName)) and
+           name[start] == mirName[start]):
+        start += 1
+    end = 0
+    while (end < min(len(name), len(mirName)) - start and
+           name[-1 - end] == mirName[-1 - end]):
+        end += 1
+    return name[start:len(name) - end], mirName[start:len(mirName) - end]
+
+
+def _mirrorDeformer(dfm, mirDfms, mirIdx, sides):
+    """The deformer in mirDfms (dict of name: deformer) paired with dfm,
+    or None. See mirrorSurfWeights."""
+    name = dfm.nodeName()
+    if mirDfms.get(name) == dfm:
+        return dfm
+    mirDfm = mirIdx.mirror(dfm)
+    if mirDfm is not None and mirDfm in mirDfms.values():
+        return mirDfm
+    side, mirSide = sides
+    if side and side in name:
+        return mirDfms.get(name.replace(side, mirSide, 1))
+    return None
 
 
 def makeFollOnSel():
@@ -497,14 +1135,10 @@ def matchFollToObj(sel=None):
     # pymel bug in "\internal\factories.py"
     # surf.closestPoint(j.getTranslation(ws=True), space="world")
 
-    cpos = pmc.nodetypes.ClosestPointOnSurface()
-    surf.ws.connect(cpos.inputSurface)
-    loc = pmc.spaceLocator()
-    loc.translate.connect(cpos.inPosition)
-    pmc.parentConstraint(j, loc, mo=False)
-    f.pu.set(cpos.parameterU.get())
-    f.pv.set(cpos.parameterV.get())
-    pmc.delete(cpos, loc)
+    u, v = closestOnSurf(
+        surf, pmc.xform(j, q=True, ws=True, rotatePivot=True), local=False)
+    f.pu.set(u)
+    f.pv.set(v)
 
 
 def resetMuscleCtrlsToSel(mirror=False):
@@ -521,10 +1155,8 @@ def resetMuscleCtrlsToSel(mirror=False):
     resetMuscleCtrls(surf, pts)
 
     if mirror:
-        try:
-            mirSurf = surf.getTransform().mirror.get()
-            assert mirSurf != surf
-        except (AttributeError, AssertionError):
+        mirSurf = getMirrorIndex().mirror(surf.getTransform())
+        if not mirSurf or mirSurf == surf.getTransform():
             return
         mirPts = [[1.0 - pt[0], pt[1]] for pt in pts]
         resetMuscleCtrls(mirSurf, mirPts)
@@ -552,9 +1184,10 @@ def resetMuscleCtrls(surf, pts):
             "Number of selected points must match the number of spline controls!")
 
     # must positions and normals BEFORE changing anything on the surface
-    # zip an unpacked list comp - slick way to get two lists out of one comp
-    positions, normals = zip(*[(surf.getPointAtParam(*pt, space="world"), 
-                                surf.normal(*pt, space="world")) for pt in pts])
+    u, v = np.array(pts, dtype=float).T
+    positions, normals = getSurfEvaluator(surf, "world").evaluate(u, v)[:2]
+    positions = [pmc.dt.Point(*p) for p in positions]
+    normals = [pmc.dt.Vector(*n) for n in normals]
 
     for i, ctrl in enumerate(ctrls):
         ctrl.setTranslation(positions[i], space="world")
@@ -0,0 +1,92 @@
+"""Shared fixtures for the tests of the headless modules (nurbsUtil,
+meshUtil, spatialUtil). None of these need Maya, so the tests run with
+plain python: python -m pytest tests (or python -m unittest discover tests).
+Importing this puts the package folder on sys.path."""
+
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nurbsUtil as nu
+import meshUtil
+
+
+def makeSurface(spansU=4, spansV=3, rational=False, periodicU=False, seed=0):
+    """A wavy cubic heightfield-ish surface over the unit square
+    (a tube around Z if periodicU), optionally with random weights."""
+    rng = np.random.RandomState(seed)
+    numU, numV = spansU + 3, spansV + 3
+    if periodicU:
+        angle = np.arange(spansU) * 2 * np.pi / spansU
+        ring = np.stack((np.cos(angle), np.sin(angle)), axis=-1)
+        ring = np.concatenate((ring, ring[:3]))
+        z = np.linspace(0.0, 2.0, numV)
+        cvs = np.zeros((numU, numV, 3))
+        cvs[..., :2] = ring[:, None] * (1.0 + .1 * rng.rand(1, numV, 1))
+        cvs[..., 2] = z
+        cvs[-3:] = cvs[:3]
+    else:
+        x, y = np.meshgrid(np.linspace(0, 1, numU), np.linspace(0, 1, numV),
+                           indexing="ij")
+        cvs = np.stack((x, y, .2 * rng.rand(numU, numV)), axis=-1)
+    weights = None
+    if rational:
+        weights = .5 + 1.5 * rng.rand(numU, numV)
+        if periodicU:
+            weights[-3:] = weights[:3]
+    return nu.SurfaceEvaluator(
+        cvs, nu.uniformKnots(spansU, 3, periodicU), nu.uniformKnots(spansV),
+        weights=weights, formU="periodic" if periodicU else "open")
+
+
+def denseClosest(ev, pts, num=300):
+    """Brute force distance to a dense grid of surface samples."""
+    u, v = ev.paramGrid(num, num, endpoint=True)
+    samples = ev.positions(u, v)
+    dists = np.empty(len(pts))
+    for i, p in enumerate(pts):
+        dists[i] = np.sqrt(((samples - p) ** 2).sum(axis=1).min())
+    return dists
+
+
+def gridMesh(numU, numV, wrapU=False):
+    """MeshTopology of a numU x numV grid of quads, optionally joined
+    around U into a tube. Returns (topology, vertex index grid)."""
+    vertsU = numU if wrapU else numU + 1
+    grid = np.arange(vertsU * (numV + 1)).reshape(vertsU, numV + 1)
+    faces = []
+    for i in range(numU):
+        for j in range(numV):
+            i1 = (i + 1) % vertsU
+            faces.append((grid[i, j], grid[i1, j], grid[i1, j + 1],
+                          grid[i, j + 1]))
+    faceVerts = np.array(faces).ravel()
+    pairs = np.stack((faceVerts, np.array(faces)[:, [1, 2, 3, 0]].ravel()),
+                     axis=-1)
+    edges = np.unique(np.sort(pairs, axis=1), axis=0)
+    return (meshUtil.MeshTopology(grid.size, edges, [4] * len(faces),
+                                  faceVerts), grid)
+
+
+class ClosestPointChecks(object):
+    """Mixin for TestCases checking closest point queries against
+    brute force."""
+    def queries(self, ev, num=300):
+        rng = np.random.RandomState(2)
+        u, v = ev.paramGrid(20, 20, endpoint=True)
+        pts = ev.positions(u, v)
+        lo, hi = pts.min(axis=0) - .2, pts.max(axis=0) + .2
+        return lo + rng.rand(num, 3) * (hi - lo)
+
+    def checkAgainstBruteForce(self, ev, closest):
+        pts = self.queries(ev)
+        u, v, found = closest(pts)
+        # the projected points really are on the surface at (u, v)
+        np.testing.assert_allclose(found, ev.positions(u, v), atol=1e-9)
+        dists = np.linalg.norm(found - pts, axis=1)
+        brute = denseClosest(ev, pts)
+        # never further than the dense sampling, bar a few local minima
+        stuck = dists > brute + 1e-4
+        self.assertLessEqual(stuck.sum(), len(pts) // 50)
@@ -0,0 +1,58 @@
+"""Tests for arrayUtil, the weight file format."""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+import helpers  # puts the package on sys.path
+import arrayUtil
+
+
+class TestArrayFiles(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        rng = np.random.RandomState(10)
+        # deformer.geometry keys, with namespaces and DAG paths
+        self.data = {
+            "cluster1.lip_surfShape": rng.rand(20),
+            "rig:skin1.|grp|rig:face_surfShape": rng.rand(30, 4),
+            "rig:skin1.|grp|rig:face_surfShape.influences":
+                np.array(["rig:jnt1", "rig:jnt2", "jnt3", "jnt4"])}
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def checkRoundTrip(self, path, **kwargs):
+        arrayUtil.saveArrays(path, self.data)
+        loaded = arrayUtil.loadArrays(path, **kwargs)
+        self.assertEqual(sorted(loaded), sorted(self.data))
+        for key, arr in self.data.items():
+            np.testing.assert_array_equal(loaded[key], arr)
+        return loaded
+
+    def testArchive(self):
+        self.checkRoundTrip(os.path.join(self.folder, "weights.npz"))
+
+    def testFolder(self):
+        path = os.path.join(self.folder, "weights")
+        self.checkRoundTrip(path)
+        # no colons or pipes in the file names
+        for name in os.listdir(path):
+            self.assertFalse(set(name) & set(":|"), name)
+
+    def testMemoryMappedFolder(self):
+        loaded = self.checkRoundTrip(os.path.join(self.folder, "weights"),
+                                     mmap=True)
+        self.assertIsInstance(loaded["cluster1.lip_surfShape"], np.memmap)
+
+    def testEscapesRoundTrip(self):
+        for key in ("a:b.|c|d:e", "plain.name"):
+            fileName = arrayUtil._fileName(key)
+            self.assertTrue(fileName.endswith(".npy"))
+            self.assertEqual(arrayUtil._keyName(fileName), key)
+
+
+if __name__ == "__main__":
+    unittest.main()
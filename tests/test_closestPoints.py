@@ -0,0 +1,19 @@
+"""Tests for the batched SurfaceEvaluator.closestPoints solver."""
+
+import unittest
+
+from helpers import makeSurface, ClosestPointChecks
+
+
+class TestClosestPoints(ClosestPointChecks, unittest.TestCase):
+    def testEvaluator(self):
+        ev = makeSurface()
+        self.checkAgainstBruteForce(ev, ev.closestPoints)
+
+    def testRationalEvaluator(self):
+        ev = makeSurface(rational=True)
+        self.checkAgainstBruteForce(ev, ev.closestPoints)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""Tests for SurfaceEvaluator.cvGeodesics, the surface falloff distances."""
+
+import unittest
+import numpy as np
+
+import helpers  # puts the package on sys.path
+import nurbsUtil as nu
+
+
+def evaluator(cvs, spansU, spansV):
+    return nu.SurfaceEvaluator(cvs, nu.uniformKnots(spansU),
+                               nu.uniformKnots(spansV))
+
+
+class TestCVGeodesics(unittest.TestCase):
+    def grevillePoints(self, ev):
+        gu, gv = ev.grevilleParams()
+        uu, vv = np.meshgrid(gu, gv, indexing="ij")
+        return ev.positions(uu.ravel(), vv.ravel()).reshape(uu.shape + (3,))
+
+    def testFlatIsStraightLine(self):
+        x, y = np.meshgrid(np.linspace(0, 2, 9), np.linspace(0, 1, 7),
+                           indexing="ij")
+        ev = evaluator(np.stack((x, y, np.zeros_like(x)), -1), 6, 4)
+        seeds = np.full(x.shape, np.inf)
+        seeds[2, 3] = 0.0
+        dists = ev.cvGeodesics(seeds)
+        pts = self.grevillePoints(ev)
+        straight = np.sqrt(((pts - pts[2, 3]) ** 2).sum(-1))
+        self.assertEqual(dists[2, 3], 0.0)
+        # never shorter than a straight line, and within a few percent
+        self.assertTrue((dists >= straight - 1e-9).all())
+        np.testing.assert_allclose(dists, straight, rtol=.05, atol=1e-9)
+
+    def testFollowsCurvature(self):
+        # an arch extruded along Y: across it is its arc length, not the
+        # straight line between its feet
+        angle = np.linspace(0, np.pi, 9)
+        cvs = np.zeros((9, 5, 3))
+        cvs[..., 0] = np.cos(angle)[:, None]
+        cvs[..., 1] = np.linspace(0, 1, 5)
+        cvs[..., 2] = np.sin(angle)[:, None]
+        ev = evaluator(cvs, 6, 2)
+        seeds = np.full((9, 5), np.inf)
+        seeds[0, 2] = 0.0
+        dists = ev.cvGeodesics(seeds)
+
+        gu, gv = ev.grevilleParams()
+        u = np.linspace(0, 1, 2001)
+        pts = ev.positions(u, np.full(len(u), gv[2]))
+        arc = np.concatenate(([0.0], np.cumsum(
+            np.sqrt((np.diff(pts, axis=0) ** 2).sum(-1)))))
+        np.testing.assert_allclose(dists[:, 2], np.interp(gu, u, arc),
+                                   rtol=.02, atol=1e-9)
+        self.assertGreater(dists[-1, 2], 1.2 * np.linalg.norm(
+            pts[-1] - pts[0]))
+
+    def testNearestSeedWins(self):
+        ev = helpers.makeSurface()
+        one = np.full((ev.numCVsInU, ev.numCVsInV), np.inf)
+        two = one.copy()
+        one[0, 0] = two[0, 0] = 0.0
+        two[-1, -1] = 0.0
+        other = np.full_like(one, np.inf)
+        other[-1, -1] = 0.0
+        np.testing.assert_allclose(
+            ev.cvGeodesics(two),
+            np.minimum(ev.cvGeodesics(one), ev.cvGeodesics(other)))
+
+
+if __name__ == "__main__":
+    unittest.main()
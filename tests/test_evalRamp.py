@@ -0,0 +1,49 @@
+"""Tests for nurbsUtil.evalRamp, the soft select falloff curve."""
+
+import unittest
+import numpy as np
+
+import helpers  # puts the package on sys.path
+import nurbsUtil as nu
+
+
+def ramp(x, keys):
+    """evalRamp of (value, position, interp) keys, as in a softSelect
+    curve string."""
+    values, positions, interps = np.array(keys, dtype=float).T
+    return nu.evalRamp(x, positions, values, interps.astype(int))
+
+
+class TestEvalRamp(unittest.TestCase):
+    def testInterps(self):
+        x = [0.0, .25, .5, 1.0]
+        # linear
+        np.testing.assert_allclose(
+            ramp(x, [(1, 0, 1), (0, 1, 1)]), [1, .75, .5, 0])
+        # none holds the key's value until the next key
+        np.testing.assert_allclose(
+            ramp(x, [(1, 0, 0), (0, 1, 0)]), [1, 1, 1, 0])
+        # smooth eases in and out
+        np.testing.assert_allclose(
+            ramp(x, [(1, 0, 2), (0, 1, 2)]), [1, 1 - .15625, .5, 0])
+
+    def testEndsHold(self):
+        keys = [(.2, .3, 1), (.8, .6, 1)]
+        np.testing.assert_allclose(ramp([0.0, .3, .6, 2.0], keys),
+                                   [.2, .2, .8, .8])
+        np.testing.assert_allclose(ramp([0.0, 5.0], [(.4, .5, 1)]), [.4, .4])
+
+    def testSplineIsSmoothThroughKeys(self):
+        keys = [(1, 0, 3), (.7, .3, 3), (.2, .7, 3), (0, 1, 3)]
+        np.testing.assert_allclose(ramp([0.0, .3, .7, 1.0], keys),
+                                   [1, .7, .2, 0], atol=1e-12)
+        # same slope either side of the inner keys
+        h = 1e-6
+        for pos in (.3, .7):
+            left = (ramp([pos], keys) - ramp([pos - h], keys)) / h
+            right = (ramp([pos + h], keys) - ramp([pos], keys)) / h
+            np.testing.assert_allclose(left, right, atol=1e-4)
+
+
+if __name__ == "__main__":
+    unittest.main()
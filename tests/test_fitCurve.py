@@ -0,0 +1,34 @@
+"""Tests for nurbsUtil.fitCurve."""
+
+import unittest
+import numpy as np
+
+import helpers  # puts the package on sys.path
+import nurbsUtil as nu
+
+
+class TestFitCurve(unittest.TestCase):
+    def circle(self, num=8):
+        angle = np.arange(num) * 2 * np.pi / num
+        return np.stack((np.cos(angle), np.sin(angle), np.zeros(num)), -1)
+
+    def testPeriodicFit(self):
+        cvs, knots = nu.fitCurve(self.circle(), 3, periodic=True)
+        # 3 unique CVs plus the 3 overlapping ones
+        self.assertEqual(len(cvs), 6)
+        np.testing.assert_allclose(cvs[:3], cvs[3:])
+        self.assertEqual(len(knots), len(cvs) + 2)
+
+    def testPeriodicTooFewSpans(self):
+        for spans in (1, 2):
+            self.assertRaises(ValueError, nu.fitCurve, self.circle(), spans,
+                              periodic=True)
+
+    def testOpenFitHitsEnds(self):
+        pts = self.circle()[:5]
+        cvs, knots = nu.fitCurve(pts, 2)
+        np.testing.assert_allclose(cvs[[0, -1]], pts[[0, -1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
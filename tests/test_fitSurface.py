@@ -0,0 +1,60 @@
+"""Tests for nurbsUtil.planarParams and fitSurface."""
+
+import unittest
+import numpy as np
+
+from helpers import makeSurface
+import nurbsUtil as nu
+
+
+def tiltedPlane(x, y):
+    """Points at plane coords (x, y) on a plane tilted off every axis,
+    and shifted off the origin."""
+    axes = np.linalg.qr(np.random.RandomState(6).rand(3, 3))[0]
+    return np.outer(x, axes[0]) + np.outer(y, axes[1]) + (1.0, -2.0, 3.0)
+
+
+class TestPlanarParams(unittest.TestCase):
+    def testFillsUnitSquareAlongSpread(self):
+        # a regular grid, so the spread is exactly along x and y
+        x, y = [a.ravel() for a in np.meshgrid(np.linspace(0, 4, 21),
+                                               np.linspace(0, 1, 11))]
+        u, v = nu.planarParams(tiltedPlane(x, y))
+        for params in (u, v):
+            self.assertAlmostEqual(params.min(), 0.0)
+            self.assertAlmostEqual(params.max(), 1.0)
+        # U follows the long side, V the short one (either way round)
+        xn, yn = (x - x.min()) / np.ptp(x), (y - y.min()) / np.ptp(y)
+        self.assertLess(min(np.abs(u - xn).max(),
+                            np.abs(u - (1 - xn)).max()), 1e-9)
+        self.assertLess(min(np.abs(v - yn).max(),
+                            np.abs(v - (1 - yn)).max()), 1e-9)
+
+
+class TestFitSurface(unittest.TestCase):
+    def testReproducesSurface(self):
+        ev = makeSurface(spansU=3, spansV=2)
+        rng = np.random.RandomState(8)
+        u, v = rng.rand(400), rng.rand(400)
+        pts = ev.positions(u, v)
+        cvs, knotsU, knotsV = nu.fitSurface(pts, u, v, 3, 2, smoothing=1e-10)
+        self.assertEqual(cvs.shape, (6, 5, 3))
+        fit = nu.SurfaceEvaluator(cvs, knotsU, knotsV)
+        np.testing.assert_allclose(fit.positions(u, v), pts, atol=1e-5)
+        np.testing.assert_allclose(cvs, ev.cvs, atol=1e-4)
+
+    def testSettlesCornersOfRoundRegion(self):
+        rng = np.random.RandomState(9)
+        angle, radius = 2 * np.pi * rng.rand(300), np.sqrt(rng.rand(300))
+        pts = tiltedPlane(radius * np.cos(angle), radius * np.sin(angle))
+        u, v = nu.planarParams(pts)
+        cvs = nu.fitSurface(pts, u, v, 4, 4)[0]
+        # CVs with no points near them, in the corners, stay in the plane
+        normal = np.cross(pts[1] - pts[0], pts[2] - pts[0])
+        normal /= np.linalg.norm(normal)
+        offPlane = np.abs((cvs.reshape(-1, 3) - pts[0]).dot(normal))
+        self.assertLess(offPlane.max(), 1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Tests for meshUtil.MeshTopology."""
+
+import unittest
+import numpy as np
+
+from helpers import gridMesh
+
+
+class TestMeshTopology(unittest.TestCase):
+    def testGridEdgeLoop(self):
+        topo, grid = gridMesh(4, 4)
+        # edge along U in the middle row: its loop runs the whole grid
+        edge = topo._edgeIds(np.array([grid[1, 2]]), np.array([grid[2, 2]]))[0]
+        loop = topo.edgeLoop(edge)
+        self.assertEqual(len(loop), 4)
+        verts = np.unique(topo.edges[loop])
+        np.testing.assert_array_equal(verts, np.sort(grid[:, 2]))
+
+    def testTubeEdgeLoopCloses(self):
+        topo, grid = gridMesh(6, 3, wrapU=True)
+        edge = topo._edgeIds(np.array([grid[0, 1]]), np.array([grid[1, 1]]))[0]
+        loop = topo.edgeLoop(edge)
+        self.assertEqual(len(loop), 6)
+        self.assertEqual(loop[0], edge)
+
+    def testSortEdgeChain(self):
+        topo, grid = gridMesh(4, 4)
+        edge = topo._edgeIds(np.array([grid[1, 2]]), np.array([grid[2, 2]]))[0]
+        loop = topo.edgeLoop(edge)
+        verts, edges, closed = topo.sortEdgeChain(loop[::-1].copy())
+        self.assertFalse(closed)
+        np.testing.assert_array_equal(verts, grid[:, 2])
+        self.assertEqual(len(edges), 4)
+
+    def testSortClosedChain(self):
+        topo, grid = gridMesh(6, 3, wrapU=True)
+        edge = topo._edgeIds(np.array([grid[0, 1]]), np.array([grid[1, 1]]))[0]
+        verts, edges, closed = topo.sortEdgeChain(topo.edgeLoop(edge))
+        self.assertTrue(closed)
+        self.assertEqual(sorted(verts), sorted(grid[:, 1]))
+        # consecutive verts share an edge, all the way around
+        pairs = np.stack((verts, np.roll(verts, -1)), axis=-1)
+        self.assertTrue((topo._edgeIds(pairs[:, 0], pairs[:, 1]) >= 0).all())
+
+    def testSortBranchingChainRaises(self):
+        topo, grid = gridMesh(4, 4)
+        centre = grid[2, 2]
+        spokes = [grid[1, 2], grid[3, 2], grid[2, 1]]
+        edges = topo._edgeIds(np.array([centre] * 3), np.array(spokes))
+        self.assertRaises(ValueError, topo.sortEdgeChain, edges)
+
+    def testSortedChainStartsAtLowestEnd(self):
+        topo, grid = gridMesh(4, 4)
+        edge = topo._edgeIds(np.array([grid[1, 2]]), np.array([grid[2, 2]]))[0]
+        # whichever way the loop was walked
+        for loop in (topo.edgeLoop(edge), topo.edgeLoop(edge)[::-1]):
+            verts, edges, closed = topo.sortEdgeChain(loop)
+            self.assertEqual(verts[0], grid[0, 2])
+            self.assertEqual(verts[-1], grid[-1, 2])
+
+    def testGridEdgeRing(self):
+        topo, grid = gridMesh(4, 4)
+        # edge along V: its ring crosses every quad of the column
+        edge = topo._edgeIds(np.array([grid[2, 1]]), np.array([grid[2, 2]]))[0]
+        ring = topo.edgeRing(edge)
+        expected = topo._edgeIds(grid[:, 1], grid[:, 2])
+        self.assertEqual(sorted(ring), sorted(expected))
+        # ordered across the grid
+        self.assertIn(ring.tolist(), (expected.tolist(),
+                                      expected[::-1].tolist()))
+
+    def testTubeEdgeRingCloses(self):
+        topo, grid = gridMesh(6, 3, wrapU=True)
+        edge = topo._edgeIds(np.array([grid[2, 0]]), np.array([grid[2, 1]]))[0]
+        ring = topo.edgeRing(edge)
+        self.assertEqual(len(ring), 6)
+        self.assertEqual(ring[0], edge)
+        self.assertEqual(sorted(ring),
+                         sorted(topo._edgeIds(grid[:, 0], grid[:, 1])))
+
+    def testEnclosedVerts(self):
+        topo, grid = gridMesh(6, 6)
+        square = grid[1:5, 1:5]
+        loop = np.concatenate((square[0], square[-1],
+                               square[1:-1, 0], square[1:-1, -1]))
+        np.testing.assert_array_equal(topo.enclosedVerts(loop),
+                                      np.sort(square.ravel()))
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+"""Tests for nurbsUtil.mirrorCVs and mirrorCVIndices, which weight
+mirroring relies on to pair CVs."""
+
+import unittest
+import numpy as np
+
+from helpers import makeSurface
+import nurbsUtil as nu
+
+
+class TestMirrorCVIndices(unittest.TestCase):
+    def testPairsMirroredCVs(self):
+        cvs = makeSurface(spansU=4, spansV=3).cvs
+        numU, numV = cvs.shape[:2]
+        mirCVs = nu.mirrorCVs(cvs, (1, 0, 0))
+        perm = nu.mirrorCVIndices(numU, numV)
+        # CV i of the mirror is the reflection of CV perm[i]
+        np.testing.assert_allclose(
+            mirCVs.reshape(-1, 3),
+            cvs.reshape(-1, 3)[perm] * (-1, 1, 1))
+
+    def testIsPermutationAndInvolution(self):
+        perm = nu.mirrorCVIndices(7, 5)
+        np.testing.assert_array_equal(np.sort(perm), np.arange(35))
+        # mirroring the mirror gives the original back
+        np.testing.assert_array_equal(perm[perm], np.arange(35))
+
+    def testMirrorsWeights(self):
+        weights = np.arange(12, dtype=float).reshape(4, 3)
+        perm = nu.mirrorCVIndices(4, 3)
+        np.testing.assert_array_equal(
+            weights.ravel()[perm].reshape(4, 3), weights[::-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
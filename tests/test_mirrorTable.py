@@ -0,0 +1,59 @@
+"""Tests for spatialUtil.MirrorTable, the bookkeeping behind
+surfaceUtil.MirrorIndex. Nodes are plain strings here."""
+
+import unittest
+
+import helpers  # puts the package on sys.path
+import spatialUtil
+
+
+def rigJnts(table, jnts):
+    """Replay the connections autoRigger.rigSurf makes for each joint:
+    its new control drives it through rangeU, then the control is paired
+    with the mirror joint's control if that is rigged already."""
+    for jnt in jnts:
+        ctrl = jnt + "_CTRL"
+        table.connectionChanged(ctrl, jnt, "rangeU", True)
+        mirJnt = table.mirror(jnt)
+        mirCtrl = table.ctrlForJnt(mirJnt) if mirJnt else None
+        if mirCtrl:
+            # centre: ctrl.message >> ctrl.mirror, else mirror >> mirror
+            table.connectionChanged(ctrl, mirCtrl, "mirror", True)
+
+
+class TestMirrorTable(unittest.TestCase):
+    def setUp(self):
+        self.table = spatialUtil.MirrorTable()
+        # L and R on the same surface, C on the plane of symmetry
+        for jnt, mirJnt in (("L_jnt", "R_jnt"), ("C_jnt", "C_jnt")):
+            self.table.connectionChanged(jnt, mirJnt, "mirror", True)
+
+    def testCentreAndSameSurfacePairs(self):
+        rigJnts(self.table, ["L_jnt", "C_jnt", "R_jnt", "lone_jnt"])
+        self.assertEqual(self.table.mirror("C_jnt_CTRL"), "C_jnt_CTRL")
+        self.assertEqual(self.table.mirror("L_jnt_CTRL"), "R_jnt_CTRL")
+        self.assertEqual(self.table.mirror("R_jnt_CTRL"), "L_jnt_CTRL")
+        self.assertIsNone(self.table.mirror("lone_jnt_CTRL"))
+        self.assertEqual(self.table.jntForCtrl("R_jnt_CTRL"), "R_jnt")
+
+    def testBreakingConnections(self):
+        rigJnts(self.table, ["L_jnt", "R_jnt"])
+        self.table.connectionChanged("R_jnt_CTRL", "R_jnt", "rangeU", False)
+        self.assertIsNone(self.table.ctrlForJnt("R_jnt"))
+        self.assertIsNone(self.table.jntForCtrl("R_jnt_CTRL"))
+        self.table.connectionChanged("L_jnt", "R_jnt", "mirror", False)
+        self.assertIsNone(self.table.mirror("R_jnt"))
+        # other pairs are untouched
+        self.assertEqual(self.table.mirror("C_jnt"), "C_jnt")
+        self.assertEqual(self.table.mirror("L_jnt_CTRL"), "R_jnt_CTRL")
+
+    def testRepairing(self):
+        self.table.connectionChanged("L_jnt", "X_jnt", "mirror", True)
+        # breaking the stale pair doesn't drop the new one
+        self.table.connectionChanged("L_jnt", "R_jnt", "mirror", False)
+        self.assertEqual(self.table.mirror("L_jnt"), "X_jnt")
+        self.assertEqual(self.table.mirror("X_jnt"), "L_jnt")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""Tests for nurbsUtil.PatchBVH closest point and ray queries."""
+
+import unittest
+import numpy as np
+
+from helpers import makeSurface, ClosestPointChecks
+import nurbsUtil as nu
+
+
+class TestBVHClosestPoints(ClosestPointChecks, unittest.TestCase):
+    def testBVH(self):
+        ev = makeSurface(spansU=8, spansV=6)
+        self.checkAgainstBruteForce(ev, nu.PatchBVH(ev).closestPoints)
+
+    def testPeriodicBVH(self):
+        ev = makeSurface(periodicU=True)
+        self.checkAgainstBruteForce(ev, nu.PatchBVH(ev).closestPoints)
+
+    def testPointsOnSurface(self):
+        ev = makeSurface(rational=True)
+        u, v = ev.paramGrid(7, 7)
+        u, v = u + .01, v + .01
+        fu, fv, found = nu.PatchBVH(ev).closestPoints(ev.positions(u, v))
+        np.testing.assert_allclose(found, ev.positions(u, v), atol=1e-8)
+        np.testing.assert_allclose(fu, u, atol=1e-6)
+        np.testing.assert_allclose(fv, v, atol=1e-6)
+
+
+class TestIntersectRays(unittest.TestCase):
+    def testVerticalRays(self):
+        ev = makeSurface(spansU=6, spansV=5)
+        bvh = nu.PatchBVH(ev)
+        u, v = ev.paramGrid(9, 9)
+        u, v = u + .03, v + .03
+        target = ev.positions(u, v)
+        origins = target + (0, 0, 5)
+        hit, hu, hv, t, points = bvh.intersectRays(origins, (0, 0, -1))
+        self.assertTrue(hit.all())
+        np.testing.assert_allclose(points, target, atol=1e-6)
+        np.testing.assert_allclose(t, 5.0, atol=1e-6)
+        np.testing.assert_allclose(ev.positions(hu, hv), points, atol=1e-9)
+
+    def testMisses(self):
+        ev = makeSurface()
+        bvh = nu.PatchBVH(ev)
+        origins = [(5, 5, 5), (.5, .5, 5), (.5, .5, -5)]
+        dirs = [(0, 0, -1), (0, 0, 1), (0, 0, -1)]
+        hit, _, _, t, _ = bvh.intersectRays(origins, dirs)
+        self.assertFalse(hit.any())
+        self.assertTrue(np.isinf(t).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
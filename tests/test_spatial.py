@@ -0,0 +1,65 @@
+"""Tests for spatialUtil's KDTree and mirrorPairs."""
+
+import unittest
+import numpy as np
+
+import helpers  # puts the package on sys.path
+import spatialUtil
+
+
+class TestSpatial(unittest.TestCase):
+    def testKDTreeQuery(self):
+        rng = np.random.RandomState(3)
+        points, queries = rng.rand(500, 3), rng.rand(200, 3)
+        dists, indices = spatialUtil.KDTree(points, leafSize=4).query(queries)
+        brute = np.sqrt(((queries[:, None] - points) ** 2).sum(-1))
+        np.testing.assert_array_equal(indices, brute.argmin(axis=1))
+        np.testing.assert_allclose(dists, brute.min(axis=1))
+
+    def testKDTreeQueryDuplicatesAndLeafSizes(self):
+        rng = np.random.RandomState(6)
+        # coarse coordinates, so many points coincide
+        points = np.round(rng.rand(300, 3), 1)
+        queries = rng.rand(100, 3) * 1.4 - .2
+        brute = np.sqrt(((queries[:, None] - points) ** 2).sum(-1))
+        for leafSize in (1, 3, 16):
+            dists, indices = spatialUtil.KDTree(points, leafSize).query(
+                queries, maxDist=.1)
+            near = brute.min(axis=1) <= .1
+            np.testing.assert_allclose(dists[near], brute.min(axis=1)[near])
+            np.testing.assert_allclose(
+                brute[near, indices[near]], brute.min(axis=1)[near])
+            self.assertTrue((indices[~near] == -1).all())
+
+    def testKDTreeMaxDist(self):
+        tree = spatialUtil.KDTree([(0, 0, 0), (1, 0, 0)])
+        dists, indices = tree.query([(.1, 0, 0), (5, 0, 0)], maxDist=.5)
+        self.assertEqual(indices.tolist(), [0, -1])
+        self.assertTrue(np.isinf(dists[1]))
+
+    def testKDTreeQueryRadius(self):
+        rng = np.random.RandomState(4)
+        points = rng.rand(300, 3)
+        found = spatialUtil.KDTree(points).queryRadius((.5, .5, .5), .3)
+        brute = np.flatnonzero(
+            ((points - .5) ** 2).sum(axis=1) <= .3 ** 2)
+        np.testing.assert_array_equal(found, brute)
+
+    def testMirrorPairs(self):
+        rng = np.random.RandomState(5)
+        side = rng.rand(40, 3) + (.1, 0, 0)
+        middle = rng.rand(5, 3) * (0, 1, 1)
+        lone = np.array([(3.0, 3.0, 3.0)])
+        points = np.concatenate((side, side * (-1, 1, 1), middle, lone))
+        partners = spatialUtil.mirrorPairs(points, (1, 0, 0))
+
+        reflected = points * (-1, 1, 1)
+        brute = np.sqrt(((reflected[:, None] - points) ** 2).sum(-1))
+        expected = np.where(brute.min(axis=1) < .01, brute.argmin(axis=1), -1)
+        np.testing.assert_array_equal(partners, expected)
+        self.assertEqual(partners[-1], -1)
+        np.testing.assert_array_equal(partners[80:85], np.arange(80, 85))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+"""Tests for nurbsUtil.SurfaceEvaluator."""
+
+import unittest
+import numpy as np
+
+from helpers import makeSurface
+
+
+class TestSurfaceEvaluator(unittest.TestCase):
+    def checkDerivatives(self, ev):
+        rng = np.random.RandomState(1)
+        u = ev.domainU[0] + (.05 + .9 * rng.rand(50)) * np.diff(ev.domainU)
+        v = ev.domainV[0] + (.05 + .9 * rng.rand(50)) * np.diff(ev.domainV)
+        ders = ev.derivatives(u, v, order=2)
+        h = 1e-5
+        for k, l, du, dv in ((1, 0, h, 0), (0, 1, 0, h)):
+            fd = (ev.positions(u + du, v + dv) -
+                  ev.positions(u - du, v - dv)) / (2 * h)
+            np.testing.assert_allclose(ders[:, k, l], fd, atol=1e-5)
+            # second derivatives from the first
+            fd2 = (ev.derivatives(u + du, v + dv)[:, k, l] -
+                   ev.derivatives(u - du, v - dv)[:, k, l]) / (2 * h)
+            np.testing.assert_allclose(ders[:, 2 * k, 2 * l], fd2, atol=1e-3)
+        fduv = (ev.derivatives(u, v + h)[:, 1, 0] -
+                ev.derivatives(u, v - h)[:, 1, 0]) / (2 * h)
+        np.testing.assert_allclose(ders[:, 1, 1], fduv, atol=1e-3)
+
+    def testDerivatives(self):
+        self.checkDerivatives(makeSurface())
+
+    def testRationalDerivatives(self):
+        self.checkDerivatives(makeSurface(rational=True))
+
+    def testPeriodicDerivatives(self):
+        self.checkDerivatives(makeSurface(periodicU=True, rational=True))
+
+    def testPeriodicWraps(self):
+        ev = makeSurface(periodicU=True)
+        lo, hi = ev.domainU
+        np.testing.assert_allclose(ev.positions([lo], [.5]),
+                                   ev.positions([hi], [.5]), atol=1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+import numpy as np
+import pymel.core as pmc
+import maya.api.OpenMaya as om2
+import maya.api.OpenMayaAnim as oma2
+import arrayUtil
+
+
+__author__ = "Brendan Kelly"
+__email__ = "clamdragon@gmail.com"
+
+
+"""Deformer and skin weight I/O. Weights are read and written as whole
+arrays (one query or API call per deformer and geometry) and saved as
+NumPy arrays keyed by deformer and geometry name, so a rebuilt rig can
+get its weights back in seconds instead of being repainted."""
+
+
+"""
+numComponents
+getWeights
+setWeights
+getSkinWeights
+setSkinWeights
+mirrorWeights
+mirrorSkinWeights
+exportWeights
+importWeights
+"""
+
+
+weightTypes = ("cluster", "softMod", "wire")
+
+
+def _dagPath(node):
+    sel = om2.MSelectionList()
+    sel.add(node.longName())
+    return sel.getDagPath(0)
+
+
+def numComponents(geo):
+    """Number of deformable components (vertices/CVs) of the shape."""
+    return om2.MItGeometry(_dagPath(geo)).count()
+
+
+def getWeights(dfm, geo, count=None):
+    """(N,) array of a weighted deformer's (cluster, softMod, wire...)
+    weight on every component of the shape, read from its weightList in
+    one query. Unset weights are 1. Args:
+    - count: number of components, if already known."""
+    if count is None:
+        count = numComponents(geo)
+    plug = dfm.weightList[dfm.indexForOutputShape(geo)].weights
+    weights = np.ones(count)
+    indices = plug.getArrayIndices()
+    if indices:
+        weights[indices] = plug.get()
+    return weights
+
+
+def setWeights(dfm, geo, weights):
+    """Write an (N,) array as the deformer's weights on the shape,
+    with one setAttr."""
+    weights = np.ravel(weights)
+    pmc.setAttr("{0}.weightList[{1}].weights[0:{2}]".format(
+        dfm.name(), dfm.indexForOutputShape(geo), len(weights) - 1),
+        *weights.tolist(), size=len(weights))
+
+
+def _skinFn(skin):
+    """MFnSkinCluster, dag path of its (first) geometry, and a component
+    object of all of that geometry's components."""
+    sel = om2.MSelectionList()
+    sel.add(skin.name())
+    fn = oma2.MFnSkinCluster(sel.getDependNode(0))
+    path = fn.getPathAtIndex(fn.indexForOutputConnection(0))
+    if path.hasFn(om2.MFn.kNurbsSurface):
+        surf = om2.MFnNurbsSurface(path)
+        cmpntFn = om2.MFnDoubleIndexedComponent()
+        cmpnts = cmpntFn.create(om2.MFn.kSurfaceCVComponent)
+        cmpntFn.setCompleteData(surf.numCVsInU, surf.numCVsInV)
+    else:
+        cmpntFn = om2.MFnSingleIndexedComponent()
+        if path.hasFn(om2.MFn.kNurbsCurve):
+            cmpnts = cmpntFn.create(om2.MFn.kCurveCVComponent)
+        else:
+            cmpnts = cmpntFn.create(om2.MFn.kMeshVertComponent)
+        cmpntFn.setCompleteData(om2.MItGeometry(path).count())
+    return fn, path, cmpnts
+
+
+def getSkinWeights(skin):
+    """Return ((numComponents, numInfluences) array of the skinCluster's
+    weights, list of influence names), read with one API call."""
+    fn, path, cmpnts = _skinFn(skin)
+    weights, numInfs = fn.getWeights(path, cmpnts)
+    names = [p.partialPathName() for p in fn.influenceObjects()]
+    return np.reshape(np.array(weights), (-1, numInfs)), names
+
+
+def setSkinWeights(skin, weights, influences, zeroOthers=False):
+    """Write a (numComponents, len(influences)) weight array to the
+    skinCluster with one API call, matching columns to its influences by
+    name. Columns of missing influences are dropped with a warning, and
+    the weights are normalized. Args:
+    - zeroOthers: zero the skin's influences which aren't in influences,
+        rather than keep their old weights (which normalizing would then
+        spread over everything)."""
+    fn, path, cmpnts = _skinFn(skin)
+    current = [p.partialPathName() for p in fn.influenceObjects()]
+    cols, infIndices = [], []
+    for col, name in enumerate(influences):
+        try:
+            infIndices.append(current.index(name))
+            cols.append(col)
+        except ValueError:
+            pmc.warning("{0} has no influence {1}, its weights are "
+                        "skipped.".format(skin.name(), name))
+    values = np.asarray(weights, dtype=float)[:, cols]
+    if zeroOthers:
+        others = [i for i in range(len(current)) if i not in infIndices]
+        infIndices += others
+        values = np.concatenate(
+            (values, np.zeros((len(values), len(others)))), axis=1)
+    fn.setWeights(path, cmpnts, om2.MIntArray(infIndices),
+                  om2.MDoubleArray(values.ravel().tolist()), normalize=True)
+
+
+def mirrorWeights(dfm, geo, mirDfm, mirGeo, permutation):
+    """Mirror a deformer's weights on geo onto mirDfm's weights on mirGeo
+    (either may be the same) as one array permutation: component i of
+    mirGeo gets the weight of component permutation[i] of geo."""
+    setWeights(mirDfm, mirGeo, getWeights(dfm, geo)[permutation])
+
+
+def mirrorSkinWeights(skin, mirSkin, permutation, influenceMap=None):
+    """Mirror a skinCluster's weights onto mirSkin as one permutation of
+    its weight rows (see mirrorWeights), each influence's column going to
+    its mirror influence. mirSkin's influences which none of skin's map
+    to are zeroed. Args:
+    - influenceMap: dict of influence name: mirror influence name.
+    Influences without an entry (ie middle joints) map to themselves."""
+    weights, influences = getSkinWeights(skin)
+    influenceMap = influenceMap or {}
+    setSkinWeights(mirSkin, weights[permutation],
+                   [influenceMap.get(i, i) for i in influences],
+                   zeroOthers=True)
+
+
+def exportWeights(path, deformers=None, compress=True):
+    """Save the weights of the given deformers (default every cluster,
+    softMod, wire and skinCluster in the scene) to path. Keys are
+    "deformer.geometry", plus "skin.geometry.influences" for the
+    influence names of each skin. Returns the keys.
+    See arrayUtil.saveArrays."""
+    if deformers is None:
+        deformers = pmc.ls(type=weightTypes + ("skinCluster",))
+    data = {}
+    for dfm in deformers:
+        if isinstance(dfm, pmc.nt.SkinCluster):
+            geo = dfm.getOutputGeometry()[0]
+            key = "{0}.{1}".format(dfm.name(), geo.name())
+            data[key], influences = getSkinWeights(dfm)
+            data[key + ".influences"] = np.array(influences)
+            continue
+        for geo in dfm.getOutputGeometry():
+            key = "{0}.{1}".format(dfm.name(), geo.name())
+            data[key] = getWeights(dfm, geo)
+
+    arrayUtil.saveArrays(path, data, compress)
+    print("Saved weights of {0} deformers to {1}.".format(
+        len(deformers), path))
+    return sorted(data)
+
+
+def importWeights(path, mmap=False):
+    """Restore weights saved by exportWeights onto the deformers and
+    geometry of the same names. Anything missing from the scene is
+    skipped with a warning. Returns the restored keys."""
+    if mmap and path.endswith(".npz"):
+        pmc.warning("Arrays in an npz archive can't be memory mapped. "
+                    "Save to a directory for that.")
+    data = arrayUtil.loadArrays(path, mmap)
+    restored = []
+    for key in sorted(data):
+        if key.endswith(".influences"):
+            continue
+        dfmName, geoName = key.split(".", 1)
+        if not (pmc.objExists(dfmName) and pmc.objExists(geoName)):
+            pmc.warning("No {0} in the scene, skipped.".format(key))
+            continue
+        dfm, geo = pmc.PyNode(dfmName), pmc.PyNode(geoName)
+        if isinstance(dfm, pmc.nt.SkinCluster):
+            setSkinWeights(dfm, data[key], list(data[key + ".influences"]))
+        else:
+            setWeights(dfm, geo, data[key])
+        restored.append(key)
+    return restored